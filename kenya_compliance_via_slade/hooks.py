@@ -126,10 +126,11 @@ doctype_list_js = {
 # ----------
 
 # add methods and filters to jinja environment
-# jinja = {
-# 	"methods": "kenya_compliance_via_slade.utils.jinja_methods",
-# 	"filters": "kenya_compliance_via_slade.utils.jinja_filters"
-# }
+jinja = {
+    "methods": [
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.qr_codes.get_etims_qr_code"
+    ],
+}
 
 # Installation
 # ------------
@@ -137,6 +138,11 @@ doctype_list_js = {
 # before_install = "kenya_compliance_via_slade.install.before_install"
 # after_install = "kenya_compliance_via_slade.kenya_compliance_via_slade.setup.after_install.after_install"
 
+# Fixtures may have changed the routes table
+after_migrate = [
+    "kenya_compliance_via_slade.kenya_compliance_via_slade.utils.clear_routes_cache",
+]
+
 # Uninstallation
 # ------------
 
@@ -255,18 +261,28 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
+    "all": [
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.utils.flush_last_request_dates",
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.request_log.flush_queued_logs",
+    ],
     "daily": [
         "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.refresh_notices",
     ],
+    "daily_long": [
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.integration_request_retention.roll_up_integration_requests",
+    ],
     "hourly": [
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.refresh_code_lists",
         # "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.send_sales_invoices_information",
         # "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.send_purchase_information",
         # "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.send_stock_information",
     ],
+    "hourly_long": [
+        # Long queue, as full syncs download the whole classification catalogue
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.get_item_classification_codes",
+    ],
     "monthly": [
-        "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.refresh_code_lists",
         # "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.search_organisations_request",
-        "kenya_compliance_via_slade.kenya_compliance_via_slade.background_tasks.tasks.get_item_classification_codes",
     ],
 }
 
@@ -301,12 +317,16 @@ scheduler_events = {
 # Request Events
 # ----------------
 # before_request = ["kenya_compliance_via_slade.utils.before_request"]
-# after_request = ["kenya_compliance_via_slade.utils.after_request"]
+after_request = [
+    "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.request_log.flush_request_logs"
+]
 
 # Job Events
 # ----------
 # before_job = ["kenya_compliance_via_slade.utils.before_job"]
-# after_job = ["kenya_compliance_via_slade.utils.after_job"]
+after_job = [
+    "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.request_log.flush_request_logs"
+]
 
 # User Data Protection
 # --------------------
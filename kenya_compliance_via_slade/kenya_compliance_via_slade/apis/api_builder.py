@@ -1,18 +1,108 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Callable, Literal, Optional, Union
+from types import MappingProxyType
+from typing import Callable, Literal, Mapping, Optional, Sequence, Union
 from urllib import parse
 
 import requests
 
 import frappe
-from frappe.integrations.utils import create_request_log
 from frappe.model.document import Document
 
 from ..logger import etims_logger
 from ..utils import update_last_request_date, update_navari_settings_with_token
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
 from .remote_response_status_handlers import on_slade_error
+from .request_log import RequestLog, open_request_log, update_integration_request
+from .request_timings import RequestTimings, elapsed_ms, measure_connect_time
+from .retry_policy import RetryPolicy, send_with_retries
+from .session_pool import get_session
+from .token_manager import get_access_token
+
+# Seconds to connect, and to wait for each part of the response. Long listings are
+# bounded per page rather than as a whole
+REQUEST_TIMEOUT = (10, 120)
+
+
+@dataclass(frozen=True)
+class RemoteRequest:
+    """A single call to the Slade360 servers.
+
+    Instances are immutable: derive variations, e.g. the next page of a listing,
+    with `replace()` instead of changing them in place. The headers and payload are
+    copied on creation so later changes made by the caller do not leak in.
+    """
+
+    url: str
+    method: Literal["GET", "POST", "PATCH", "PUT"]
+    headers: Mapping[str, str]
+    success_callback: Callable
+    payload: dict | list | None = None
+    error_callback: Callable | None = None
+    route_path: str | None = None
+    request_description: str | None = None
+    doctype: str | Document | None = None
+    document_name: str | None = None
+    retry_policy: RetryPolicy | None = None
+    circuit_breaker: CircuitBreaker | None = None
+    settings_name: str | None = None
+
+    def __post_init__(self) -> None:
+        if not self.url or not self.method or self.success_callback is None:
+            frappe.throw(
+                """Please ensure all required parameters (URL, headers, method, success, and error callbacks) are set.""",
+                frappe.MandatoryError,
+                title="Setup Error",
+                is_minimizable=True,
+            )
+
+        object.__setattr__(self, "headers", MappingProxyType(dict(self.headers or {})))
+
+        if isinstance(self.payload, dict):
+            object.__setattr__(self, "payload", dict(self.payload))
+        elif isinstance(self.payload, list):
+            object.__setattr__(self, "payload", list(self.payload))
+
+    def replace(self, **changes: object) -> RemoteRequest:
+        return dataclasses.replace(self, **changes)
+
+    def with_resource_id(self) -> RemoteRequest:
+        """For PATCH and PUT requests, move the payload's id into the URL"""
+        if self.method not in {"PATCH", "PUT"} or not isinstance(self.payload, dict):
+            return self
+
+        payload = dict(self.payload)
+        resource_id = payload.pop("id", None)
+        url = self.url
+
+        if resource_id and f"/{resource_id}/" not in url:
+            url = f"{url.rstrip('/')}/{resource_id}/"
+
+        return self.replace(url=url, payload=payload)
+
+
+@dataclass
+class RequestContext:
+    """The mutable state of one execution of a RemoteRequest, handed to observers"""
+
+    request: RemoteRequest
+    integration_request: RequestLog | None = None
+    error: str | Exception | None = None
+    timings: RequestTimings = dataclasses.field(default_factory=RequestTimings)
+
+    @property
+    def doctype(self) -> str | Document | None:
+        return self.request.doctype
+
+    @property
+    def document_name(self) -> str | None:
+        return self.request.document_name
 
 
 class BaseEndpointsBuilder:
@@ -42,20 +132,27 @@ class BaseEndpointsBuilder:
 class ErrorObserver:
     """Error observer class."""
 
-    def update(self, notifier: BaseEndpointsBuilder) -> None:
+    def update(self, notifier: BaseEndpointsBuilder | RequestContext) -> None:
         """Reacts to event from notifier
 
         Args:
-            notifier (AbstractEndpointsBuilder): The event notifier object
+            notifier (BaseEndpointsBuilder | RequestContext): The event notifier object
         """
         if notifier.error:
-            # TODO: Check why integration log is never updated
-            update_integration_request(
-                notifier.integration_request.name,
-                status="Failed",
-                output=None,
-                error=notifier.error,
-            )
+            if isinstance(notifier.integration_request, RequestLog):
+                notifier.integration_request.close(
+                    status="Failed",
+                    output=None,
+                    error=notifier.error,
+                    timings=getattr(notifier, "timings", None),
+                )
+            else:
+                update_integration_request(
+                    notifier.integration_request.name,
+                    status="Failed",
+                    output=None,
+                    error=notifier.error,
+                )
             etims_logger.exception(notifier.error, exc_info=True)
             frappe.log_error(
                 title="Fatal Error",
@@ -71,15 +168,352 @@ class ErrorObserver:
             )
 
 
+class RequestExecutor:
+    """Sends RemoteRequests to the Slade360 servers and processes their responses.
+
+    The executor keeps no per-request state: everything belonging to a call lives in
+    the RemoteRequest and in a RequestContext created for that call alone. One
+    executor can therefore be shared by threads, coroutines and callbacks that
+    themselves make further requests.
+
+    Only the HTTP exchange is safe to run off the current thread. Logging, callbacks
+    and other database work always happen on the thread that called the executor,
+    since the Frappe request context is thread local.
+    """
+
+    def __init__(self, observers: list[ErrorObserver] | None = None) -> None:
+        self._observers = (
+            list(observers) if observers is not None else [ErrorObserver()]
+        )
+
+    def execute(
+        self,
+        request: RemoteRequest,
+        pending_response: Future[requests.Response] | None = None,
+        timings: RequestTimings | None = None,
+    ) -> Optional[Union[dict, str, bytes, list]]:
+        """Handles communication to Slade360 servers.
+
+        Args:
+            request (RemoteRequest): The request to send
+            pending_response (Future[requests.Response] | None, optional): The request
+            already sent on another thread. Its response is processed instead of
+            sending the request again. Defaults to None.
+            timings (RequestTimings | None, optional): The timings the thread sending
+            `pending_response` records. Defaults to None.
+
+        Returns:
+            The response data, or None if the server could not be reached
+
+        Raises:
+            CircuitOpenError: If the route's circuit is open. Nothing is sent or logged.
+        """
+        request = request.with_resource_id()
+
+        if pending_response is None:
+            self.check_circuit(request)
+
+        context = self.start(request, timings)
+
+        try:
+            if pending_response is not None:
+                response = pending_response.result()
+            else:
+                response = send_request(
+                    request, get_session(request.url), context.timings
+                )
+        except requests.exceptions.RequestException as error:
+            return self.on_request_exception(context, error)
+
+        return self.handle_response(context, response)
+
+    async def execute_async(
+        self, request: RemoteRequest
+    ) -> Optional[Union[dict, str, bytes, list]]:
+        """Awaitable version of `execute`.
+
+        The HTTP exchange runs in the event loop's default thread pool; the response
+        is processed back on the loop's thread.
+        """
+        request = request.with_resource_id()
+        self.check_circuit(request)
+
+        context = self.start(request)
+        session = get_session(request.url)
+
+        try:
+            response = await asyncio.to_thread(
+                send_request, request, session, context.timings
+            )
+        except requests.exceptions.RequestException as error:
+            return self.on_request_exception(context, error)
+
+        return self.handle_response(context, response)
+
+    def execute_concurrently(
+        self, remote_requests: Sequence[RemoteRequest], max_workers: int
+    ) -> list[Optional[Union[dict, str, bytes, list]]]:
+        """Sends the requests with a bounded number of worker threads.
+
+        Each response is processed on the current thread in the order the requests
+        were given, so logging and callbacks behave as if the requests were sent one
+        at a time. Requests not yet sent are cancelled if processing fails.
+        """
+        remote_requests = [request.with_resource_id() for request in remote_requests]
+
+        if remote_requests:
+            self.check_circuit(remote_requests[0])
+
+        timings = [RequestTimings() for _ in remote_requests]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending_responses = [
+                executor.submit(
+                    send_request, request, get_session(request.url), request_timings
+                )
+                for request, request_timings in zip(remote_requests, timings)
+            ]
+
+            try:
+                return [
+                    self.execute(
+                        request,
+                        pending_response=pending_response,
+                        timings=request_timings,
+                    )
+                    for request, pending_response, request_timings in zip(
+                        remote_requests, pending_responses, timings
+                    )
+                ]
+            except Exception:
+                for pending_response in pending_responses:
+                    pending_response.cancel()
+                raise
+
+    def check_circuit(self, request: RemoteRequest) -> None:
+        if request.circuit_breaker and not request.circuit_breaker.allow_request():
+            raise CircuitOpenError(
+                f"Requests to {request.route_path} are paused after repeated failures "
+                "from the eTims server. They resume automatically once it recovers."
+            )
+
+    def start(
+        self, request: RemoteRequest, timings: RequestTimings | None = None
+    ) -> RequestContext:
+        return RequestContext(
+            request=request,
+            timings=timings or RequestTimings(),
+            integration_request=open_request_log(
+                request_description=request.request_description,
+                url=request.url,
+                payload=request.payload,
+                headers=dict(request.headers),
+                doctype=request.doctype,
+                document_name=request.document_name,
+                settings_name=request.settings_name,
+            ),
+        )
+
+    def handle_response(
+        self,
+        context: RequestContext,
+        response: requests.Response,
+        retrying: bool = False,
+    ) -> Optional[Union[dict, str, bytes, list]]:
+        request = context.request
+        parsed_url = parse.urlparse(request.url)
+        route_path = f"/{parsed_url.path.split('/')[-1]}"
+
+        response_data = get_response_data(response)
+        update_last_request_date(datetime.now(), request.route_path)
+
+        if request.circuit_breaker:
+            if response.status_code == 429 or response.status_code >= 500:
+                request.circuit_breaker.record_failure()
+            else:
+                request.circuit_breaker.record_success()
+
+        if response.status_code in {200, 201}:
+            callback_started = time.perf_counter()
+            try:
+                request.success_callback(
+                    response=response_data,
+                    document_name=request.document_name,
+                    doctype=request.doctype,
+                )
+            except Exception:
+                # Logged before the error propagates, so the call is not lost
+                context.timings.callback = elapsed_ms(callback_started)
+                context.integration_request.close(
+                    status="Failed",
+                    output=response_data,
+                    error=frappe.get_traceback(),
+                    timings=context.timings,
+                )
+                raise
+
+            context.timings.callback = elapsed_ms(callback_started)
+
+            current_page = response_data.get("current_page", None)
+            total_pages = response_data.get("total_pages", 0)
+
+            context.integration_request.close(
+                status="Completed",
+                output=response_data,
+                error=None,
+                request_description=(
+                    f"Page {current_page} of {total_pages}"
+                    if int(total_pages) > 1
+                    else None
+                ),
+                timings=context.timings,
+            )
+        elif response.status_code == 401 and not retrying:
+            context.request = request = request.replace(
+                headers={
+                    **request.headers,
+                    "Authorization": f"Bearer {refresh_token(request)}",
+                }
+            )
+
+            # Time the retry on its own
+            context.timings = RequestTimings()
+
+            try:
+                response = send_request(
+                    request, get_session(request.url), context.timings
+                )
+            except requests.exceptions.RequestException as error:
+                return self.on_request_exception(context, error)
+
+            return self.handle_response(context, response, retrying=True)
+        else:
+            if isinstance(response_data, str):
+                error = response_data
+            elif isinstance(response_data, list):
+                error = response_data[0]
+            else:
+                error = str(response_data)
+
+            context.integration_request.close(
+                status="Failed", output=None, error=error, timings=context.timings
+            )
+            on_slade_error(
+                response_data,
+                url=route_path,
+                doctype=request.doctype,
+                document_name=request.document_name,
+            )
+            if request.error_callback:
+                request.error_callback(
+                    response_data,
+                    url=route_path,
+                    doctype=request.doctype,
+                    document_name=request.document_name,
+                )
+
+        return response_data
+
+    def on_request_exception(
+        self, context: RequestContext, error: requests.exceptions.RequestException
+    ) -> None:
+        context.error = error
+
+        if context.request.circuit_breaker:
+            context.request.circuit_breaker.record_failure()
+
+        for observer in self._observers:
+            observer.update(context)
+
+        return None
+
+
+request_executor = RequestExecutor()
+
+
+def send_request(
+    request: RemoteRequest,
+    session: requests.Session,
+    timings: RequestTimings | None = None,
+) -> requests.Response:
+    """Performs the HTTP exchange, resending it as the request's retry policy allows.
+
+    Touches neither the database nor the Frappe request context, so it is safe to
+    call from any thread. The time each phase took is recorded in `timings`.
+    """
+    timings = timings or RequestTimings()
+    started = time.perf_counter()
+    timings.queue_wait = (started - timings.queued_at) * 1000
+    headers = dict(request.headers)
+
+    def send() -> requests.Response:
+        if request.method == "GET":
+            return session.get(
+                request.url,
+                headers=headers,
+                params=request.payload,
+                timeout=REQUEST_TIMEOUT,
+            )
+
+        return session.request(
+            request.method,
+            request.url,
+            json=request.payload,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+        )
+
+    try:
+        with measure_connect_time(timings):
+            response = send_with_retries(
+                send, request.method, request.retry_policy, request.request_description
+            )
+    finally:
+        timings.total = elapsed_ms(started)
+
+    # Up to the response headers of the last attempt. The body is read after
+    timings.time_to_first_byte = response.elapsed.total_seconds() * 1000
+
+    return response
+
+
+def refresh_token(request: RemoteRequest) -> str:
+    """Fetch a new token to replace the one the server rejected."""
+    rejected_token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+
+    try:
+        if request.settings_name:
+            return get_access_token(
+                request.settings_name, rejected_token=rejected_token
+            )
+
+        settings = update_navari_settings_with_token(request.document_name)
+
+        if settings:
+            return settings.access_token
+
+        frappe.throw(
+            "Failed to refresh token",
+            frappe.AuthenticationError,
+        )
+    except requests.exceptions.RequestException as error:
+        frappe.throw(f"Error refreshing token: {error}", frappe.AuthenticationError)
+
+
 class EndpointsBuilder(BaseEndpointsBuilder):
     """
     Base Endpoints Builder class.
-    This class harbours common functionalities when communicating with etims servers
+    This class harbours common functionalities when communicating with etims servers.
+
+    Kept for callers that configure a request through properties. Every call is
+    converted to a RemoteRequest and run by a RequestExecutor; prefer those directly,
+    as a builder instance must not be shared between concurrent calls.
     """
 
     def __init__(self) -> None:
         super().__init__()
         self._url: str | None = None
+        self._route_path: str | None = None
         self._request_description: str | None = None
         self._payload: dict | None = None
         self._headers: dict | None = None
@@ -157,36 +591,13 @@ class EndpointsBuilder(BaseEndpointsBuilder):
     ) -> None:
         self._error_callback_handler = callback
 
-    def refresh_token(self, document_name: str) -> str:
-        """Fetch a new token and update the headers."""
-        try:
-            settings = update_navari_settings_with_token(document_name)
-
-            if settings:
-                new_token = settings.access_token
-                self._headers["Authorization"] = f"Bearer {new_token}"
-                return new_token
-            else:
-                frappe.throw(
-                    "Failed to refresh token",
-                    frappe.AuthenticationError,
-                )
-        except requests.exceptions.RequestException as error:
-            frappe.throw(f"Error refreshing token: {error}", frappe.AuthenticationError)
-
-    def make_remote_call(
+    def build_request(
         self,
         doctype: Document | str | None = None,
         document_name: str | None = None,
-        retrying: bool = False,
-    ) -> str | None:
-        """Handles communication to Slade360 servers."""
-        if (
-            self._url is None
-            or self._headers is None
-            or self._method is None
-            or self._success_callback_handler is None
-        ):
+    ) -> RemoteRequest:
+        """Snapshot the builder's current configuration as a RemoteRequest"""
+        if self._headers is None:
             frappe.throw(
                 """Please ensure all required parameters (URL, headers, method, success, and error callbacks) are set.""",
                 frappe.MandatoryError,
@@ -194,106 +605,35 @@ class EndpointsBuilder(BaseEndpointsBuilder):
                 is_minimizable=True,
             )
 
-        self.doctype, self.document_name = doctype, document_name
-        parsed_url = parse.urlparse(self._url)
-        route_path = f"/{parsed_url.path.split('/')[-1]}"
-
-        if not retrying:
-            self.integration_request = create_request_log(
-                data=self._payload,
-                request_description=self._request_description,
-                is_remote_request=True,
-                service_name=self._request_description,
-                request_headers=self._headers,
-                url=self._url,
-                reference_docname=document_name,
-                reference_doctype=doctype,
-            )
-
-        try:
-            if self._method == "POST":
-                response = requests.post(
-                    self._url, json=self._payload, headers=self._headers
-                )
-            elif self._method == "GET":
-                # self._payload["page_size"] = 15000
-                response = requests.get(
-                    self._url, headers=self._headers, params=self._payload
-                )
-
-            elif self._method == "PATCH":
-                patch_id = self._payload.pop("id", None)
-                if patch_id and f"/{patch_id}/" not in self._url:
-                    self._url = f"{self._url.rstrip('/')}/{patch_id}/"
-                response = requests.patch(
-                    self._url, json=self._payload, headers=self._headers
-                )
-            elif self._method == "PUT":
-                put_id = self._payload.pop("id", None)
-                if put_id and f"/{put_id}/" not in self._url:
-                    self._url = f"{self._url.rstrip('/')}/{put_id}/"
-                response = requests.put(
-                    self._url, json=self._payload, headers=self._headers
-                )
-
-            response_data = get_response_data(response)
-            update_last_request_date(datetime.now(), self._route_path)
-
-            if response.status_code in {200, 201}:
-                self._success_callback_handler(
-                    response=response_data, document_name=document_name, doctype=doctype
-                )
-
-                current_page = response_data.get("current_page", None)
-                total_pages = response_data.get("total_pages", 0)
+        return RemoteRequest(
+            url=self._url,
+            method=self._method,
+            headers=self._headers,
+            payload=self._payload,
+            success_callback=self._success_callback_handler,
+            error_callback=self._error_callback_handler,
+            route_path=self._route_path,
+            request_description=self._request_description,
+            doctype=doctype,
+            document_name=document_name,
+        )
 
-                update_integration_request(
-                    self.integration_request.name,
-                    status="Completed",
-                    output=str(response_data),
-                    error=None,
-                    request_description=(
-                        f"Page {current_page} of {total_pages}"
-                        if int(total_pages) > 1
-                        else None
-                    ),
-                )
-            elif response.status_code == 401 and not retrying:
-                self.refresh_token(document_name)
-                self.make_remote_call(doctype, document_name, retrying=True)
-            else:
-                if isinstance(response_data, str):
-                    error = response_data
-                elif isinstance(response_data, list):
-                    error = response_data[0]
-                else:
-                    error = str(response_data)
+    def make_remote_call(
+        self,
+        doctype: Document | str | None = None,
+        document_name: str | None = None,
+    ) -> Optional[Union[dict, str, bytes, list]]:
+        """Handles communication to Slade360 servers.
 
-                update_integration_request(
-                    self.integration_request.name,
-                    status="Failed",
-                    output=None,
-                    error=error,
-                )
-                on_slade_error(
-                    response_data,
-                    url=route_path,
-                    doctype=doctype,
-                    document_name=document_name,
-                )
-                if self._error_callback_handler:
-                    self._error_callback_handler(
-                        response_data,
-                        url=route_path,
-                        doctype=doctype,
-                        document_name=document_name,
-                    )
-            return response_data
+        Args:
+            doctype (Document | str | None, optional): The doctype making the request. Defaults to None.
+            document_name (str | None, optional): The document making the request. Defaults to None.
+        """
+        self.doctype, self.document_name = doctype, document_name
 
-        except requests.exceptions.RequestException as error:
-            self.error = error
-            self.notify()
-            return None
+        return RequestExecutor(self._observers).execute(
+            self.build_request(doctype, document_name)
+        )
 
 
 def get_response_data(response: requests.Response) -> Optional[Union[dict, str, bytes]]:
@@ -313,40 +653,3 @@ def get_response_data(response: requests.Response) -> Optional[Union[dict, str,
         return response.content
 
     return None
-
-
-def update_integration_request(
-    integration_request: str,
-    status: Literal["Completed", "Failed"],
-    output: str | None = None,
-    error: str | None = None,
-    request_description: str | None = None,
-) -> None:
-    """Updates the given integration request record.
-
-    Args:
-        integration_request (str): The provided integration request.
-        status (Literal["Completed", "Failed"]): The new status of the request.
-        output (str | None, optional): The response message, if any. Defaults to None.
-        error (str | None, optional): The error message, if any. Defaults to None.
-    """
-    doc = frappe.get_doc("Integration Request", integration_request, for_update=True)
-
-    if error:
-        doc.error = error if doc.error is None or "null" else (doc.error + "\n" + error)
-
-    if output:
-        doc.output = (
-            output if doc.output is None or "null" else (doc.output + "\n" + output)
-        )
-
-    if request_description:
-        doc.request_description = (
-            request_description
-            if doc.request_description is None
-            else (doc.request_description + " - " + request_description)
-        )
-
-    doc.status = status
-
-    doc.save(ignore_permissions=True)
@@ -1,5 +1,6 @@
 import asyncio
 import json
+from typing import Callable
 
 import aiohttp
 
@@ -7,6 +8,11 @@ import frappe
 import frappe.defaults
 from frappe.model.document import Document
 
+from ..background_tasks.task_response_handlers import (
+    operation_types_search_on_success,
+    uom_category_search_on_success,
+    uom_search_on_success,
+)
 from ..doctype.doctype_names_mapping import (
     COUNTRIES_DOCTYPE_NAME,
     ITEM_CLASSIFICATIONS_DOCTYPE_NAME,
@@ -19,14 +25,14 @@ from ..doctype.doctype_names_mapping import (
     UOM_CATEGORY_DOCTYPE_NAME,
     USER_DOCTYPE_NAME,
 )
+from ..logger import etims_logger
 from ..utils import (
     generate_custom_item_code_etims,
     get_link_value,
     get_settings,
     make_get_request,
 )
-from .api_builder import EndpointsBuilder
-from .process_request import process_request
+from .process_request import process_request, process_requests
 from .remote_response_status_handlers import (
     customer_branch_details_submission_on_success,
     customer_search_on_success,
@@ -48,13 +54,6 @@ from .remote_response_status_handlers import (
     user_details_submission_on_success,
 )
 
-endpoints_builder = EndpointsBuilder()
-from ..background_tasks.task_response_handlers import (
-    operation_types_search_on_success,
-    uom_category_search_on_success,
-    uom_search_on_success,
-)
-
 
 @frappe.whitelist()
 def bulk_submit_sales_invoices(docs_list: str) -> None:
@@ -76,11 +75,11 @@ def bulk_submit_sales_invoices(docs_list: str) -> None:
 def bulk_register_item(docs_list: str) -> None:
     data = json.loads(docs_list)
 
-    for record in data:
-        is_registered = frappe.db.get_value("Item", record, "custom_sent_to_slade")
-        if is_registered == 0:
-            item_name = frappe.db.get_value("Item", record, "name")
-            frappe.enqueue(perform_item_registration, item_name=str(item_name))
+    unregistered_items = frappe.get_all(
+        "Item", filters={"name": ["in", data], "custom_sent_to_slade": 0}, pluck="name"
+    )
+    if unregistered_items:
+        frappe.enqueue(register_items, item_names=unregistered_items, queue="long")
 
 
 @frappe.whitelist()
@@ -123,6 +122,46 @@ def perform_customer_search(request_data: str) -> None:
 
 @frappe.whitelist()
 def perform_item_registration(item_name: str) -> dict | None:
+    registration = build_item_registration(item_name)
+
+    if not registration:
+        return
+
+    request_data, request_method = registration
+    process_request(
+        request_data,
+        "ItemsSearchReq",
+        item_registration_on_success,
+        request_method=request_method,
+        doctype="Item",
+    )
+
+
+def register_items(item_names: list[str]) -> None:
+    """Registers the items together, up to the route's Max Concurrent Requests at a
+    time. Items missing eTims details are skipped."""
+    payloads = {"POST": [], "PATCH": []}
+
+    for item_name in item_names:
+        registration = build_item_registration(item_name)
+
+        if registration:
+            request_data, request_method = registration
+            payloads[request_method].append(request_data)
+
+    for request_method, method_payloads in payloads.items():
+        process_requests(
+            method_payloads,
+            "ItemsSearchReq",
+            item_registration_on_success,
+            request_method=request_method,
+            doctype="Item",
+        )
+
+
+def build_item_registration(item_name: str) -> tuple[dict, str] | None:
+    """The item's registration payload and request method, None if the item is
+    missing eTims details"""
     item = frappe.get_doc("Item", item_name)
     missing_fields = []
 
@@ -196,21 +235,9 @@ def perform_item_registration(item_name: str) -> dict | None:
 
     if sent_to_slade and custom_slade_id:
         request_data["id"] = custom_slade_id
-        process_request(
-            request_data,
-            "ItemsSearchReq",
-            item_registration_on_success,
-            request_method="PATCH",
-            doctype="Item",
-        )
-    else:
-        process_request(
-            request_data,
-            "ItemsSearchReq",
-            item_registration_on_success,
-            request_method="POST",
-            doctype="Item",
-        )
+        return request_data, "PATCH"
+
+    return request_data, "POST"
 
 
 @frappe.whitelist()
@@ -826,7 +853,10 @@ def initialize_device(request_data: str) -> None:
 
 @frappe.whitelist()
 def get_invoice_details(
-    id: str, document_name: str, invoice_type: str = "Sales Invoice"
+    id: str,
+    document_name: str,
+    invoice_type: str = "Sales Invoice",
+    error_callback: Callable | None = None,
 ) -> None:
     request_data = {"id": id, "document_name": document_name}
     invoice = frappe.get_doc(invoice_type, document_name)
@@ -838,9 +868,69 @@ def get_invoice_details(
         route_key,
         update_invoice_info,
         doctype=invoice_type,
+        error_callback=error_callback,
     )
 
 
+def get_invoices_details(
+    ids: list[str],
+    invoice_type: str = "Sales Invoice",
+    is_return: bool = False,
+    error_callback: Callable | None = None,
+) -> None:
+    """Fetches the details of many invoices, all returns or all not, in one request
+    for the first page of the listing, filtered by id.
+
+    The invoices not on that page are fetched one by one, e.g. should the server
+    ignore the filter and list other invoices, as paging through every invoice on
+    the server would take far longer. Batches should therefore fit on a page.
+    """
+    if is_return:
+        route_key, single_route_key = "SalesCreditNoteSaveReq", "SalesCreditNoteSaveReq"
+    else:
+        route_key, single_route_key = "TrnsSalesSaveWrReq", "TrnsSalesSearchReq"
+
+    requested, listed = set(ids), set()
+
+    def handle_page(response: dict, **kwargs) -> None:
+        invoices = response.get("results", [response]) if response else []
+        listed.update(invoice.get("id") for invoice in invoices)
+
+        # Other invoices listed by a server ignoring the filter are left alone
+        update_invoice_info(
+            {"results": [row for row in invoices if row.get("id") in requested]},
+            **kwargs,
+        )
+
+    process_request(
+        {"id__in": ",".join(ids)},
+        route_key,
+        handle_page,
+        doctype=invoice_type,
+        error_callback=error_callback,
+        follow_pages=False,
+    )
+
+    if not listed:
+        # The listing failed, which was reported, or eTims has none of the invoices
+        return
+
+    if listed - requested:
+        etims_logger.warning(
+            "%s does not filter by id__in, fetching invoices one by one", route_key
+        )
+
+    for invoice_id in ids:
+        if invoice_id not in listed:
+            process_request(
+                {"id": invoice_id},
+                single_route_key,
+                update_invoice_info,
+                doctype=invoice_type,
+                error_callback=error_callback,
+            )
+
+
 @frappe.whitelist()
 def save_uom_category_details(name: str) -> dict | None:
     item = frappe.get_doc(UOM_CATEGORY_DOCTYPE_NAME, name)
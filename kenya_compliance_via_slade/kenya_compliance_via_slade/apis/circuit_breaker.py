@@ -0,0 +1,158 @@
+"""Per-route circuit breakers shared by all workers through Redis"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Literal
+
+import frappe
+
+from ..logger import etims_logger
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_FAILURE_WINDOW = 60  # seconds
+DEFAULT_RESET_TIMEOUT = 30  # seconds
+
+# Circuits nobody has probed for this long are forgotten, i.e. closed
+STATE_TTL = 86400  # seconds
+
+CircuitState = Literal["Closed", "Open", "Half-Open"]
+
+
+class CircuitOpenError(frappe.ValidationError):
+    """Raised instead of sending a request to a route whose circuit is open"""
+
+
+@dataclass(frozen=True)
+class CircuitBreaker:
+    """Stops requests to a Slade360 route after repeated failures.
+
+    The circuit opens once `failure_threshold` failures happen within
+    `failure_window` seconds. Requests then fail immediately with CircuitOpenError.
+    After `reset_timeout` seconds the circuit is half-open: a single request is let
+    through as a probe, and closes the circuit if it succeeds or reopens it if not.
+
+    The state lives in Redis, so every worker sees the same circuit.
+    """
+
+    route_path: str
+    failure_threshold: int = DEFAULT_FAILURE_THRESHOLD
+    failure_window: int = DEFAULT_FAILURE_WINDOW
+    reset_timeout: int = DEFAULT_RESET_TIMEOUT
+
+    def allow_request(self) -> bool:
+        opened_at = get_opened_at(self.route_path)
+
+        if opened_at is None:
+            return True
+
+        if time.time() - opened_at < self.reset_timeout:
+            return False
+
+        # Half-open: whoever sets the probe key first sends the probe
+        return bool(
+            frappe.cache.set(
+                get_key(self.route_path, "probe"),
+                1,
+                nx=True,
+                ex=max(int(self.reset_timeout), 1),
+            )
+        )
+
+    def record_success(self) -> None:
+        frappe.cache.delete(
+            get_key(self.route_path, "opened_at"),
+            get_key(self.route_path, "failures"),
+            get_key(self.route_path, "probe"),
+        )
+
+    def record_failure(self) -> None:
+        if get_opened_at(self.route_path) is not None:
+            # The half-open probe failed
+            self.open()
+            return
+
+        failures_key = get_key(self.route_path, "failures")
+        failures = frappe.cache.incr(failures_key)
+
+        if failures == 1:
+            frappe.cache.expire(failures_key, max(int(self.failure_window), 1))
+
+        if failures >= self.failure_threshold:
+            self.open()
+
+    def open(self) -> None:
+        frappe.cache.set(
+            get_key(self.route_path, "opened_at"), time.time(), ex=STATE_TTL
+        )
+        frappe.cache.delete(
+            get_key(self.route_path, "failures"), get_key(self.route_path, "probe")
+        )
+        etims_logger.warning(
+            "Circuit for %s opened. Requests fail fast for %ss",
+            self.route_path,
+            self.reset_timeout,
+        )
+
+    def get_state(self) -> CircuitState:
+        opened_at = get_opened_at(self.route_path)
+
+        if opened_at is None:
+            return "Closed"
+
+        if time.time() - opened_at < self.reset_timeout:
+            return "Open"
+
+        return "Half-Open"
+
+
+def get_key(route_path: str, name: str) -> str:
+    return frappe.cache.make_key(f"etims_circuit|{route_path}|{name}")
+
+
+def get_opened_at(route_path: str) -> float | None:
+    opened_at = frappe.cache.get(get_key(route_path, "opened_at"))
+
+    return float(opened_at) if opened_at is not None else None
+
+
+def get_recent_failures(route_path: str) -> int:
+    return int(frappe.cache.get(get_key(route_path, "failures")) or 0)
+
+
+def get_circuit_breaker(
+    route_path: str, settings: dict | None
+) -> CircuitBreaker | None:
+    """Builds the circuit breaker for a route from the active settings record.
+
+    Returns None if circuit breaking is turned off.
+    """
+    if not route_path or not settings or not settings.get("enable_circuit_breaker"):
+        return None
+
+    return CircuitBreaker(
+        route_path=route_path,
+        failure_threshold=max(
+            int(settings.get("circuit_failure_threshold") or DEFAULT_FAILURE_THRESHOLD),
+            1,
+        ),
+        failure_window=int(
+            settings.get("circuit_failure_window") or DEFAULT_FAILURE_WINDOW
+        ),
+        reset_timeout=int(
+            settings.get("circuit_reset_timeout") or DEFAULT_RESET_TIMEOUT
+        ),
+    )
+
+
+@frappe.whitelist()
+def reset_circuits(route_paths: str | list[str]) -> None:
+    """Closes the given circuits so requests are sent again immediately"""
+    frappe.only_for("System Manager")
+
+    if isinstance(route_paths, str):
+        route_paths = frappe.parse_json(route_paths)
+
+    for route_path in route_paths:
+        CircuitBreaker(route_path).record_success()
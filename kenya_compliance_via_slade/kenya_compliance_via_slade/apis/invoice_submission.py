@@ -0,0 +1,504 @@
+"""Submission of sales invoices to eTims as a durable pipeline of stages.
+
+Each submitted invoice has a Navari eTims Invoice Submission record holding the stage
+it has reached, when it is next due and the last error. The stages run in order:
+
+- Invoice: the invoice itself, which gives it its Slade360 id
+- Lines: each of its lines
+- Transition: the transition to approval
+- Sign: signing by eTims
+- Details: fetching the signed invoice's SCU details and QR code
+
+Each stage's success handler moves the record to the next stage. A stage that fails
+is retried later, with a growing delay, until the maximum number of attempts set on
+the settings; the record then shows as Failed with the error. Due submissions are
+found with one query on the indexed next attempt time, so work is never rediscovered
+from the invoices' own fields.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Callable, Literal
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.utils import now_datetime
+
+from ..doctype.doctype_names_mapping import INVOICE_SUBMISSION_DOCTYPE_NAME
+from ..logger import etims_logger
+from ..utils import get_settings
+
+Stage = Literal["Invoice", "Lines", "Transition", "Sign", "Details", "Completed"]
+STAGES: tuple[Stage, ...] = (
+    "Invoice",
+    "Lines",
+    "Transition",
+    "Sign",
+    "Details",
+    "Completed",
+)
+
+BATCH_SIZE = 20
+# A claimed submission whose worker died is picked up again after this long
+CLAIM_TIMEOUT = timedelta(minutes=10)
+RETRY_DELAY = timedelta(minutes=5)  # Doubled after every failed attempt
+MAX_RETRY_DELAY = timedelta(hours=6)
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_SUBMISSION_TIMEFRAME = 86400  # seconds
+# Used when the site has workers for it (`workers` in common_site_config.json), so
+# submissions are not held up behind long-running syncs
+SUBMISSION_QUEUE = "etims"
+EXPIRED_ERROR = "Not completed within the Sales Information Submission Timeframe"
+
+
+def start_invoice_submission(doc: Any, invoice_type: str) -> str | None:
+    """Records the invoice's submission, or resumes an earlier one. A completed
+    submission is left as it is.
+
+    The invoice itself is sent straight away and the other stages are left to a
+    background job, as the submission is part of saving the invoice. With the
+    settings' Sales Submission on Submit set to Background, the whole submission
+    runs in the background job, which starts once the invoice is saved.
+    """
+    submission = frappe.db.get_value(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        {"invoice_type": invoice_type, "invoice": doc.name},
+        ["name", "stage"],
+        as_dict=True,
+    )
+    name = submission.name if submission else None
+
+    if submission and submission.stage == "Completed":
+        return name
+
+    if name:
+        frappe.db.set_value(
+            INVOICE_SUBMISSION_DOCTYPE_NAME,
+            name,
+            {"status": "Pending", "attempts": 0, "next_attempt_at": now_datetime()},
+        )
+    else:
+        name = (
+            frappe.get_doc(
+                {
+                    "doctype": INVOICE_SUBMISSION_DOCTYPE_NAME,
+                    "invoice_type": invoice_type,
+                    "invoice": doc.name,
+                    "stage": get_resume_stage(doc),
+                    "next_attempt_at": now_datetime(),
+                }
+            )
+            .insert(ignore_permissions=True)
+            .name
+        )
+
+    settings = get_settings(doc.get("company"), doc.get("branch")) or {}
+    in_background = settings.get("sales_submission_on_submit") == "Background"
+
+    if in_background or advance_invoice_submission(name, max_stages=1, commit=False):
+        enqueue_invoice_submission(name)
+
+    return name
+
+
+def get_resume_stage(doc: Any) -> Stage:
+    """The first stage an invoice has not completed, judged from its own fields"""
+    if not doc.get("custom_slade_id"):
+        return "Invoice"
+    if doc.get("custom_successfully_submitted"):
+        return "Completed" if doc.get("custom_qr_code") else "Details"
+    if doc.get("custom_transition_successful"):
+        return "Sign"
+
+    return "Lines"
+
+
+def enqueue_invoice_submission(name: str) -> None:
+    """Runs the submission's remaining stages in the background, once committed"""
+    # Claimed by the job, so the scheduled worker only picks it up if the job is lost
+    frappe.db.set_value(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        name,
+        "next_attempt_at",
+        now_datetime() + CLAIM_TIMEOUT,
+    )
+    frappe.enqueue(
+        advance_invoice_submission,
+        queue=get_submission_queue(),
+        name=name,
+        job_id=f"etims_invoice_submission|{name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+    )
+
+
+@frappe.whitelist()
+def retry_invoice_submission(name: str) -> None:
+    """Gives a failed submission a fresh set of attempts, starting now"""
+    frappe.only_for("System Manager")
+    frappe.db.set_value(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        name,
+        {"status": "Pending", "attempts": 0, "next_attempt_at": now_datetime()},
+    )
+    enqueue_invoice_submission(name)
+
+
+def get_submission_queue() -> str:
+    if SUBMISSION_QUEUE in (frappe.conf.get("workers") or {}):
+        return SUBMISSION_QUEUE
+
+    return "long"
+
+
+def complete_stage(invoice_type: str, invoice: str, stage: Stage) -> None:
+    """Moves the invoice's submission past `stage`. Called by the stages' handlers.
+
+    Does nothing if the invoice has no submission at that stage, e.g. when a stage
+    was run by hand.
+    """
+    complete_stages(invoice_type, [invoice], stage)
+
+
+def complete_stages(invoice_type: str, invoices: list[str], stage: Stage) -> None:
+    """Moves the submissions of the invoices that are at `stage` past it"""
+    names = frappe.get_all(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        filters={
+            "invoice_type": invoice_type,
+            "invoice": ["in", invoices],
+            "stage": stage,
+        },
+        pluck="name",
+    )
+
+    if not names:
+        return
+
+    next_stage = STAGES[STAGES.index(stage) + 1]
+    completed = next_stage == "Completed"
+
+    frappe.db.set_value(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        {"name": ["in", names]},
+        {
+            "stage": next_stage,
+            "status": "Completed" if completed else "Pending",
+            "attempts": 0,
+            "last_error": None,
+            # Whoever completed the stage carries on with the next one, and if it
+            # does not, the scheduled worker does once the claim expires
+            "next_attempt_at": None if completed else now_datetime() + CLAIM_TIMEOUT,
+        },
+    )
+
+
+def submit_due_invoices() -> None:
+    """Advances every submission that is due, a batch at a time. Runs on a schedule.
+
+    The details of the batch's signed invoices are fetched together, a request per
+    invoice type and route rather than per invoice. Submissions the submission
+    timeframe has run out for are marked Failed first.
+    """
+    expire_submissions()
+
+    while submissions := claim_due_submissions():
+        fetch_details_together(
+            [submission for submission in submissions if submission.stage == "Details"]
+        )
+        frappe.db.commit()
+
+        for submission in submissions:
+            if submission.stage != "Details":
+                advance_invoice_submission(submission.name)
+
+
+def get_submission_timeframe() -> timedelta:
+    """How long after an invoice's submission the scheduled worker keeps at it"""
+    timeframe = (get_settings() or {}).get("sales_information_submission_timeframe")
+
+    return timedelta(seconds=timeframe or DEFAULT_SUBMISSION_TIMEFRAME)
+
+
+def expire_submissions() -> None:
+    """Fails the pending submissions started before the submission timeframe, which
+    the scheduled worker no longer picks up"""
+    now = now_datetime()
+    expired = frappe.get_all(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        filters={
+            "status": "Pending",
+            "next_attempt_at": ["<=", now],
+            "creation": ["<", now - get_submission_timeframe()],
+        },
+        fields=["name", "last_error"],
+    )
+
+    if not expired:
+        return
+
+    for submission in expired:
+        errors = [EXPIRED_ERROR, submission.last_error]
+        frappe.db.set_value(
+            INVOICE_SUBMISSION_DOCTYPE_NAME,
+            submission.name,
+            {
+                "status": "Failed",
+                "next_attempt_at": None,
+                "last_error": "\n".join(error for error in errors if error),
+            },
+        )
+
+    etims_logger.warning(
+        "%s invoice submissions were not completed within the submission timeframe "
+        "and were marked Failed: %s",
+        len(expired),
+        ", ".join(submission.name for submission in expired),
+    )
+    frappe.db.commit()
+
+
+def claim_due_submissions() -> list[frappe._dict]:
+    """Takes the next batch of due submissions started within the submission
+    timeframe, so other workers skip them"""
+    Submission = DocType(INVOICE_SUBMISSION_DOCTYPE_NAME)
+    now = now_datetime()
+
+    submissions = (
+        frappe.qb.from_(Submission)
+        .select(
+            Submission.name,
+            Submission.invoice_type,
+            Submission.invoice,
+            Submission.stage,
+            Submission.attempts,
+        )
+        .where(Submission.next_attempt_at <= now)
+        .where(Submission.creation >= now - get_submission_timeframe())
+        .orderby(Submission.next_attempt_at)
+        .limit(BATCH_SIZE)
+        .for_update(skip_locked=True)
+    ).run(as_dict=True)
+
+    if submissions:
+        (
+            frappe.qb.update(Submission)
+            .set(Submission.next_attempt_at, now + CLAIM_TIMEOUT)
+            .where(Submission.name.isin([row.name for row in submissions]))
+        ).run()
+
+    frappe.db.commit()
+
+    return submissions
+
+
+def fetch_details_together(submissions: list[frappe._dict]) -> None:
+    """Runs the Details stage of the submissions with as few requests as possible"""
+    from .apis import get_invoices_details
+
+    for invoice_type in {submission.invoice_type for submission in submissions}:
+        of_type = [row for row in submissions if row.invoice_type == invoice_type]
+        invoices = frappe.get_all(
+            invoice_type,
+            filters={"name": ["in", [row.invoice for row in of_type]]},
+            fields=["name", "custom_slade_id", "is_return"],
+        )
+        errors: list[Any] = []
+
+        def on_error(response: Any, **kwargs: Any) -> None:
+            errors.append(response)
+
+        for is_return in (0, 1):
+            slade_ids = [
+                invoice.custom_slade_id
+                for invoice in invoices
+                if invoice.is_return == is_return and invoice.custom_slade_id
+            ]
+
+            try:
+                if slade_ids:
+                    get_invoices_details(slade_ids, invoice_type, is_return, on_error)
+            except Exception as error:
+                etims_logger.exception("Fetching %s details failed", invoice_type)
+                errors.append(error)
+
+        completed = set(
+            frappe.get_all(
+                INVOICE_SUBMISSION_DOCTYPE_NAME,
+                filters={
+                    "name": ["in", [row.name for row in of_type]],
+                    "stage": "Completed",
+                },
+                pluck="name",
+            )
+        )
+
+        for submission in of_type:
+            if submission.name not in completed:
+                record_failure(submission, errors)
+
+
+def advance_invoice_submission(
+    name: str, max_stages: int | None = None, commit: bool = True
+) -> bool:
+    """Runs the submission's stages in order until one fails or all are done.
+
+    With `commit`, each completed stage is committed before the next one starts, so
+    the submission resumes after the last completed stage if the worker dies.
+
+    Returns whether stages are left to run now, i.e. `max_stages` were completed and
+    more remain.
+    """
+    stages_run = 0
+
+    while True:
+        submission = frappe.db.get_value(
+            INVOICE_SUBMISSION_DOCTYPE_NAME,
+            name,
+            ["name", "invoice_type", "invoice", "stage", "status", "attempts"],
+            as_dict=True,
+        )
+
+        if not submission or submission.status != "Pending":
+            return False
+
+        if max_stages is not None and stages_run >= max_stages:
+            return True
+
+        completed = run_stage(submission)
+        stages_run += 1
+
+        if commit:
+            frappe.db.commit()
+
+        if not completed:
+            return False
+
+
+def run_stage(submission: frappe._dict) -> bool:
+    """Runs the submission's current stage, recording the failure if it did not
+    complete"""
+    errors: list[Any] = []
+
+    def on_error(response: Any, **kwargs: Any) -> None:
+        errors.append(response)
+
+    try:
+        STAGE_RUNNERS[submission.stage](submission, on_error)
+    except Exception as error:
+        etims_logger.exception(
+            "%s stage of %s %s failed",
+            submission.stage,
+            submission.invoice_type,
+            submission.invoice,
+        )
+        errors.append(error)
+
+    stage = frappe.db.get_value(
+        INVOICE_SUBMISSION_DOCTYPE_NAME, submission.name, "stage"
+    )
+
+    if stage != submission.stage:
+        return True
+
+    record_failure(submission, errors)
+
+    return False
+
+
+def record_failure(submission: frappe._dict, errors: list[Any]) -> None:
+    attempts = (submission.attempts or 0) + 1
+    max_attempts = (get_settings() or {}).get(
+        "maximum_sales_information_submission_attempts"
+    ) or DEFAULT_MAX_ATTEMPTS
+    failed = attempts >= max_attempts
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+    frappe.db.set_value(
+        INVOICE_SUBMISSION_DOCTYPE_NAME,
+        submission.name,
+        {
+            "attempts": attempts,
+            "status": "Failed" if failed else "Pending",
+            "next_attempt_at": None if failed else now_datetime() + delay,
+            "last_error": "\n".join(str(error) for error in errors)
+            or f"eTims did not confirm the {submission.stage} stage",
+        },
+    )
+    frappe.db.set_value(
+        submission.invoice_type,
+        submission.invoice,
+        "custom_submission_attempts",
+        attempts,
+        update_modified=False,
+    )
+
+
+def send_invoice(submission: frappe._dict, on_error: Callable) -> None:
+    from ..overrides.server.shared_overrides import send_invoice_information
+
+    send_invoice_information(
+        frappe.get_doc(submission.invoice_type, submission.invoice),
+        submission.invoice_type,
+        error_callback=on_error,
+    )
+
+
+def send_invoice_lines(submission: frappe._dict, on_error: Callable) -> None:
+    from .remote_response_status_handlers import process_invoice_items
+
+    process_invoice_items(
+        submission.invoice,
+        submission.invoice_type,
+        get_invoice_slade_id(submission),
+        error_callback=on_error,
+    )
+
+
+def transition_invoice(submission: frappe._dict, on_error: Callable) -> None:
+    from .remote_response_status_handlers import process_sales_transition
+
+    process_sales_transition(
+        submission.invoice,
+        submission.invoice_type,
+        get_invoice_slade_id(submission),
+        error_callback=on_error,
+    )
+
+
+def sign_invoice(submission: frappe._dict, on_error: Callable) -> None:
+    from .remote_response_status_handlers import process_sales_sign
+
+    process_sales_sign(
+        submission.invoice,
+        submission.invoice_type,
+        get_invoice_slade_id(submission),
+        error_callback=on_error,
+    )
+
+
+def fetch_invoice_details(submission: frappe._dict, on_error: Callable) -> None:
+    from .apis import get_invoice_details
+
+    get_invoice_details(
+        get_invoice_slade_id(submission),
+        submission.invoice,
+        submission.invoice_type,
+        error_callback=on_error,
+    )
+
+
+def get_invoice_slade_id(submission: frappe._dict) -> str:
+    return frappe.db.get_value(
+        submission.invoice_type, submission.invoice, "custom_slade_id"
+    )
+
+
+STAGE_RUNNERS: dict[Stage, Callable[[frappe._dict, Callable], None]] = {
+    "Invoice": send_invoice,
+    "Lines": send_invoice_lines,
+    "Transition": transition_invoice,
+    "Sign": sign_invoice,
+    "Details": fetch_invoice_details,
+}
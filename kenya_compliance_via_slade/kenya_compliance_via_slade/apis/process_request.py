@@ -1,21 +1,29 @@
 from typing import Callable
+from urllib import parse
 
 import frappe
 import frappe.defaults
 
 from ..doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
+from ..logger import etims_logger
 from ..utils import (
     build_headers,
-    get_link_value,
+    get_route_page_concurrency,
     get_route_path,
+    get_route_request_concurrency,
     get_server_url,
     get_settings,
+    has_active_settings,
+    is_route_retry_disabled,
     parse_request_data,
     process_dynamic_url,
 )
-from .api_builder import EndpointsBuilder
+from .api_builder import RemoteRequest, request_executor
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from .retry_policy import RetryPolicy, get_retry_policy
 
-endpoints_builder = EndpointsBuilder()
+# Pages fetched concurrently are requested in windows of this many per worker
+PAGE_WINDOW = 2
 
 
 def process_request(
@@ -25,9 +33,15 @@ def process_request(
     request_method: str = "GET",
     doctype: str = SETTINGS_DOCTYPE_NAME,
     error_callback: Callable = None,
+    url: str | None = None,
+    follow_pages: bool = True,
 ) -> str:
-    """Reusable function to process requests with common logic."""
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    """Reusable function to process requests with common logic.
+
+    `url` is requested instead of the route's own, e.g. a later page of a listing.
+    Without `follow_pages`, only the first page of a paginated listing is fetched.
+    """
+    if not has_active_settings():
         return
 
     data = parse_request_data(request_data)
@@ -38,11 +52,11 @@ def process_request(
     server_url = get_server_url(company_name, branch_id)
     route_path, _ = get_route_path(route_key, "VSCU Slade 360")
     dynamic_route_path = process_dynamic_url(route_path, request_data)
-    url = f"{server_url}{dynamic_route_path}"
-    if request_method != "GET":
-        settings = get_settings(company_name, branch_id)
-        updates = add_organisation_branch_department(settings)
-        # data.update(updates)
+    url = url or f"{server_url}{dynamic_route_path}"
+    settings = get_settings(company_name, branch_id)
+    retry_policy = get_retry_policy(
+        settings, is_route_retry_disabled(route_key, "VSCU Slade 360")
+    )
 
     if headers and server_url and route_path:
         return execute_request(
@@ -56,58 +70,111 @@ def process_request(
             doctype,
             document_name,
             error_callback,
+            retry_policy,
+            get_circuit_breaker(route_path, settings),
+            settings.get("name") if settings else None,
+            follow_pages,
         )
     else:
         return f"Failed to process {route_key}. Missing required configuration."
 
 
-def add_organisation_branch_department(settings: dict) -> dict:
-    organisation = settings.get("company")
-    branch = settings.get("bhfid")
-    source_organisation = settings.get("department")
+def process_requests(
+    request_data: list[dict],
+    route_key: str,
+    handler_function: Callable,
+    request_method: str = "POST",
+    doctype: str = SETTINGS_DOCTYPE_NAME,
+    error_callback: Callable = None,
+) -> str:
+    """Sends one request per payload to the same route, e.g. an invoice's lines.
+
+    Up to the route's Max Concurrent Requests are in flight at a time. Responses are
+    processed in the order of the payloads. The payloads must be for the same company
+    and branch.
+    """
+    if not has_active_settings() or not request_data:
+        return
+
+    payloads = [parse_request_data(data) for data in request_data]
+    company_name, branch_id, _ = extract_metadata(dict(payloads[0]))
 
-    result = {}
+    headers = build_headers(company_name, branch_id)
 
-    if organisation:
-        result["organisation"] = get_link_value(
-            "Company", "name", organisation, "custom_slade_id"
-        )
-    if branch:
-        result["branch"] = get_link_value("Branch", "name", branch, "slade_id")
-    if source_organisation:
-        result["source_organisation_unit"] = get_link_value(
-            "Department", "name", source_organisation, "custom_slade_id"
+    server_url = get_server_url(company_name, branch_id)
+    route_path, _ = get_route_path(route_key, "VSCU Slade 360")
+
+    if not (headers and server_url and route_path):
+        return f"Failed to process {route_key}. Missing required configuration."
+
+    settings = get_settings(company_name, branch_id)
+    retry_policy = get_retry_policy(
+        settings, is_route_retry_disabled(route_key, "VSCU Slade 360")
+    )
+    circuit_breaker = get_circuit_breaker(route_path, settings)
+
+    remote_requests = []
+    for payload in payloads:
+        payload.pop("company_name", None)
+        payload.pop("branch_id", None)
+        document_name = payload.pop("document_name", None)
+
+        remote_requests.append(
+            RemoteRequest(
+                url=f"{server_url}{process_dynamic_url(route_path, payload)}",
+                method=request_method,
+                headers=headers,
+                payload=payload,
+                success_callback=handler_function,
+                error_callback=error_callback,
+                route_path=route_path,
+                request_description=route_key,
+                doctype=doctype,
+                document_name=document_name,
+                retry_policy=retry_policy,
+                circuit_breaker=circuit_breaker,
+                settings_name=settings.get("name") if settings else None,
+            )
         )
 
-    return result
+    concurrency = get_route_request_concurrency(route_key, "VSCU Slade 360")
+
+    try:
+        if concurrency > 1:
+            request_executor.execute_concurrently(remote_requests, concurrency)
+        else:
+            for request in remote_requests:
+                request_executor.execute(request)
+    except CircuitOpenError as error:
+        etims_logger.warning("%s skipped: %s", route_key, error)
+        frappe.msgprint(str(error), title="eTims Unavailable", alert=True)
+        return f"{route_key} skipped. {error}"
+
+    return f"{route_key} completed successfully."
 
 
 def extract_metadata(data: dict) -> tuple:
+    """The company, branch and document a request is for. The company and branch
+    default to the user's, else to those of the active settings record the request
+    would be sent with, so no query is needed."""
     if isinstance(data, list) and data:
         first_entry = data[0]
-        company_name = (
-            first_entry.get("company_name", None)
-            or frappe.defaults.get_user_default("Company")
-            or frappe.get_value("Company", {}, "name")
-        )
-        branch_id = (
-            first_entry.get("branch_id", None)
-            or frappe.defaults.get_user_default("Branch")
-            or frappe.get_value("Branch", "name")
-        )
+        company_name = first_entry.get("company_name", None)
+        branch_id = first_entry.get("branch_id", None)
         document_name = first_entry.get("document_name", None)
     else:
-        company_name = (
-            data.pop("company_name", None)
-            or frappe.defaults.get_user_default("Company")
-            or frappe.get_value("Company", {}, "name")
-        )
-        branch_id = (
-            data.pop("branch_id", None)
-            or frappe.defaults.get_user_default("Branch")
-            or frappe.get_value("Branch", "name")
-        )
+        company_name = data.pop("company_name", None)
+        branch_id = data.pop("branch_id", None)
         document_name = data.pop("document_name", None)
+
+    company_name = company_name or frappe.defaults.get_user_default("Company")
+    branch_id = branch_id or frappe.defaults.get_user_default("Branch")
+
+    if not (company_name and branch_id):
+        settings = get_settings(company_name, branch_id) or {}
+        company_name = company_name or settings.get("company")
+        branch_id = branch_id or settings.get("bhfid")
+
     return company_name, branch_id, document_name
 
 
@@ -129,30 +196,106 @@ def execute_request(
     doctype: str,
     document_name: str,
     error_callback: Callable = None,
+    retry_policy: RetryPolicy | None = None,
+    circuit_breaker: CircuitBreaker | None = None,
+    settings_name: str | None = None,
+    follow_pages: bool = True,
 ) -> str:
 
     # Clean data for GET request
     if request_method == "GET":
         clean_data_for_get_request(data)
 
-    while url:
-        endpoints_builder.headers = headers
-        endpoints_builder.url = url
-        endpoints_builder.route_path = route_path
-        endpoints_builder.payload = data
-        endpoints_builder.request_description = route_key
-        endpoints_builder.method = request_method
-        endpoints_builder.success_callback = handler_function
-        endpoints_builder.error_callback = error_callback
-
-        response = endpoints_builder.make_remote_call(
-            doctype=doctype,
-            document_name=document_name,
-        )
+    page_concurrency = (
+        get_route_page_concurrency(route_key, "VSCU Slade 360")
+        if request_method == "GET"
+        else 0
+    )
+
+    request = RemoteRequest(
+        url=url,
+        method=request_method,
+        headers=headers,
+        payload=data,
+        success_callback=handler_function,
+        error_callback=error_callback,
+        route_path=route_path,
+        request_description=route_key,
+        doctype=doctype,
+        document_name=document_name,
+        retry_policy=retry_policy,
+        circuit_breaker=circuit_breaker,
+        settings_name=settings_name,
+    )
 
-        if isinstance(response, dict) and "next" in response:
-            url = response["next"]
+    try:
+        if follow_pages:
+            fetch_all_pages(request, page_concurrency)
         else:
-            url = None
+            request_executor.execute(request)
+    except CircuitOpenError as error:
+        # The document stays unsent and is picked up by the scheduled resubmission
+        etims_logger.warning("%s skipped: %s", route_key, error)
+        frappe.msgprint(str(error), title="eTims Unavailable", alert=True)
+        return f"{route_key} skipped. {error}"
 
     return f"{route_key} completed successfully."
+
+
+def fetch_all_pages(request: RemoteRequest, page_concurrency: int) -> None:
+    """Sends the request, then follows the "next" links of paginated responses"""
+    while request:
+        response = request_executor.execute(request)
+
+        if isinstance(response, dict) and response.get("next"):
+            next_url = response["next"]
+        else:
+            break
+
+        if page_concurrency:
+            page_urls = build_remaining_page_urls(next_url, response)
+
+            if page_urls:
+                # Fetched a few at a time, so only a window of pages is held in memory
+                window = page_concurrency * PAGE_WINDOW
+                for start in range(0, len(page_urls), window):
+                    request_executor.execute_concurrently(
+                        [
+                            request.replace(url=page_url)
+                            for page_url in page_urls[start : start + window]
+                        ],
+                        page_concurrency,
+                    )
+                break
+
+        request = request.replace(url=next_url)
+
+
+def build_remaining_page_urls(next_url: str, response: dict) -> list[str]:
+    """Builds the URLs of all pages after the current one from the "next" link.
+
+    Returns an empty list if the response does not expose page numbers, in which
+    case the pages have to be followed one at a time.
+    """
+    parsed_url = parse.urlparse(next_url)
+    query = parse.parse_qs(parsed_url.query, keep_blank_values=True)
+
+    try:
+        current_page = int(response.get("current_page") or 0)
+        total_pages = int(response.get("total_pages") or 0)
+    except (TypeError, ValueError):
+        return []
+
+    if "page" not in query or not current_page or total_pages <= current_page:
+        return []
+
+    page_urls = []
+    for page in range(current_page + 1, total_pages + 1):
+        query["page"] = [str(page)]
+        page_urls.append(
+            parse.urlunparse(
+                parsed_url._replace(query=parse.urlencode(query, doseq=True))
+            )
+        )
+
+    return page_urls
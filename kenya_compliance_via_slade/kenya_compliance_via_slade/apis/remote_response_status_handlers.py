@@ -1,8 +1,7 @@
 from datetime import datetime
-from io import BytesIO
+from typing import Callable
 
 import deprecation
-import qrcode
 
 import frappe
 
@@ -22,7 +21,9 @@ from ..doctype.doctype_names_mapping import (
     USER_DOCTYPE_NAME,
 )
 from ..handlers import handle_slade_errors
+from ..qr_codes import get_qr_code_image_url
 from ..utils import get_link_value, get_or_create_link
+from .invoice_submission import complete_stage, complete_stages
 
 
 def on_slade_error(
@@ -253,24 +254,23 @@ def sales_information_submission_on_success(
             "custom_slade_id": response.get("id"),
         },
     )
-    frappe.enqueue(
-        "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.remote_response_status_handlers.process_invoice_items",
-        document_name=document_name,
-        doctype=doctype,
-        invoice_slade_id=response.get("id"),
-        queue="long",
-    )
+    complete_stage(doctype, document_name, "Invoice")
 
 
 @frappe.whitelist()
 def process_invoice_items(
-    document_name: str, doctype: str, invoice_slade_id: str, **kwargs
+    document_name: str,
+    doctype: str,
+    invoice_slade_id: str,
+    error_callback: Callable | None = None,
+    **kwargs,
 ) -> None:
     """
     Retrieves the specific invoice, extracts all items, and sends each
-    item separately.
+    item separately, up to the route's Max Concurrent Requests at a time. The
+    invoice's Lines stage completes once every item is sent.
     """
-    from .process_request import process_request
+    from .process_request import process_requests
 
     invoice = frappe.get_doc(doctype, document_name)
 
@@ -286,11 +286,25 @@ def process_invoice_items(
     if invoice.is_return:
         route_key = "SalesCreditNoteLineReq"
 
+    product_ids = dict(
+        frappe.get_all(
+            "Item",
+            filters={"name": ["in", list({item.item_code for item in items})]},
+            fields=["name", "custom_slade_id"],
+            as_list=True,
+        )
+    )
+    sent_items = []
+
+    def handle_item_success(response: dict, document_name: str, **kwargs) -> None:
+        sales_item_submission_on_success(response, document_name, **kwargs)
+        sent_items.append(document_name)
+
+    # Lines sent before are updated in place
+    payloads = {"POST": [], "PATCH": []}
     for item in items:
         payload = {
-            "product": get_link_value(
-                "Item", "name", item.get("item_code"), "custom_slade_id"
-            ),
+            "product": product_ids.get(item.get("item_code")),
             "quantity": abs(item.get("qty")),
             "new_price": item.get("rate"),
             "amount": abs(item.get("amount")),
@@ -302,19 +316,27 @@ def process_invoice_items(
         if item.get("custom_slade_id"):
             request_method = "PATCH"
             payload["id"] = item.get("custom_slade_id")
-        process_request(
-            payload,
+        payloads[request_method].append(payload)
+
+    for request_method, method_payloads in payloads.items():
+        process_requests(
+            method_payloads,
             route_key,
-            sales_item_submission_on_success,
-            doctype=items_table_doctype,
+            handle_item_success,
             request_method=request_method,
+            doctype=items_table_doctype,
+            error_callback=error_callback,
         )
 
-    process_sales_transition(document_name, doctype, invoice_slade_id)
+    if len(sent_items) == len(items):
+        complete_stage(doctype, document_name, "Lines")
 
 
 def process_sales_transition(
-    document_name: str, doctype: str, invoice_slade_id: str
+    document_name: str,
+    doctype: str,
+    invoice_slade_id: str,
+    error_callback: Callable | None = None,
 ) -> None:
     from .process_request import process_request
 
@@ -322,13 +344,7 @@ def process_sales_transition(
 
     def handle_transition_success(response: dict, document_name: str, **kwargs) -> None:
         frappe.db.set_value(doctype, document_name, {"custom_transition_successful": 1})
-        frappe.enqueue(
-            "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.remote_response_status_handlers.process_sales_sign",
-            document_name=document_name,
-            doctype=doctype,
-            invoice_slade_id=response.get("id"),
-            queue="long",
-        )
+        complete_stage(doctype, document_name, "Transition")
 
     payload = {"invoice_id": invoice_slade_id, "document_name": document_name}
     route_key = "SalesTransitionReq"
@@ -341,10 +357,16 @@ def process_sales_transition(
         handle_transition_success,
         request_method="PATCH",
         doctype=doctype,
+        error_callback=error_callback,
     )
 
 
-def process_sales_sign(document_name: str, doctype: str, invoice_slade_id: str) -> None:
+def process_sales_sign(
+    document_name: str,
+    doctype: str,
+    invoice_slade_id: str,
+    error_callback: Callable | None = None,
+) -> None:
     from .process_request import process_request
 
     invoice = frappe.get_doc(doctype, document_name)
@@ -355,13 +377,7 @@ def process_sales_sign(document_name: str, doctype: str, invoice_slade_id: str)
         frappe.db.set_value(
             doctype, document_name, {"custom_successfully_submitted": 1}
         )
-        frappe.enqueue(
-            "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.apis.get_invoice_details",
-            id=invoice_slade_id,
-            document_name=document_name,
-            invoice_type=doctype,
-            queue="long",
-        )
+        complete_stage(doctype, document_name, "Sign")
 
     payload = {"invoice_id": invoice_slade_id, "document_name": document_name}
     route_key = "SalesSignInvReq"
@@ -374,16 +390,55 @@ def process_sales_sign(document_name: str, doctype: str, invoice_slade_id: str)
         handle_invoice_sign_success,
         request_method="POST",
         doctype=doctype,
+        error_callback=error_callback,
     )
 
 
 def update_invoice_info(response: dict, **kwargs) -> None:
+    """Saves the SCU details of the signed invoices in the response, which is either
+    one invoice or a page of them"""
     doctype = kwargs.get("doctype")
-    data = response.get("results", [])[0] if response.get("results") else response
+    invoices = response.get("results") if "results" in response else [response]
+    invoices = [invoice for invoice in invoices or [] if invoice.get("scu_data")]
+    if not invoices:
+        return
+
+    document_names = dict(
+        frappe.get_all(
+            doctype,
+            filters={
+                "custom_slade_id": ["in", [invoice["id"] for invoice in invoices]]
+            },
+            fields=["custom_slade_id", "name"],
+            as_list=True,
+        )
+    )
+    updates = {
+        document_names[invoice["id"]]: get_invoice_info_updates(
+            invoice, doctype, document_names[invoice["id"]]
+        )
+        for invoice in invoices
+        if invoice["id"] in document_names
+    }
+    if not updates:
+        return
+
+    frappe.db.bulk_update(doctype, updates)
+    complete_stages(doctype, list(updates), "Details")
+
+    for document_name in updates:
+        frappe.publish_realtime(
+            "refresh_form",
+            document_name,
+            doctype=doctype,
+            docname=document_name,
+            after_commit=True,
+        )
+
+
+def get_invoice_info_updates(data: dict, doctype: str, document_name: str) -> dict:
     custom_slade_id = data.get("id")
     scu_data = data.get("scu_data")
-    if not scu_data:
-        return
 
     qr_code_url = scu_data.get("qr_code_url")
     sales_invoice_tax_table = data.get("sales_invoice_tax_table", {})
@@ -436,43 +491,11 @@ def update_invoice_info(response: dict, **kwargs) -> None:
         **tax_amounts,
     }
 
-    # Generate QR Code image if qr_code_url is available
+    # Rendered when first shown, see qr_codes
     if qr_code_url:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_code_url)
-        qr.make(fit=True)
-
-        # Save QR Code image as binary
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
+        updates["custom_qr_code"] = get_qr_code_image_url(doctype, document_name)
 
-        # Attach the QR code image to the document and get the file URL
-        file_doc = frappe.get_doc(
-            {
-                "doctype": "File",
-                "file_name": f"QR-{custom_slade_id}.png",
-                "is_private": 1,
-                "content": buffer.read(),
-                "attached_to_doctype": doctype,
-                "attached_to_name": custom_slade_id,
-            }
-        )
-        file_doc.save(ignore_permissions=True)
-        updates["custom_qr_code"] = file_doc.file_url
-
-    document_name = frappe.db.get_value(
-        doctype, {"custom_slade_id": custom_slade_id}, "name"
-    )
-    if document_name:
-        frappe.db.set_value(doctype, document_name, updates)
-        frappe.publish_realtime("refresh_form", document_name)
+    return updates
 
 
 def sales_item_submission_on_success(
@@ -0,0 +1,415 @@
+"""Integration Request logging for Slade360 calls, written immediately or in batches"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Literal
+
+import redis
+
+import frappe
+from frappe.integrations.utils import create_request_log
+from frappe.utils import get_datetime, now_datetime
+
+from ..logger import etims_logger
+from ..utils import active_settings_cache
+from .request_timings import TIMING_FIELDS, RequestTimings
+
+RequestLogMode = Literal["Immediate", "Buffered", "Background"]
+PayloadCaptureMode = Literal["Full", "Truncated", "Hash Only", "Compressed File"]
+
+# Buffered logs are written once this many have been collected, or once the oldest
+# has waited this long, even if the request or job has not finished yet
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 30  # seconds
+
+QUEUE_KEY = "etims_request_log_queue"
+FLUSH_JOB_ID = "etims_request_log_flush"
+
+FIELDS = (
+    "name",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "is_remote_request",
+    "integration_request_service",
+    "request_description",
+    "url",
+    "data",
+    "request_headers",
+    "reference_doctype",
+    "reference_docname",
+    "status",
+    "output",
+    "error",
+    *TIMING_FIELDS.values(),
+)
+
+
+@dataclass(frozen=True)
+class PayloadCapture:
+    """How much of a call's request and response bodies its Integration Request keeps.
+
+    Bodies up to `limit` KB are kept whole in every mode but Hash Only. Larger ones
+    are cut down to the limit, reduced to their size and SHA-256 digest, or moved to
+    a gzipped file attached to the record.
+    """
+
+    mode: PayloadCaptureMode = "Full"
+    limit: int = 64  # KB
+
+    def capture(self, text: str | None) -> tuple[str | None, bytes | None]:
+        """Returns the text to store in the record, and the file to attach, if any"""
+        if not text or self.mode == "Full":
+            return text, None
+
+        encoded = text.encode()
+
+        if self.mode == "Hash Only":
+            return describe(encoded), None
+
+        if len(encoded) <= self.limit * 1024:
+            return text, None
+
+        if self.mode == "Compressed File":
+            return f"Attached as a compressed file: {describe(encoded)}", gzip.compress(
+                encoded
+            )
+
+        kept = encoded[: self.limit * 1024].decode(errors="ignore")
+
+        return f"{kept}\n... truncated: {describe(encoded)}", None
+
+
+def describe(encoded: bytes) -> str:
+    return f"{len(encoded)} bytes, sha256:{hashlib.sha256(encoded).hexdigest()}"
+
+
+@dataclass
+class RequestLog:
+    """The Integration Request of one Slade360 call.
+
+    In Immediate mode the record is inserted when the call starts and updated when it
+    ends, as Frappe's own integrations do. Otherwise it is only kept in memory, and
+    written with its final status once the call has ended: in Buffered mode by the
+    worker itself, in bulk at the end of the web request or job; in Background mode
+    by a background job, through a queue in Redis.
+    """
+
+    mode: RequestLogMode
+    name: str
+    integration_request_service: str | None
+    url: str
+    data: str
+    request_headers: str
+    reference_doctype: str | None = None
+    reference_docname: str | None = None
+    request_description: str | None = None
+    status: str = "Queued"
+    output: str | None = None
+    error: str | None = None
+    owner: str = "Administrator"
+    creation: datetime = field(default_factory=now_datetime)
+    modified: datetime | None = None
+    payload_capture: PayloadCapture = field(default_factory=PayloadCapture)
+    timings: RequestTimings = field(default_factory=RequestTimings)
+    # Compressed bodies, by the field they were taken out of
+    attachments: dict[str, bytes] = field(default_factory=dict)
+
+    def close(
+        self,
+        status: Literal["Completed", "Failed"],
+        output: Any = None,
+        error: str | None = None,
+        request_description: str | None = None,
+        timings: RequestTimings | None = None,
+    ) -> None:
+        """Records the outcome of the call and hands the log over for writing"""
+        output = self.capture("output", as_json(output) if output is not None else None)
+        self.timings = timings or self.timings
+
+        if self.mode == "Immediate":
+            update_integration_request(
+                self.name, status, output, error, request_description, self.timings
+            )
+            save_attachments(self.name, self.attachments)
+            return
+
+        self.status = status
+        self.output = output
+        self.error = str(error) if error is not None else None
+        self.modified = now_datetime()
+
+        if request_description:
+            self.request_description = (
+                f"{self.request_description} - {request_description}"
+                if self.request_description
+                else request_description
+            )
+
+        if self.mode == "Background":
+            enqueue_log(self)
+        else:
+            buffer_log(self)
+
+    def capture(self, fieldname: str, text: str | None) -> str | None:
+        text, attachment = self.payload_capture.capture(text)
+
+        if attachment:
+            self.attachments[fieldname] = attachment
+
+        return text
+
+    def as_row(self) -> dict[str, Any]:
+        row = asdict(self)
+        del row["mode"], row["payload_capture"], row["timings"]
+
+        return {
+            **row,
+            **self.timings.as_fields(),
+            "modified": self.modified or self.creation,
+            "modified_by": self.owner,
+            "docstatus": 0,
+            "is_remote_request": 1,
+        }
+
+
+def open_request_log(
+    request_description: str | None,
+    url: str,
+    payload: Any,
+    headers: dict,
+    doctype: str | None,
+    document_name: str | None,
+    settings_name: str | None,
+) -> RequestLog:
+    """Starts the log of a call about to be sent"""
+    mode = get_request_log_mode(settings_name)
+    log = RequestLog(
+        mode=mode,
+        name=frappe.generate_hash(length=10),
+        integration_request_service=request_description,
+        request_description=request_description,
+        url=url,
+        data="",
+        request_headers=as_json(headers),
+        reference_doctype=doctype if isinstance(doctype, str) else None,
+        reference_docname=document_name,
+        owner=frappe.session.user,
+        payload_capture=get_payload_capture(settings_name),
+    )
+    log.data = log.capture("data", as_json(payload))
+
+    if mode == "Immediate":
+        log.name = create_request_log(
+            data=log.data,
+            request_description=request_description,
+            is_remote_request=True,
+            service_name=request_description,
+            request_headers=headers,
+            url=url,
+            reference_docname=document_name,
+            reference_doctype=doctype,
+        ).name
+
+    return log
+
+
+def get_request_log_mode(settings_name: str | None) -> RequestLogMode:
+    settings = get_logging_settings(settings_name)
+
+    return settings.get("request_logging") or "Immediate"
+
+
+def get_payload_capture(settings_name: str | None) -> PayloadCapture:
+    settings = get_logging_settings(settings_name)
+
+    return PayloadCapture(
+        mode=settings.get("payload_capture") or "Full",
+        limit=settings.get("payload_capture_limit") or PayloadCapture.limit,
+    )
+
+
+def get_logging_settings(settings_name: str | None) -> frappe._dict:
+    if settings_name:
+        for settings in active_settings_cache.get():
+            if settings.name == settings_name:
+                return settings
+
+    return frappe._dict()
+
+
+def as_json(value: Any) -> str:
+    return value if isinstance(value, str) else frappe.as_json(value, indent=1)
+
+
+@dataclass
+class LogBuffer:
+    logs: list[RequestLog] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+
+def buffer_log(log: RequestLog) -> None:
+    buffer = getattr(frappe.local, "etims_request_log_buffer", None)
+
+    if buffer is None:
+        buffer = frappe.local.etims_request_log_buffer = LogBuffer()
+
+    buffer.logs.append(log)
+
+    if (
+        len(buffer.logs) >= BATCH_SIZE
+        or time.monotonic() - buffer.started_at >= FLUSH_INTERVAL
+    ):
+        # Written as part of the current transaction
+        flush_buffered_logs()
+
+
+def flush_buffered_logs() -> None:
+    """Writes the logs buffered by this request or job, in one insert"""
+    buffer = getattr(frappe.local, "etims_request_log_buffer", None)
+    frappe.local.etims_request_log_buffer = None
+
+    if buffer and buffer.logs:
+        insert_request_logs([log.as_row() for log in buffer.logs])
+
+
+def enqueue_log(log: RequestLog) -> None:
+    row = log.as_row()
+    row["attachments"] = {
+        fieldname: base64.b64encode(content).decode()
+        for fieldname, content in log.attachments.items()
+    }
+    frappe.cache.rpush(QUEUE_KEY, frappe.as_json(row, indent=None))
+
+    if frappe.cache.llen(QUEUE_KEY) >= BATCH_SIZE:
+        frappe.enqueue(
+            flush_queued_logs, queue="short", job_id=FLUSH_JOB_ID, deduplicate=True
+        )
+
+
+def flush_queued_logs() -> None:
+    """Writes the logs queued in Redis. Runs as a background job"""
+    flushing_key = f"{QUEUE_KEY}|flushing|{frappe.generate_hash(length=8)}"
+
+    try:
+        # Logs queued from here on go to a fresh list
+        frappe.cache.rename(
+            frappe.cache.make_key(QUEUE_KEY), frappe.cache.make_key(flushing_key)
+        )
+    except redis.exceptions.ResponseError:
+        return  # Nothing queued
+
+    rows = [json.loads(row) for row in frappe.cache.lrange(flushing_key, 0, -1)]
+    frappe.cache.delete_value(flushing_key)
+
+    for row in rows:
+        row["attachments"] = {
+            fieldname: base64.b64decode(content)
+            for fieldname, content in (row.get("attachments") or {}).items()
+        }
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        insert_request_logs(rows[start : start + BATCH_SIZE])
+
+
+def insert_request_logs(rows: list[dict[str, Any]]) -> None:
+    for row in rows:
+        row["creation"] = get_datetime(row["creation"])
+        row["modified"] = get_datetime(row["modified"])
+
+    try:
+        frappe.db.bulk_insert(
+            "Integration Request",
+            FIELDS,
+            [[row.get(fieldname) for fieldname in FIELDS] for row in rows],
+            ignore_duplicates=True,
+        )
+    except Exception:
+        # Losing logs must never fail the call that produced them
+        etims_logger.exception("Failed to write %s Integration Requests", len(rows))
+        return
+
+    for row in rows:
+        save_attachments(row["name"], row.get("attachments"))
+
+
+def save_attachments(name: str, attachments: dict[str, bytes] | None) -> None:
+    """Attaches the compressed bodies of a call to its Integration Request"""
+    for fieldname, content in (attachments or {}).items():
+        try:
+            frappe.get_doc(
+                {
+                    "doctype": "File",
+                    "file_name": f"{name}-{fieldname}.json.gz",
+                    "attached_to_doctype": "Integration Request",
+                    "attached_to_name": name,
+                    "is_private": 1,
+                    "content": content,
+                }
+            ).insert(ignore_permissions=True)
+        except Exception:
+            etims_logger.exception(
+                "Failed to attach the %s of Integration Request %s", fieldname, name
+            )
+
+
+def flush_request_logs(*args: Any, **kwargs: Any) -> None:
+    """Writes this request's or job's buffered logs once it has finished.
+
+    Runs after Frappe has committed or rolled back the transaction, so the logs of
+    failed calls are kept even if their transaction was not.
+    """
+    if getattr(frappe.local, "etims_request_log_buffer", None) and frappe.db:
+        flush_buffered_logs()
+        frappe.db.commit()
+
+
+def update_integration_request(
+    integration_request: str,
+    status: Literal["Completed", "Failed"],
+    output: str | None = None,
+    error: str | None = None,
+    request_description: str | None = None,
+    timings: RequestTimings | None = None,
+) -> None:
+    """Updates the given integration request record.
+
+    Args:
+        integration_request (str): The provided integration request.
+        status (Literal["Completed", "Failed"]): The new status of the request.
+        output (str | None, optional): The response message, if any. Defaults to None.
+        error (str | None, optional): The error message, if any. Defaults to None.
+        timings (RequestTimings | None, optional): How long the call took. Defaults to None.
+    """
+    doc = frappe.get_doc("Integration Request", integration_request, for_update=True)
+
+    if error:
+        doc.error = error if doc.error is None or "null" else (doc.error + "\n" + error)
+
+    if output:
+        doc.output = (
+            output if doc.output is None or "null" else (doc.output + "\n" + output)
+        )
+
+    if request_description:
+        doc.request_description = (
+            request_description
+            if doc.request_description is None
+            else (doc.request_description + " - " + request_description)
+        )
+
+    doc.status = status
+
+    if timings:
+        doc.update(timings.as_fields())
+
+    doc.save(ignore_permissions=True)
@@ -0,0 +1,219 @@
+"""Timing of the phases of Slade360 calls, recorded on their Integration Requests"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Integration Request custom fields, in milliseconds
+TIMING_FIELDS = {
+    "queue_wait": "custom_queue_wait",
+    "connect": "custom_connect_time",
+    "time_to_first_byte": "custom_time_to_first_byte",
+    "total": "custom_total_time",
+    "callback": "custom_callback_time",
+}
+
+
+@dataclass
+class RequestTimings:
+    """How long each phase of one call took, in milliseconds.
+
+    - queue_wait: from the call being made to the HTTP exchange starting, e.g. while
+      waiting for a worker thread
+    - connect: opening new connections, 0 when a pooled one was reused
+    - time_to_first_byte: from sending the request to receiving the response headers
+    - total: the whole HTTP exchange, retries included
+    - callback: running the success callback on the response
+    """
+
+    queued_at: float = field(default_factory=time.perf_counter, repr=False)
+    queue_wait: float = 0
+    connect: float = 0
+    time_to_first_byte: float = 0
+    total: float = 0
+    callback: float = 0
+
+    def as_fields(self) -> dict[str, float]:
+        return {
+            fieldname: round(getattr(self, phase), 3)
+            for phase, fieldname in TIMING_FIELDS.items()
+        }
+
+
+def elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+_connect_times = threading.local()
+
+
+@contextmanager
+def measure_connect_time(timings: RequestTimings) -> Iterator[None]:
+    """Adds the time this thread spends opening connections inside the block to
+    the given timings"""
+    previous = getattr(_connect_times, "timings", None)
+    _connect_times.timings = timings
+
+    try:
+        yield
+    finally:
+        _connect_times.timings = previous
+
+
+def record_connect_time(started: float) -> None:
+    timings = getattr(_connect_times, "timings", None)
+
+    if timings is not None:
+        timings.connect += elapsed_ms(started)
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        started = time.perf_counter()
+
+        try:
+            super().connect()
+        finally:
+            record_connect_time(started)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        started = time.perf_counter()
+
+        try:
+            super().connect()
+        finally:
+            record_connect_time(started)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """An adapter whose connections report how long they took to open"""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+# Each bucket is 5% wider than the previous one, so percentiles read from a
+# histogram are within 2.5% of the exact value
+BUCKET_GROWTH = 1.05
+
+
+@dataclass
+class LatencyHistogram:
+    """Counts of durations in logarithmic buckets.
+
+    Unlike percentiles, histograms can be added up, e.g. across daily summaries.
+    """
+
+    buckets: Counter[int] = field(default_factory=Counter)
+
+    @staticmethod
+    def bucket(duration: float) -> int:
+        """The bucket of a duration in milliseconds"""
+        return math.floor(math.log(max(duration, 1)) / math.log(BUCKET_GROWTH))
+
+    def add(self, duration: float, count: int = 1) -> None:
+        self.buckets[self.bucket(duration)] += count
+
+    def merge(self, other: LatencyHistogram) -> None:
+        self.buckets.update(other.buckets)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Nearest-rank percentile, in milliseconds, at the middle of its bucket"""
+        rank = math.ceil(fraction * sum(self.buckets.values()))
+
+        for bucket in sorted(self.buckets):
+            rank -= self.buckets[bucket]
+
+            if rank <= 0:
+                return BUCKET_GROWTH ** (bucket + 0.5)
+
+        return None
+
+    def as_json(self) -> str:
+        return json.dumps(
+            {str(bucket): count for bucket, count in self.buckets.items()}
+        )
+
+    @classmethod
+    def from_json(cls, value: str | None) -> LatencyHistogram:
+        return cls(
+            Counter(
+                {
+                    int(bucket): count
+                    for bucket, count in json.loads(value or "{}").items()
+                }
+            )
+        )
+
+
+@dataclass
+class DurationStats:
+    """Count, total, extremes and histogram of a set of call durations, in seconds"""
+
+    request_count: int = 0
+    total_duration: float = 0
+    min_duration: float | None = None
+    max_duration: float | None = None
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def add(self, duration: float | None) -> None:
+        """Counts a call, and its duration if it was measured"""
+        if duration is None:
+            self.request_count += 1
+            return
+
+        histogram = LatencyHistogram()
+        histogram.add(duration * 1000)
+        self.merge(DurationStats(1, duration, duration, duration, histogram))
+
+    def merge(self, other: DurationStats) -> None:
+        self.request_count += other.request_count
+        self.total_duration += other.total_duration
+        self.min_duration = min(
+            (
+                value
+                for value in (self.min_duration, other.min_duration)
+                if value is not None
+            ),
+            default=None,
+        )
+        self.max_duration = max(
+            (
+                value
+                for value in (self.max_duration, other.max_duration)
+                if value is not None
+            ),
+            default=None,
+        )
+        self.histogram.merge(other.histogram)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Read from the histogram, in seconds"""
+        duration = self.histogram.percentile(fraction)
+
+        return duration / 1000 if duration is not None else None
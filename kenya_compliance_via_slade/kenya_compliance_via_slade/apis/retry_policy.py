@@ -0,0 +1,195 @@
+"""Retrying of transient failures when communicating with Slade360 servers"""
+
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+import requests
+import urllib3
+
+from ..logger import etims_logger
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5  # seconds
+DEFAULT_MAX_DELAY = 8.0  # seconds
+DEFAULT_MAX_ELAPSED_TIME = 30.0  # seconds
+
+# The server refused the request without acting on it, so any method may be resent
+ALWAYS_RETRIED_STATUSES = frozenset({429, 503})
+
+# The request may have been acted on before the failure, so only idempotent
+# methods are resent. Invoices and stock movements are created with POST
+IDEMPOTENT_RETRIED_STATUSES = frozenset({502, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT"})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often, and how far apart, a failed request is resent.
+
+    Delays grow exponentially from `base_delay` up to `max_delay`, with full jitter so
+    workers retrying at the same time spread out. A `Retry-After` header sent by the
+    server takes precedence over the computed delay. No attempt is started once
+    `max_elapsed_time` seconds have passed since the first one.
+    """
+
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+    max_elapsed_time: float = DEFAULT_MAX_ELAPSED_TIME
+
+    def should_retry(
+        self,
+        method: str,
+        response: requests.Response | None = None,
+        error: requests.exceptions.RequestException | None = None,
+    ) -> bool:
+        if response is not None:
+            return response.status_code in ALWAYS_RETRIED_STATUSES or (
+                response.status_code in IDEMPOTENT_RETRIED_STATUSES
+                and method in IDEMPOTENT_METHODS
+            )
+
+        if isinstance(error, requests.exceptions.ConnectTimeout) or was_never_sent(
+            error
+        ):
+            return True
+
+        # Includes connections dropped and reads timed out after the request was sent
+        return isinstance(
+            error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        ) and (method in IDEMPOTENT_METHODS)
+
+    def get_delay(
+        self, attempt: int, response: requests.Response | None = None
+    ) -> float:
+        """The number of seconds to wait before the given retry (numbered from 1)"""
+        retry_after = get_retry_after(response) if response is not None else None
+
+        if retry_after is not None:
+            return retry_after
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+NO_RETRIES = RetryPolicy(max_attempts=1)
+
+
+def send_with_retries(
+    send: Callable[[], requests.Response],
+    method: str,
+    policy: RetryPolicy | None,
+    description: str | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> requests.Response:
+    """Calls `send` until it succeeds, fails permanently or the policy is exhausted.
+
+    Runs without database access, so it can be used from worker threads.
+
+    Args:
+        send (Callable[[], requests.Response]): Performs one HTTP exchange
+        method (str): The HTTP method, which decides what is safe to resend
+        policy (RetryPolicy | None): The policy to follow. None sends once.
+        description (str | None, optional): Identifies the request in the logs.
+
+    Returns:
+        requests.Response: The last response received. Exceptions raised by the
+        final attempt are propagated.
+    """
+    policy = policy or NO_RETRIES
+    started = time.monotonic()
+    attempt = 1
+
+    while True:
+        response, error = None, None
+
+        try:
+            response = send()
+        except requests.exceptions.RequestException as exc:
+            error = exc
+
+        if attempt >= policy.max_attempts or not policy.should_retry(
+            method, response, error
+        ):
+            break
+
+        delay = policy.get_delay(attempt, response)
+        elapsed = time.monotonic() - started
+
+        if elapsed + delay > policy.max_elapsed_time:
+            break
+
+        etims_logger.warning(
+            "Retrying %s in %.2fs (attempt %s of %s) after %s",
+            description,
+            delay,
+            attempt + 1,
+            policy.max_attempts,
+            response.status_code if response is not None else repr(error),
+        )
+        sleep(delay)
+        attempt += 1
+
+    if error is not None:
+        raise error
+
+    return response
+
+
+def was_never_sent(error: requests.exceptions.RequestException | None) -> bool:
+    """Whether the error happened while establishing the connection"""
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+
+    return isinstance(
+        getattr(error.args[0], "reason", None), urllib3.exceptions.NewConnectionError
+    )
+
+
+def get_retry_after(response: requests.Response) -> float | None:
+    """Reads the Retry-After header, given either in seconds or as an HTTP date"""
+    value = response.headers.get("Retry-After")
+
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def get_retry_policy(
+    settings: dict | None, retries_disabled: bool = False
+) -> RetryPolicy:
+    """Builds the retry policy configured on a settings record.
+
+    Args:
+        settings (dict | None): The active settings record
+        retries_disabled (bool, optional): Whether the route opts out of retries
+
+    Returns:
+        RetryPolicy: The policy to apply
+    """
+    if retries_disabled or not settings or not settings.get("enable_retries"):
+        return NO_RETRIES
+
+    return RetryPolicy(
+        max_attempts=max(int(settings.get("retry_max_attempts") or 1), 1),
+        base_delay=float(settings.get("retry_base_delay") or DEFAULT_BASE_DELAY),
+        max_delay=float(settings.get("retry_max_delay") or DEFAULT_MAX_DELAY),
+        max_elapsed_time=float(
+            settings.get("retry_max_elapsed_time") or DEFAULT_MAX_ELAPSED_TIME
+        ),
+    )
@@ -0,0 +1,146 @@
+"""Pooled keep-alive HTTP sessions used when communicating with Slade360 servers"""
+
+from __future__ import annotations
+
+import threading
+import time
+from urllib import parse
+
+import requests
+
+import frappe
+
+from ..doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
+from .request_timings import TimedHTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 300  # seconds
+
+
+class PooledSession:
+    """A requests Session bound to a single server, with its own connection pool"""
+
+    def __init__(self, pool_size: int, idle_timeout: int) -> None:
+        self.idle_timeout = idle_timeout
+        self.last_used = time.monotonic()
+
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def is_idle(self, now: float) -> bool:
+        return bool(self.idle_timeout) and now - self.last_used > self.idle_timeout
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class SessionPool:
+    """Keeps one persistent session per server for the lifetime of the worker process.
+
+    Sessions are created lazily, reused by every request made to the same server,
+    and closed once they have been idle for longer than their idle timeout.
+    """
+
+    def __init__(self) -> None:
+        self._sessions: dict[str, PooledSession] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, server_url: str, pool_size: int, idle_timeout: int
+    ) -> requests.Session:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+            pooled_session = self._sessions.get(server_url)
+            if pooled_session is None:
+                pooled_session = PooledSession(pool_size, idle_timeout)
+                self._sessions[server_url] = pooled_session
+
+            pooled_session.last_used = time.monotonic()
+            return pooled_session.session
+
+    def __contains__(self, server_url: str) -> bool:
+        return server_url in self._sessions
+
+    def close(self, server_url: str) -> None:
+        with self._lock:
+            pooled_session = self._sessions.pop(server_url, None)
+
+        if pooled_session:
+            pooled_session.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+
+        for pooled_session in sessions.values():
+            pooled_session.close()
+
+    def _evict_idle(self, now: float) -> None:
+        for server_url, pooled_session in list(self._sessions.items()):
+            if pooled_session.is_idle(now):
+                del self._sessions[server_url]
+                pooled_session.close()
+
+
+session_pool = SessionPool()
+
+
+def get_base_url(url: str) -> str:
+    """Reduces a URL to its scheme and host, e.g. https://api.example.com"""
+    parsed_url = parse.urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+
+def get_session(
+    url: str, pool_size: int | None = None, idle_timeout: int | None = None
+) -> requests.Session:
+    """Fetch the pooled session for the server hosting the given URL.
+
+    Args:
+        url (str): Any URL on the target server
+        pool_size (int | None, optional): Maximum keep-alive connections. Read from the settings when not given.
+        idle_timeout (int | None, optional): Idle eviction period in seconds. Read from the settings when not given.
+
+    Returns:
+        requests.Session: The shared session
+    """
+    server_url = get_base_url(url)
+
+    if server_url not in session_pool and (pool_size is None or idle_timeout is None):
+        configured_pool_size, configured_idle_timeout = get_pool_configuration(
+            server_url
+        )
+        pool_size = pool_size or configured_pool_size
+        idle_timeout = (
+            idle_timeout if idle_timeout is not None else configured_idle_timeout
+        )
+
+    return session_pool.get(
+        server_url, pool_size or DEFAULT_POOL_SIZE, idle_timeout or 0
+    )
+
+
+def get_pool_configuration(server_url: str) -> tuple[int, int]:
+    """Read the pool size and idle timeout of the active settings record for a server"""
+    settings = frappe.db.get_value(
+        SETTINGS_DOCTYPE_NAME,
+        {"is_active": 1, "server_url": ["like", f"{server_url}%"]},
+        ["http_pool_size", "http_session_idle_timeout"],
+        as_dict=True,
+    )
+
+    if not settings:
+        return DEFAULT_POOL_SIZE, DEFAULT_IDLE_TIMEOUT
+
+    return (
+        settings.http_pool_size or DEFAULT_POOL_SIZE,
+        (
+            settings.http_session_idle_timeout
+            if settings.http_session_idle_timeout is not None
+            else DEFAULT_IDLE_TIMEOUT
+        ),
+    )
@@ -1,10 +1,18 @@
+import json
 from typing import Callable
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import requests
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
 
-from .api_builder import EndpointsBuilder
+from .api_builder import (
+    EndpointsBuilder,
+    RemoteRequest,
+    RequestContext,
+    RequestExecutor,
+)
 
 
 def patched_update_request_date(*args, **kwargs) -> Callable:
@@ -109,3 +117,75 @@ class TestApis(FrappeTestCase):
 
         self.assertIsNotNone(record)
         self.assertEqual(record[0].error, mock_response["resultMsg"])
+
+
+class TestRemoteRequest(FrappeTestCase):
+    """Test Cases"""
+
+    def test_caller_changes_do_not_leak_into_request(self) -> None:
+        headers = {"Authorization": "Bearer abc"}
+        payload = {"id": "1234", "name": "Test"}
+        request = RemoteRequest(
+            url="https://test.com/api/items/",
+            method="PATCH",
+            headers=headers,
+            payload=payload,
+            success_callback=lambda *args, **kwargs: None,
+        )
+
+        headers["Authorization"] = "Bearer xyz"
+        payload.pop("id")
+
+        self.assertEqual(request.headers["Authorization"], "Bearer abc")
+        self.assertEqual(request.payload["id"], "1234")
+
+        with self.assertRaises(TypeError):
+            request.headers["Authorization"] = "Bearer xyz"
+
+    def test_with_resource_id(self) -> None:
+        request = RemoteRequest(
+            url="https://test.com/api/items/",
+            method="PATCH",
+            headers={},
+            payload={"id": "1234", "name": "Test"},
+            success_callback=lambda *args, **kwargs: None,
+        )
+        patch_request = request.with_resource_id()
+
+        self.assertEqual(patch_request.url, "https://test.com/api/items/1234/")
+        self.assertEqual(patch_request.payload, {"name": "Test"})
+        self.assertEqual(request.payload, {"id": "1234", "name": "Test"})
+        self.assertEqual(patch_request.with_resource_id(), patch_request)
+
+
+class TestRequestExecutor(FrappeTestCase):
+    """Test Cases"""
+
+    @patch(
+        "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.api_builder.update_last_request_date"
+    )
+    def test_log_closed_when_success_callback_fails(self, *args) -> None:
+        def fail(**kwargs) -> None:
+            raise ValueError("Unknown item")
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps({"id": "1234"}).encode()
+        context = RequestContext(
+            request=RemoteRequest(
+                url="https://test.com/api/items/",
+                method="GET",
+                headers={},
+                success_callback=fail,
+            ),
+            integration_request=MagicMock(),
+        )
+
+        with self.assertRaises(ValueError):
+            RequestExecutor().handle_response(context, response)
+
+        context.integration_request.close.assert_called_once()
+        closed = context.integration_request.close.call_args.kwargs
+        self.assertEqual(closed["status"], "Failed")
+        self.assertEqual(closed["output"], {"id": "1234"})
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from .circuit_breaker import CircuitBreaker, get_circuit_breaker
+
+TIME = "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.circuit_breaker.time.time"
+
+
+class TestCircuitBreaker(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        self.circuit_breaker = CircuitBreaker(
+            "/api/test/circuit_breaker/", failure_threshold=2, reset_timeout=30
+        )
+        self.circuit_breaker.record_success()
+
+    def tearDown(self) -> None:
+        self.circuit_breaker.record_success()
+
+    def test_circuit_opens_after_threshold(self) -> None:
+        with patch(TIME, return_value=1000.0):
+            self.circuit_breaker.record_failure()
+            self.assertTrue(self.circuit_breaker.allow_request())
+
+            self.circuit_breaker.record_failure()
+            self.assertEqual(self.circuit_breaker.get_state(), "Open")
+            self.assertFalse(self.circuit_breaker.allow_request())
+
+    def test_single_probe_when_half_open(self) -> None:
+        with patch(TIME, return_value=1000.0):
+            self.circuit_breaker.open()
+
+        with patch(TIME, return_value=1031.0):
+            self.assertEqual(self.circuit_breaker.get_state(), "Half-Open")
+            self.assertTrue(self.circuit_breaker.allow_request())
+            self.assertFalse(self.circuit_breaker.allow_request())
+
+            self.circuit_breaker.record_failure()
+            self.assertEqual(self.circuit_breaker.get_state(), "Open")
+
+            self.circuit_breaker.record_success()
+            self.assertEqual(self.circuit_breaker.get_state(), "Closed")
+            self.assertTrue(self.circuit_breaker.allow_request())
+
+    def test_get_circuit_breaker(self) -> None:
+        self.assertIsNone(
+            get_circuit_breaker("/api/test/", {"enable_circuit_breaker": 0})
+        )
+        self.assertEqual(
+            get_circuit_breaker(
+                "/api/test/",
+                {"enable_circuit_breaker": 1, "circuit_failure_threshold": 3},
+            ).failure_threshold,
+            3,
+        )
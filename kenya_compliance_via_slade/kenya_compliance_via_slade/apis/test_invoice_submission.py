@@ -0,0 +1,257 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+from urllib import parse
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from . import apis, invoice_submission, process_request
+from .invoice_submission import get_resume_stage, run_stage
+
+ROUTES_FIXTURE = Path(__file__).parents[2] / "fixtures" / "navari_etims_routes.json"
+
+
+def get_fixture_routes() -> dict[str, str]:
+    """The route paths the app ships with, by route key"""
+    with open(ROUTES_FIXTURE) as fixture:
+        (routes,) = json.load(fixture)
+
+    return {
+        route["url_path_function"]: route["url_path"]
+        for route in routes["routes_table"]
+    }
+
+
+def serve_invoices(requested: list[tuple[str, dict]], *listed: str) -> callable:
+    """Stands in for the request executor. Listings return the `listed` invoices,
+    or the requested ones when none are given, and single invoices themselves."""
+
+    def execute(request: object) -> dict:
+        path = parse.urlparse(request.url).path
+        requested.append((path, dict(request.payload)))
+
+        if "id__in" in request.payload:
+            ids = listed or request.payload["id__in"].split(",")
+            response = {
+                "results": [{"id": id} for id in ids],
+                "next": "https://test.com/?page=2" if listed else None,
+            }
+        else:
+            response = {"id": request.payload["id"]}
+
+        request.success_callback(
+            response=response, document_name=None, doctype=request.doctype
+        )
+        return response
+
+    return execute
+
+
+class TestInvoiceSubmission(FrappeTestCase):
+    """Test Cases"""
+
+    def test_resume_stage_derived_from_invoice(self) -> None:
+        self.assertEqual(get_resume_stage(frappe._dict()), "Invoice")
+        self.assertEqual(get_resume_stage(frappe._dict(custom_slade_id="x")), "Lines")
+        self.assertEqual(
+            get_resume_stage(
+                frappe._dict(custom_slade_id="x", custom_transition_successful=1)
+            ),
+            "Sign",
+        )
+        self.assertEqual(
+            get_resume_stage(
+                frappe._dict(custom_slade_id="x", custom_successfully_submitted=1)
+            ),
+            "Details",
+        )
+        self.assertEqual(
+            get_resume_stage(
+                frappe._dict(
+                    custom_slade_id="x",
+                    custom_successfully_submitted=1,
+                    custom_qr_code="/private/files/QR-x.png",
+                )
+            ),
+            "Completed",
+        )
+
+    def test_failed_stage_retried_until_attempts_run_out(self) -> None:
+        updates = []
+
+        def fail(submission: frappe._dict, on_error: callable) -> None:
+            on_error({"detail": "Invalid product"})
+
+        with (
+            patch.dict(invoice_submission.STAGE_RUNNERS, {"Lines": fail}),
+            patch.object(invoice_submission, "get_settings", return_value={}),
+            patch.object(frappe.db, "get_value", return_value="Lines"),
+            patch.object(
+                frappe.db,
+                "set_value",
+                side_effect=lambda *args, **kwargs: updates.append(args),
+            ),
+        ):
+            for attempts in range(invoice_submission.DEFAULT_MAX_ATTEMPTS):
+                submission = frappe._dict(
+                    name="submission",
+                    invoice_type="Sales Invoice",
+                    invoice="SINV-0001",
+                    stage="Lines",
+                    attempts=attempts,
+                )
+                self.assertFalse(run_stage(submission))
+
+        first, last = updates[0][2], updates[-2][2]
+        self.assertEqual(first["status"], "Pending")
+        self.assertIn("Invalid product", first["last_error"])
+        self.assertIsNotNone(first["next_attempt_at"])
+        self.assertEqual(last["status"], "Failed")
+        self.assertIsNone(last["next_attempt_at"])
+
+    def test_resubmitting_a_completed_invoice_leaves_its_submission(self) -> None:
+        invoice = frappe._dict(name="SINV-0001", company="Test Company")
+        submission = frappe._dict(name="submission", stage="Completed")
+
+        with (
+            patch.object(frappe.db, "get_value", return_value=submission),
+            patch.object(frappe.db, "set_value") as set_value,
+            patch.object(invoice_submission, "advance_invoice_submission") as advance,
+            patch.object(invoice_submission, "enqueue_invoice_submission") as enqueue,
+        ):
+            self.assertEqual(
+                invoice_submission.start_invoice_submission(invoice, "Sales Invoice"),
+                "submission",
+            )
+
+        set_value.assert_not_called()
+        advance.assert_not_called()
+        enqueue.assert_not_called()
+
+    def test_submissions_past_the_timeframe_marked_failed(self) -> None:
+        expired = [
+            frappe._dict(name="submission-1", last_error="Invalid product"),
+            frappe._dict(name="submission-2", last_error=None),
+        ]
+
+        with (
+            patch.object(invoice_submission, "get_settings", return_value={}),
+            patch.object(frappe, "get_all", return_value=expired) as get_all,
+            patch.object(frappe.db, "set_value") as set_value,
+            patch.object(frappe.db, "commit"),
+            patch.object(invoice_submission.etims_logger, "warning") as warning,
+        ):
+            invoice_submission.expire_submissions()
+
+        filters = get_all.call_args.kwargs["filters"]
+        self.assertEqual(filters["status"], "Pending")
+        self.assertEqual(filters["creation"][0], "<")
+        self.assertEqual(
+            [call.args[1] for call in set_value.call_args_list],
+            ["submission-1", "submission-2"],
+        )
+        first, second = (call.args[2] for call in set_value.call_args_list)
+        self.assertEqual(first["status"], "Failed")
+        self.assertIsNone(first["next_attempt_at"])
+        self.assertEqual(
+            first["last_error"],
+            f"{invoice_submission.EXPIRED_ERROR}\nInvalid product",
+        )
+        self.assertEqual(second["last_error"], invoice_submission.EXPIRED_ERROR)
+        warning.assert_called_once()
+
+    def test_only_invoices_sent_on_submit_get_a_submission(self) -> None:
+        from ..overrides.server import sales_invoice
+
+        invoices = [
+            frappe._dict(
+                name=name,
+                custom_successfully_submitted=0,
+                update_stock=update_stock,
+                custom_defer_etims_submission=deferred,
+            )
+            for name, update_stock, deferred in (
+                ("SINV-0001", 1, 0),
+                ("SINV-0002", 0, 0),
+                ("SINV-0003", 1, 1),
+            )
+        ]
+
+        with patch.object(
+            sales_invoice, "generic_invoices_on_submit_override"
+        ) as submit:
+            for invoice in invoices:
+                sales_invoice.on_submit(invoice)
+
+        self.assertEqual(
+            [call.args[0].name for call in submit.call_args_list], ["SINV-0001"]
+        )
+
+    def test_invoice_details_fetched_from_the_listing_routes(self) -> None:
+        routes = get_fixture_routes()
+        updated, requested = [], []
+
+        with (
+            patch.object(process_request, "has_active_settings", return_value=True),
+            patch.object(
+                process_request,
+                "extract_metadata",
+                return_value=("Test Company", "00", None),
+            ),
+            patch.object(
+                process_request,
+                "build_headers",
+                return_value={"Authorization": "Bearer token"},
+            ),
+            patch.object(
+                process_request, "get_server_url", return_value="https://test.com"
+            ),
+            patch.object(
+                process_request,
+                "get_route_path",
+                lambda route_key, vendor: (routes[route_key], None),
+            ),
+            patch.object(process_request, "get_settings", return_value={}),
+            patch.object(
+                process_request, "is_route_retry_disabled", return_value=False
+            ),
+            patch.object(process_request, "get_route_page_concurrency", return_value=0),
+            patch.object(process_request, "get_circuit_breaker", return_value=None),
+            patch.object(
+                apis,
+                "update_invoice_info",
+                lambda response, **kwargs: updated.append(response),
+            ),
+        ):
+            with patch.object(
+                process_request.request_executor,
+                "execute",
+                serve_invoices(requested),
+            ):
+                apis.get_invoices_details(["a", "b"])
+                apis.get_invoices_details(["c"], is_return=True)
+
+            self.assertEqual(
+                requested,
+                [
+                    ("/api/sales/salesinvoices/", {"id__in": "a,b"}),
+                    ("/api/sales/salescreditnotes/", {"id__in": "c"}),
+                ],
+            )
+
+            # A server ignoring the filter lists other invoices, which is not paged
+            # through, and the invoices missing from the listing are fetched alone
+            requested.clear()
+            with patch.object(
+                process_request.request_executor,
+                "execute",
+                serve_invoices(requested, "a", "z"),
+            ):
+                apis.get_invoices_details(["a", "b"])
+
+            self.assertEqual(
+                [path for path, payload in requested],
+                ["/api/sales/salesinvoices/", "/api/sales/salesinvoices/b/"],
+            )
+            self.assertEqual(updated[-2:], [{"results": [{"id": "a"}]}, {"id": "b"}])
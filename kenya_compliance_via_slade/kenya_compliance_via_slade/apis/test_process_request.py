@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from .. import utils
+from ..doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
+from . import process_request, token_manager
+from .process_request import build_remaining_page_urls
+
+
+class TestProcessRequest(FrappeTestCase):
+    """Test Cases"""
+
+    def test_build_remaining_page_urls(self) -> None:
+        page_urls = build_remaining_page_urls(
+            "https://test.com/api/etims/item_classifications/?page=2&page_size=50",
+            {"current_page": 1, "total_pages": 4},
+        )
+
+        self.assertEqual(
+            page_urls,
+            [
+                "https://test.com/api/etims/item_classifications/?page=2&page_size=50",
+                "https://test.com/api/etims/item_classifications/?page=3&page_size=50",
+                "https://test.com/api/etims/item_classifications/?page=4&page_size=50",
+            ],
+        )
+
+    def test_build_remaining_page_urls_without_page_numbers(self) -> None:
+        self.assertEqual(
+            build_remaining_page_urls(
+                "https://test.com/api/etims/item_classifications/?cursor=cD0y",
+                {"current_page": 1, "total_pages": 4},
+            ),
+            [],
+        )
+        self.assertEqual(
+            build_remaining_page_urls(
+                "https://test.com/api/etims/item_classifications/?page=2",
+                {"next": "https://test.com/api/etims/item_classifications/?page=2"},
+            ),
+            [],
+        )
+
+    def test_no_queries_once_caches_are_warm(self) -> None:
+        settings = frappe._dict(
+            name="Settings",
+            company="Test Company",
+            bhfid="00",
+            server_url="https://test.com",
+            workstation="Till 1",
+            is_active=1,
+        )
+        route = frappe._dict(
+            vendor="VSCU Slade 360",
+            url_path_function="SalesInvoiceSaveReq",
+            url_path="/api/sales/salesinvoices/",
+        )
+        for cache in (utils.active_settings_cache, utils.routes_cache):
+            cache.invalidate_now()
+            self.addCleanup(cache.invalidate_now)
+
+        with (
+            patch.object(frappe.db, "sql", return_value=[route]) as sql,
+            patch.object(
+                frappe,
+                "get_all",
+                lambda doctype, **kwargs: (
+                    [settings] if doctype == SETTINGS_DOCTYPE_NAME else []
+                ),
+            ),
+            patch.object(frappe.db, "get_value") as get_value,
+            patch.object(frappe, "get_value") as get_frappe_value,
+            patch.object(token_manager, "get_access_token", return_value="token"),
+            patch.object(process_request.request_executor, "execute") as execute,
+        ):
+            for _ in range(2):
+                sql.reset_mock()
+                process_request.process_request(
+                    {"document_name": "SINV-0001", "total": 100},
+                    "SalesInvoiceSaveReq",
+                    print,
+                    request_method="POST",
+                )
+
+        # The second request was served from the caches the first one loaded
+        sql.assert_not_called()
+        get_value.assert_not_called()
+        get_frappe_value.assert_not_called()
+        self.assertEqual(execute.call_count, 2)
+        request = execute.call_args.args[0]
+        self.assertEqual(request.url, "https://test.com/api/sales/salesinvoices/")
+        self.assertEqual(request.headers["X-Workstation"], "Till 1")
@@ -0,0 +1,90 @@
+import gzip
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from .request_log import (
+    PayloadCapture,
+    RequestLog,
+    flush_buffered_logs,
+    flush_queued_logs,
+    open_request_log,
+)
+
+REQUEST_LOG = "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.request_log"
+
+
+class TestRequestLog(FrappeTestCase):
+    """Test Cases"""
+
+    def open_log(self, mode: str) -> RequestLog:
+        with patch(f"{REQUEST_LOG}.get_request_log_mode", return_value=mode):
+            return open_request_log(
+                request_description="TrnsSalesSaveWrReq",
+                url="https://etims.example.com/api/sales/salesinvoices/",
+                payload={"document_name": "ACC-SINV-2025-00001"},
+                headers={"Content-Type": "application/json"},
+                doctype="Sales Invoice",
+                document_name="ACC-SINV-2025-00001",
+                settings_name=None,
+            )
+
+    def test_buffered_log_written_once_with_final_status(self) -> None:
+        log = self.open_log("Buffered")
+        self.assertFalse(frappe.db.exists("Integration Request", log.name))
+
+        log.close("Completed", output="{}", request_description="Page 1 of 2")
+        flush_buffered_logs()
+
+        integration_request = frappe.get_doc("Integration Request", log.name)
+        self.assertEqual(integration_request.status, "Completed")
+        self.assertEqual(
+            integration_request.request_description,
+            "TrnsSalesSaveWrReq - Page 1 of 2",
+        )
+        self.assertEqual(integration_request.reference_docname, "ACC-SINV-2025-00001")
+
+    def test_background_log_written_by_flush_job(self) -> None:
+        log = self.open_log("Background")
+        log.close("Failed", error="Server unavailable")
+        self.assertFalse(frappe.db.exists("Integration Request", log.name))
+
+        flush_queued_logs()
+
+        self.assertEqual(
+            frappe.db.get_value("Integration Request", log.name, "error"),
+            "Server unavailable",
+        )
+
+    def test_immediate_log_inserted_before_the_call(self) -> None:
+        log = self.open_log("Immediate")
+        self.assertEqual(
+            frappe.db.get_value("Integration Request", log.name, "status"), "Queued"
+        )
+
+        log.close("Completed", output="{}")
+
+        self.assertEqual(
+            frappe.db.get_value("Integration Request", log.name, "status"),
+            "Completed",
+        )
+
+    def test_payload_capture_bounds_stored_text(self) -> None:
+        body = "x" * 4096
+
+        self.assertEqual(
+            PayloadCapture("Truncated", limit=8).capture(body), (body, None)
+        )
+
+        stored, attachment = PayloadCapture("Truncated", limit=1).capture(body)
+        self.assertTrue(stored.startswith("x" * 1024 + "\n... truncated: 4096 bytes"))
+        self.assertIsNone(attachment)
+
+        stored, attachment = PayloadCapture("Hash Only").capture("{}")
+        self.assertRegex(stored, r"^2 bytes, sha256:[0-9a-f]{64}$")
+        self.assertIsNone(attachment)
+
+        stored, attachment = PayloadCapture("Compressed File", limit=1).capture(body)
+        self.assertLess(len(stored), 200)
+        self.assertEqual(gzip.decompress(attachment).decode(), body)
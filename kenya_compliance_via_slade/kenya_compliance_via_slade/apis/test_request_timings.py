@@ -0,0 +1,48 @@
+from frappe.tests.utils import FrappeTestCase
+
+from ..benchmarks.stand_in_server import StandInConfig, StandInServer
+from .api_builder import RemoteRequest, send_request
+from .request_timings import DurationStats, LatencyHistogram, RequestTimings
+from .session_pool import PooledSession
+
+
+class TestRequestTimings(FrappeTestCase):
+    """Test Cases"""
+
+    def test_phases_of_exchange_timed(self) -> None:
+        session = PooledSession(pool_size=1, idle_timeout=0).session
+
+        with StandInServer(StandInConfig(latency=50)) as server:
+            request = RemoteRequest(
+                url=f"{server.url}/api/products/taxes/",
+                method="GET",
+                headers={},
+                success_callback=lambda **kwargs: None,
+            )
+            first, second = RequestTimings(), RequestTimings()
+            send_request(request, session, first)
+            send_request(request, session, second)
+
+        session.close()
+
+        self.assertGreater(first.connect, 0)
+        self.assertEqual(second.connect, 0)  # The connection was reused
+        self.assertGreaterEqual(first.time_to_first_byte, 50)
+        self.assertGreaterEqual(first.total, first.time_to_first_byte)
+
+    def test_percentiles_read_from_histogram(self) -> None:
+        histogram = LatencyHistogram()
+        for duration in range(1, 1001):
+            histogram.add(duration)
+
+        self.assertAlmostEqual(histogram.percentile(0.95), 950, delta=950 * 0.05)
+        self.assertAlmostEqual(histogram.percentile(0.99), 990, delta=990 * 0.05)
+        self.assertEqual(
+            LatencyHistogram.from_json(histogram.as_json()).buckets, histogram.buckets
+        )
+
+    def test_stats_merged(self) -> None:
+        totals = DurationStats(2, 10, 4, 6)
+        totals.merge(DurationStats(1, 2, 2, 2))
+
+        self.assertEqual(totals, DurationStats(3, 12, 2, 6))
@@ -0,0 +1,104 @@
+from typing import Callable
+
+import requests
+
+from frappe.tests.utils import FrappeTestCase
+
+from .retry_policy import (
+    NO_RETRIES,
+    RetryPolicy,
+    get_retry_after,
+    get_retry_policy,
+    send_with_retries,
+)
+
+
+def build_response(status_code: int, headers: dict | None = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+
+    return response
+
+
+class TestRetryPolicy(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        self.delays = []
+        self.policy = RetryPolicy(max_attempts=4, base_delay=1, max_delay=4)
+
+    def send_responses(
+        self, *outcomes: requests.Response | Exception
+    ) -> Callable[[], requests.Response]:
+        outcomes = list(outcomes)
+
+        def send() -> requests.Response:
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        return send
+
+    def test_transient_failures_are_retried(self) -> None:
+        send = self.send_responses(
+            build_response(503),
+            build_response(429, {"Retry-After": "2"}),
+            build_response(200),
+        )
+
+        response = send_with_retries(
+            send, "POST", self.policy, sleep=self.delays.append
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.delays), 2)
+        self.assertLessEqual(self.delays[0], 2)
+        self.assertEqual(self.delays[1], 2)
+
+    def test_post_not_resent_after_gateway_timeout(self) -> None:
+        send = self.send_responses(build_response(504), build_response(200))
+
+        response = send_with_retries(
+            send, "POST", self.policy, sleep=self.delays.append
+        )
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(self.delays, [])
+
+    def test_last_error_raised_when_attempts_exhausted(self) -> None:
+        send = self.send_responses(
+            *[requests.exceptions.ReadTimeout("timed out") for _ in range(4)]
+        )
+
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            send_with_retries(send, "GET", self.policy, sleep=self.delays.append)
+
+        self.assertEqual(len(self.delays), 3)
+
+    def test_retry_after_beyond_budget_stops_retries(self) -> None:
+        policy = RetryPolicy(max_attempts=4, max_elapsed_time=10)
+        send = self.send_responses(build_response(503, {"Retry-After": "60"}))
+
+        response = send_with_retries(send, "GET", policy, sleep=self.delays.append)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.delays, [])
+
+    def test_get_retry_after(self) -> None:
+        self.assertEqual(get_retry_after(build_response(429, {"Retry-After": "5"})), 5)
+        self.assertEqual(
+            get_retry_after(
+                build_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+            ),
+            0,
+        )
+        self.assertIsNone(get_retry_after(build_response(429)))
+
+    def test_get_retry_policy(self) -> None:
+        settings = {"enable_retries": 1, "retry_max_attempts": 5}
+
+        self.assertEqual(get_retry_policy(settings).max_attempts, 5)
+        self.assertIs(get_retry_policy(settings, retries_disabled=True), NO_RETRIES)
+        self.assertIs(get_retry_policy({"enable_retries": 0}), NO_RETRIES)
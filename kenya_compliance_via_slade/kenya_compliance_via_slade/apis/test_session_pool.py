@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from .session_pool import SessionPool, get_base_url
+
+
+class TestSessionPool(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        self.pool = SessionPool()
+
+    def tearDown(self) -> None:
+        self.pool.close_all()
+
+    def test_get_base_url(self) -> None:
+        self.assertEqual(
+            get_base_url("https://api.example.com/api/sales/sales_invoices/?page=2"),
+            "https://api.example.com",
+        )
+
+    def test_session_reused_per_server(self) -> None:
+        first = self.pool.get("https://api.example.com", 5, 300)
+        second = self.pool.get("https://api.example.com", 5, 300)
+        other = self.pool.get("https://accounts.example.com", 5, 300)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    def test_idle_session_evicted(self) -> None:
+        with patch(
+            "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.session_pool.time.monotonic",
+            return_value=1000.0,
+        ):
+            first = self.pool.get("https://api.example.com", 5, 60)
+
+        with patch(
+            "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.session_pool.time.monotonic",
+            return_value=1061.0,
+        ):
+            second = self.pool.get("https://api.example.com", 5, 60)
+
+        self.assertIsNot(first, second)
@@ -0,0 +1,110 @@
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from . import token_manager
+from .token_manager import (
+    AccessToken,
+    cache_token,
+    clear_cached_token,
+    discard_pending_tokens,
+    get_access_token,
+    get_cached_token,
+    refresh_access_token,
+)
+
+SETTINGS_NAME = "_Test Token Manager Settings"
+TOKEN_MANAGER = (
+    "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.token_manager"
+)
+
+
+class TestTokenManager(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        clear_cached_token(SETTINGS_NAME)
+        discard_pending_tokens()
+
+    def tearDown(self) -> None:
+        clear_cached_token(SETTINGS_NAME)
+        discard_pending_tokens()
+
+    def test_valid_token_reused(self) -> None:
+        cache_token(SETTINGS_NAME, AccessToken("current", time.time() + 3600))
+
+        with patch(f"{TOKEN_MANAGER}.refresh_access_token") as refresh_access_token:
+            self.assertEqual(get_access_token(SETTINGS_NAME), "current")
+
+        refresh_access_token.assert_not_called()
+
+    def test_expiring_token_reused_while_another_worker_refreshes(self) -> None:
+        cache_token(SETTINGS_NAME, AccessToken("current", time.time() + 60))
+        lock = frappe.cache.lock(
+            frappe.cache.make_key(f"etims_token_refresh|{SETTINGS_NAME}"), timeout=5
+        )
+
+        with (
+            lock,
+            patch(f"{TOKEN_MANAGER}.refresh_access_token") as refresh_access_token,
+        ):
+            self.assertEqual(get_access_token(SETTINGS_NAME), "current")
+
+        refresh_access_token.assert_not_called()
+
+    def test_rejected_token_refreshed_once(self) -> None:
+        cache_token(SETTINGS_NAME, AccessToken("rejected", time.time() + 3600))
+
+        def refresh(settings_name: str) -> AccessToken:
+            token = AccessToken("fresh", time.time() + 3600)
+            cache_token(settings_name, token)
+            return token
+
+        with patch(
+            f"{TOKEN_MANAGER}.refresh_access_token", side_effect=refresh
+        ) as refresh_access_token:
+            self.assertEqual(
+                get_access_token(SETTINGS_NAME, rejected_token="rejected"), "fresh"
+            )
+            # A worker that also sent the old token picks up the new one
+            self.assertEqual(
+                get_access_token(SETTINGS_NAME, rejected_token="rejected"), "fresh"
+            )
+
+        refresh_access_token.assert_called_once()
+
+    def test_refreshed_token_cached_once_committed(self) -> None:
+        settings = frappe._dict(
+            auth_server_url="https://auth.test.com",
+            auth_username="user",
+            client_id="client",
+        )
+        settings_doc = frappe._dict(get_password=lambda fieldname: "secret")
+
+        with (
+            patch.object(frappe.db, "get_value", return_value=settings),
+            patch.object(frappe, "get_doc", return_value=settings_doc),
+            patch.object(frappe.db, "set_value"),
+            patch.object(
+                token_manager,
+                "authenticate_and_get_token",
+                side_effect=[
+                    {"access_token": token, "refresh_token": "r", "expires_in": 3600}
+                    for token in ("rolled back", "committed")
+                ],
+            ),
+        ):
+            refresh_access_token(SETTINGS_NAME)
+            # Used by this worker, but not shared before the commit
+            self.assertEqual(get_access_token(SETTINGS_NAME), "rolled back")
+            self.assertIsNone(get_cached_token(SETTINGS_NAME))
+
+            frappe.db.after_rollback.run()
+            self.assertIsNone(get_cached_token(SETTINGS_NAME))
+
+            refresh_access_token(SETTINGS_NAME)
+            frappe.db.after_commit.run()
+
+        self.assertEqual(get_cached_token(SETTINGS_NAME).access_token, "committed")
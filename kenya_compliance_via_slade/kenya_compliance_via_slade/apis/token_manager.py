@@ -0,0 +1,212 @@
+"""Slade360 access tokens cached in Redis and refreshed by one worker at a time"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from redis.exceptions import LockError
+
+import frappe
+from frappe.utils import get_datetime
+
+from ..doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
+from ..logger import etims_logger
+from ..utils import authenticate_and_get_token
+
+# Tokens are refreshed this long before they expire, so requests in flight never
+# carry a token that lapses on the way
+REFRESH_LEEWAY = 300  # seconds
+
+# Upper bound on one OAuth round trip; the lock is released after this even if the
+# refreshing worker dies
+LOCK_TIMEOUT = 30  # seconds
+
+# How long a worker without a usable token waits for another worker's refresh
+LOCK_WAIT = 20  # seconds
+
+
+@dataclass(frozen=True)
+class AccessToken:
+    access_token: str
+    expires_at: float  # Unix timestamp
+
+    def is_expired(self, leeway: float = 0) -> bool:
+        return time.time() + leeway >= self.expires_at
+
+
+def get_access_token(settings_name: str, rejected_token: str | None = None) -> str:
+    """Fetch a valid access token for a settings record, refreshing it if necessary.
+
+    A token close to expiry is refreshed proactively by whichever worker gets the
+    lock first; the others keep using the current token meanwhile. If the token has
+    already expired, or was rejected by Slade360, the others wait for the refresh
+    instead.
+
+    Args:
+        settings_name (str): The Navari KRA eTims Settings record
+        rejected_token (str | None, optional): A token the server answered with 401.
+        It is replaced even if it has not expired yet.
+
+    Returns:
+        str: The access token
+    """
+    token = (
+        get_pending_token(settings_name)
+        or get_cached_token(settings_name)
+        or load_token(settings_name)
+    )
+
+    if token and not token.is_expired(REFRESH_LEEWAY):
+        if rejected_token is None or token.access_token != rejected_token:
+            return token.access_token
+
+    can_wait = not token or token.is_expired() or rejected_token is not None
+    lock = frappe.cache.lock(
+        frappe.cache.make_key(f"etims_token_refresh|{settings_name}"),
+        timeout=LOCK_TIMEOUT,
+        blocking=can_wait,
+        blocking_timeout=LOCK_WAIT,
+    )
+
+    try:
+        with lock:
+            # Another worker may have refreshed the token while this one waited
+            current = get_cached_token(settings_name)
+
+            if (
+                current
+                and not current.is_expired(REFRESH_LEEWAY)
+                and current.access_token != rejected_token
+                and (token is None or current.access_token != token.access_token)
+            ):
+                return current.access_token
+
+            return refresh_access_token(settings_name).access_token
+    except LockError:
+        if token and not token.is_expired() and token.access_token != rejected_token:
+            # Another worker is already refreshing ahead of expiry
+            return token.access_token
+
+        current = get_cached_token(settings_name)
+        if current and not current.is_expired():
+            return current.access_token
+
+        frappe.throw(
+            "Timed out waiting for the Slade360 access token to be refreshed.",
+            frappe.AuthenticationError,
+        )
+
+
+def refresh_access_token(settings_name: str) -> AccessToken:
+    """Authenticates against the auth server and stores the new token.
+
+    The token is written straight to the database rather than through a document
+    save, so it neither conflicts with concurrent edits of the settings record nor
+    triggers its update hooks. It is cached for other workers once the write is
+    committed.
+    """
+    settings = frappe.db.get_value(
+        SETTINGS_DOCTYPE_NAME,
+        settings_name,
+        ["auth_server_url", "auth_username", "client_id"],
+        as_dict=True,
+    )
+    settings_doc = frappe.get_doc(SETTINGS_DOCTYPE_NAME, settings_name)
+
+    token_details = authenticate_and_get_token(
+        settings.auth_server_url,
+        settings.auth_username,
+        settings_doc.get_password("auth_password"),
+        settings.client_id,
+        settings_doc.get_password("client_secret"),
+    )
+    token_expiry = datetime.now() + timedelta(seconds=token_details["expires_in"])
+
+    frappe.db.set_value(
+        SETTINGS_DOCTYPE_NAME,
+        settings_name,
+        {
+            "access_token": token_details["access_token"],
+            "refresh_token": token_details["refresh_token"],
+            "token_expiry": token_expiry,
+        },
+        update_modified=False,
+    )
+
+    token = AccessToken(token_details["access_token"], token_expiry.timestamp())
+    cache_token_after_commit(settings_name, token)
+    etims_logger.info("Refreshed Slade360 access token for %s", settings_name)
+
+    return token
+
+
+def get_token_key(settings_name: str) -> str:
+    return f"etims_access_token|{settings_name}"
+
+
+def get_cached_token(settings_name: str) -> AccessToken | None:
+    # Bypass the request-local cache, which would hide refreshes by other workers
+    return frappe.cache.get_value(get_token_key(settings_name), expires=True)
+
+
+def cache_token(settings_name: str, token: AccessToken) -> None:
+    frappe.cache.set_value(
+        get_token_key(settings_name),
+        token,
+        expires_in_sec=max(int(token.expires_at - time.time()), 1),
+    )
+
+
+def get_pending_token(settings_name: str) -> AccessToken | None:
+    """A token this worker refreshed, whose write is not committed yet"""
+    return (frappe.local.flags.get("etims_pending_tokens") or {}).get(settings_name)
+
+
+def cache_token_after_commit(settings_name: str, token: AccessToken) -> None:
+    """Caches the token once the current transaction is committed, so Redis never
+    holds a token that a rollback removed from the settings record. Until then, only
+    this worker uses it."""
+    pending = frappe.local.flags.setdefault("etims_pending_tokens", {})
+
+    if not pending:
+        frappe.db.after_commit.add(cache_pending_tokens)
+        frappe.db.after_rollback.add(discard_pending_tokens)
+
+    pending[settings_name] = token
+
+
+def cache_pending_tokens() -> None:
+    for settings_name, token in discard_pending_tokens().items():
+        cache_token(settings_name, token)
+
+
+def discard_pending_tokens() -> dict[str, AccessToken]:
+    return frappe.local.flags.pop("etims_pending_tokens", None) or {}
+
+
+def clear_cached_token(settings_name: str) -> None:
+    frappe.cache.delete_value(get_token_key(settings_name))
+
+
+def load_token(settings_name: str) -> AccessToken | None:
+    """Read the token stored on the settings record, caching it if still valid"""
+    settings = frappe.db.get_value(
+        SETTINGS_DOCTYPE_NAME,
+        settings_name,
+        ["access_token", "token_expiry"],
+        as_dict=True,
+    )
+
+    if not settings or not settings.access_token or not settings.token_expiry:
+        return None
+
+    token = AccessToken(
+        settings.access_token, get_datetime(settings.token_expiry).timestamp()
+    )
+
+    if not token.is_expired():
+        cache_token(settings_name, token)
+
+    return token
@@ -0,0 +1,400 @@
+"""Incremental syncs of the reference data eTims lists, e.g. code lists and prices.
+
+Each settings record keeps a sync state per route, holding a high-water mark: the
+latest `updated` time among the records the route has delivered for those settings.
+Routes with Incremental Sync enabled only request the records modified since, so a
+sync that finds nothing new is a single short request. The state is kept per
+settings record since each one syncs its own company and branch, e.g. its own price
+lists.
+
+A sync still fetches every record the first time, when forced, and once every
+`DRIFT_CHECK_INTERVAL`. Full syncs checksum the records they receive, and a warning
+is logged when the records changed although the incremental syncs since found no
+changes, i.e. when the server's modified-since filter misses changes.
+
+Long listings, e.g. the item classifications, can be synced resumably: after each
+page is written, the link to the next one is saved as the sync state's checkpoint,
+and an interrupted sync continues from there rather than from the first page.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Callable
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+from ..apis.process_request import extract_metadata, process_request
+from ..doctype.doctype_names_mapping import (
+    SETTINGS_DOCTYPE_NAME,
+    SYNC_STATE_DOCTYPE_NAME,
+)
+from ..logger import etims_logger
+from ..utils import get_route, get_settings, parse_request_data
+
+MODIFIED_SINCE_PARAM = "updated__gte"
+DRIFT_CHECK_INTERVAL = timedelta(days=7)
+
+# Syncs without modification times fall back to when they started, less a margin
+# for the difference between this server's clock and eTims'
+CLOCK_SKEW_MARGIN = timedelta(minutes=5)
+
+# Older checkpoints are dropped, as the records may have moved between pages since
+CHECKPOINT_MAX_AGE = timedelta(days=1)
+
+SYNC_STATE_FIELDS = (
+    "name",
+    "sync_high_water_mark",
+    "last_full_sync",
+    "full_sync_checksum",
+    "records_synced_since_full_sync",
+    "sync_checkpoint",
+)
+
+
+class SyncRun:
+    """Passes a sync's pages on to its handler, noting whether all of them arrived,
+    how many records they held and the latest time one was modified.
+
+    An incremental run also counts the records modified after the mark it started
+    from. Records modified at the mark itself are requested again by every sync,
+    since the filter includes the mark, and are not changes.
+    """
+
+    def __init__(
+        self,
+        handler_function: Callable,
+        incremental: bool,
+        error_callback: Callable | None = None,
+        since: str | None = None,
+    ) -> None:
+        self.handler_function = handler_function
+        self.incremental = incremental
+        self.since = since
+        self.error_callback = error_callback
+        self.checkpoint_state: frappe._dict | None = None  # The state to save pages to
+        self.started_at = now_datetime()
+        self.failed = False
+        self.last_page_seen = False
+        self.pages = 0
+        self.last_page_number = 0
+        self.total_pages = 0
+        self.record_count = 0
+        self.change_count = 0
+        self.latest_modified: str | None = None
+        self._checksum = 0
+
+    @classmethod
+    def resume(
+        cls,
+        handler_function: Callable,
+        checkpoint: dict,
+        error_callback: Callable | None = None,
+    ) -> SyncRun:
+        """Continues the interrupted sync the checkpoint was saved by"""
+        run = cls(
+            handler_function,
+            checkpoint["incremental"],
+            error_callback,
+            checkpoint.get("since"),
+        )
+        run.started_at = get_datetime(checkpoint["started_at"])
+        run.pages = checkpoint["pages"]
+        run.last_page_number = checkpoint["last_page_number"]
+        run.total_pages = checkpoint["total_pages"]
+        run.record_count = checkpoint["record_count"]
+        run.change_count = checkpoint.get("change_count", run.record_count)
+        run.latest_modified = checkpoint["latest_modified"]
+        run._checksum = int(checkpoint["checksum"], 16)
+
+        return run
+
+    def handle(self, response: dict | list, **kwargs: object) -> None:
+        next_url = None
+
+        if isinstance(response, dict):
+            records = response.get("results", [response])
+            next_url = response.get("next")
+            self.total_pages = cint(response.get("total_pages")) or self.total_pages
+            self.last_page_seen = self.last_page_seen or not next_url
+            self.check_page_number(cint(response.get("current_page")))
+        else:
+            records = response
+            self.last_page_seen = True
+
+        self.pages += 1
+
+        for record in records:
+            if isinstance(record, dict):
+                self.add_record(record)
+
+        self.handler_function(response=response, **kwargs)
+
+        if self.checkpoint_state and next_url and not self.failed:
+            self.save_checkpoint(next_url)
+
+    def check_page_number(self, page_number: int) -> None:
+        # Pages fetched concurrently are skipped if they cannot be fetched
+        if (
+            page_number
+            and self.last_page_number
+            and page_number != self.last_page_number + 1
+        ):
+            self.failed = True
+
+        self.last_page_number = page_number or self.last_page_number
+
+    def save_checkpoint(self, next_url: str) -> None:
+        checkpoint = {
+            "next": next_url,
+            "saved_at": now_datetime().isoformat(),
+            "started_at": self.started_at.isoformat(),
+            "incremental": self.incremental,
+            "since": self.since,
+            "pages": self.pages,
+            "last_page_number": self.last_page_number,
+            "total_pages": self.total_pages,
+            "record_count": self.record_count,
+            "change_count": self.change_count,
+            "latest_modified": self.latest_modified,
+            "checksum": self.checksum,
+        }
+        save_sync_state(
+            self.checkpoint_state, {"sync_checkpoint": json.dumps(checkpoint)}
+        )
+
+        # Along with the page the handler wrote
+        frappe.db.commit()
+
+    def fail(self, *args: object, **kwargs: object) -> None:
+        self.failed = True
+
+        if self.error_callback:
+            self.error_callback(*args, **kwargs)
+
+    def add_record(self, record: dict) -> None:
+        self.record_count += 1
+
+        # Summed rather than chained, so the order the records arrive in is irrelevant
+        digest = hashlib.sha256(
+            json.dumps(record, sort_keys=True, default=str).encode()
+        ).digest()
+        self._checksum = (self._checksum + int.from_bytes(digest, "big")) % 2**256
+
+        modified = record.get("updated")
+        if not (
+            self.since
+            and modified
+            and get_datetime(modified) <= get_datetime(self.since)
+        ):
+            self.change_count += 1
+
+        if modified and (
+            not self.latest_modified
+            or get_datetime(modified) > get_datetime(self.latest_modified)
+        ):
+            self.latest_modified = modified
+
+    @property
+    def complete(self) -> bool:
+        """Whether every page arrived and was handled"""
+        return (
+            not self.failed
+            and self.last_page_seen
+            and self.pages >= max(self.total_pages, 1)
+        )
+
+    @property
+    def checksum(self) -> str:
+        return f"{self._checksum:064x}"
+
+    def get_high_water_mark(self, previous: str | None) -> str:
+        if self.latest_modified:
+            return self.latest_modified
+
+        if self.incremental and not self.record_count:
+            return previous
+
+        return (self.started_at - CLOCK_SKEW_MARGIN).isoformat()
+
+
+def sync_reference_data(
+    request_data: str | dict | None,
+    route_key: str,
+    handler_function: Callable,
+    doctype: str = SETTINGS_DOCTYPE_NAME,
+    error_callback: Callable | None = None,
+    resumable: bool = False,
+) -> str:
+    """Runs a listing route through `process_request`, requesting only the records
+    modified since its last sync where the route allows.
+
+    Set `force_full_sync` in the request data to request every record. A
+    `resumable` sync saves a checkpoint after every page, and continues from the
+    route's checkpoint if its last sync was interrupted, unless forced.
+    """
+    data = dict(parse_request_data(request_data or {}))
+    force_full_sync = cint(data.pop("force_full_sync", 0))
+    state = get_sync_state(route_key, get_settings_name(data))
+    checkpoint = (
+        load_checkpoint(state) if resumable and state and not force_full_sync else None
+    )
+
+    if checkpoint:
+        run = SyncRun.resume(handler_function, checkpoint, error_callback)
+    else:
+        incremental = bool(
+            state
+            and state.incremental_sync
+            and state.sync_high_water_mark
+            and not force_full_sync
+            and not is_drift_check_due(state)
+        )
+        since = state.sync_high_water_mark if incremental else None
+        if since:
+            data[MODIFIED_SINCE_PARAM] = since
+
+        run = SyncRun(handler_function, incremental, error_callback, since)
+
+    if resumable and state:
+        run.checkpoint_state = state
+
+    message = process_request(
+        data,
+        route_key,
+        run.handle,
+        doctype=doctype,
+        error_callback=run.fail,
+        url=checkpoint["next"] if checkpoint else None,
+    )
+
+    if state and run.complete:
+        record_sync(route_key, state, run)
+
+    return message
+
+
+def get_settings_name(data: dict) -> str | None:
+    """The settings the request will be sent with"""
+    company_name, branch_id, _ = extract_metadata(dict(data))
+    settings = get_settings(company_name, branch_id)
+
+    return settings.get("name") if settings else None
+
+
+def get_sync_state(route_key: str, settings_name: str | None) -> frappe._dict | None:
+    """The route's sync state for the settings, read from the database since it
+    changes with every sync. Empty, without a name, until the first sync is recorded.
+
+    None if the route is not in the routes table or there are no settings.
+    """
+    if not settings_name:
+        return None
+
+    incremental_sync = get_incremental_sync(route_key)
+
+    if incremental_sync is None:
+        return None
+
+    state = (
+        frappe.db.get_value(
+            SYNC_STATE_DOCTYPE_NAME,
+            {"settings": settings_name, "route_key": route_key},
+            SYNC_STATE_FIELDS,
+            as_dict=True,
+        )
+        or frappe._dict()
+    )
+
+    state.update(
+        settings=settings_name, route_key=route_key, incremental_sync=incremental_sync
+    )
+
+    return state
+
+
+def get_incremental_sync(route_key: str) -> int | None:
+    """The route's Incremental Sync setting, or None if it is not in the table"""
+    route = get_route(route_key, "VSCU Slade 360")
+
+    return cint(route.incremental_sync) if route else None
+
+
+def save_sync_state(state: frappe._dict, updates: dict) -> None:
+    """Writes the updates to the sync state, creating it on the first write"""
+    if state.name:
+        frappe.db.set_value(
+            SYNC_STATE_DOCTYPE_NAME, state.name, updates, update_modified=False
+        )
+    else:
+        state.name = (
+            frappe.get_doc(
+                {
+                    "doctype": SYNC_STATE_DOCTYPE_NAME,
+                    "settings": state.settings,
+                    "route_key": state.route_key,
+                    **updates,
+                }
+            )
+            .insert(ignore_permissions=True)
+            .name
+        )
+
+    state.update(updates)
+
+
+def load_checkpoint(state: frappe._dict) -> dict | None:
+    if not state.sync_checkpoint:
+        return None
+
+    checkpoint = json.loads(state.sync_checkpoint)
+
+    if get_datetime(checkpoint["saved_at"]) + CHECKPOINT_MAX_AGE < now_datetime():
+        return None
+
+    return checkpoint
+
+
+def is_drift_check_due(state: frappe._dict, now: datetime | None = None) -> bool:
+    if not state.last_full_sync:
+        return True
+
+    next_full_sync = get_datetime(state.last_full_sync) + DRIFT_CHECK_INTERVAL
+
+    return next_full_sync <= (now or now_datetime())
+
+
+def record_sync(route_key: str, state: frappe._dict, run: SyncRun) -> None:
+    updates = {
+        "sync_high_water_mark": run.get_high_water_mark(state.sync_high_water_mark),
+        "sync_checkpoint": None,
+    }
+
+    if run.incremental:
+        updates["records_synced_since_full_sync"] = (
+            cint(state.records_synced_since_full_sync) + run.change_count
+        )
+    else:
+        if (
+            state.incremental_sync
+            and state.full_sync_checksum
+            and state.full_sync_checksum != run.checksum
+            and not cint(state.records_synced_since_full_sync)
+        ):
+            etims_logger.warning(
+                "%s records changed since the last full sync, although incremental "
+                "syncs found no changes. The server may not filter on %s.",
+                route_key,
+                MODIFIED_SINCE_PARAM,
+            )
+
+        updates.update(
+            last_full_sync=run.started_at,
+            full_sync_checksum=run.checksum,
+            records_synced_since_full_sync=0,
+        )
+
+    save_sync_state(state, updates)
@@ -0,0 +1,234 @@
+"""Rolls old Integration Requests of Slade360 calls up into daily summaries.
+
+Every sync and submission logs one Integration Request per call, so the table grows
+by tens of thousands of rows a day. Once older than the retention period set on the
+settings, the rows are counted per day, service and status, with their durations,
+into Navari eTims Integration Request Daily Summary records and deleted. The
+reports add the summaries to what is left of the table.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any
+
+from pypika.functions import Min
+
+import frappe
+from frappe.query_builder import DocType
+from frappe.utils import add_days, get_datetime, getdate, today
+
+from ..apis.request_timings import DurationStats, LatencyHistogram
+from ..doctype.doctype_names_mapping import INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME
+from ..logger import etims_logger
+from ..utils import active_settings_cache, routes_cache
+
+BATCH_SIZE = 1000
+
+SummaryKey = tuple[date, str, str]  # date, service, status
+
+
+def roll_up_integration_requests() -> None:
+    """Summarises and deletes the Integration Requests past the retention period.
+
+    Works through the rows in batches, committing after each, so an interrupted run
+    loses nothing and the next one carries on where it stopped.
+    """
+    retention_days = get_retention_days()
+    services = get_services()
+
+    if not retention_days or not services:
+        return
+
+    # Whole days only, so each day is summarised once all its rows are due
+    cutoff = get_datetime(add_days(today(), -retention_days))
+    rolled_up = 0
+
+    while True:
+        rows = get_expired_requests(cutoff, services)
+
+        if not rows:
+            break
+
+        save_summaries(summarise(rows))
+        delete_requests([row.name for row in rows])
+        frappe.db.commit()
+
+        rolled_up += len(rows)
+
+        if len(rows) < BATCH_SIZE:
+            break
+
+    if rolled_up:
+        etims_logger.info("Rolled up %s Integration Requests", rolled_up)
+
+
+def get_retention_days() -> int:
+    """The longest retention period set on the active settings, 0 if none is"""
+    return max(
+        (settings.get("integration_request_retention") or 0)
+        for settings in active_settings_cache.get() or [frappe._dict()]
+    )
+
+
+def get_services() -> list[str]:
+    """The services this app logs its calls under, i.e. its route keys.
+
+    Integration Requests of other integrations on the site are left alone.
+    """
+    return sorted(
+        {
+            route.url_path_function
+            for route in routes_cache.get().values()
+            if route.url_path_function
+        }
+    )
+
+
+def get_expired_requests(cutoff: datetime, services: list[str]) -> list[frappe._dict]:
+    IntegrationRequest = DocType("Integration Request")
+    Version = DocType("Version")
+
+    rows = (
+        frappe.qb.from_(IntegrationRequest)
+        .select(
+            IntegrationRequest.name,
+            IntegrationRequest.integration_request_service,
+            IntegrationRequest.status,
+            IntegrationRequest.creation,
+            IntegrationRequest.modified,
+            IntegrationRequest.custom_total_time,
+        )
+        .where(IntegrationRequest.creation < cutoff)
+        .where(IntegrationRequest.integration_request_service.isin(services))
+        .orderby(IntegrationRequest.creation)
+        .limit(BATCH_SIZE)
+    ).run(as_dict=True)
+
+    untimed = [row.name for row in rows if not row.custom_total_time]
+
+    if not untimed:
+        return rows
+
+    # Requests logged before calls were timed completed at their first status change,
+    # or, when logged in one write with their final status, when last modified
+    first_status_changes = dict(
+        frappe.qb.from_(Version)
+        .select(Version.docname, Min(Version.modified))
+        .where(Version.ref_doctype == "Integration Request")
+        .where(Version.docname.isin(untimed))
+        .where(Version.data.like('%"status"%'))
+        .groupby(Version.docname)
+        .run()
+    )
+
+    for row in rows:
+        row.completed_at = first_status_changes.get(row.name) or row.modified
+
+    return rows
+
+
+def summarise(rows: list[frappe._dict]) -> dict[SummaryKey, DurationStats]:
+    summaries: dict[SummaryKey, DurationStats] = {}
+
+    for row in rows:
+        key = (getdate(row.creation), row.integration_request_service, row.status)
+        summaries.setdefault(key, DurationStats()).add(get_duration(row))
+
+    return summaries
+
+
+def get_duration(row: frappe._dict) -> float | None:
+    """How long the call took, in seconds"""
+    if row.status == "Queued":
+        return None
+
+    if row.custom_total_time:
+        return row.custom_total_time / 1000
+
+    return (get_datetime(row.completed_at) - get_datetime(row.creation)).total_seconds()
+
+
+def save_summaries(summaries: dict[SummaryKey, DurationStats]) -> None:
+    """Adds the batch's figures to the days' summaries, creating missing ones"""
+    existing = frappe.get_all(
+        INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME,
+        filters={"summary_date": ["in", list({key[0] for key in summaries})]},
+        fields=[
+            "name",
+            "summary_date",
+            "integration_request_service",
+            "status",
+            "request_count",
+            "total_duration",
+            "min_duration",
+            "max_duration",
+            "duration_histogram",
+        ],
+    )
+    existing_by_key = {
+        (getdate(row.summary_date), row.integration_request_service, row.status): row
+        for row in existing
+    }
+
+    for key, stats in summaries.items():
+        summary = existing_by_key.get(key)
+
+        if not summary:
+            frappe.get_doc(
+                {
+                    "doctype": INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME,
+                    "summary_date": key[0],
+                    "integration_request_service": key[1],
+                    "status": key[2],
+                    **as_summary_fields(stats),
+                }
+            ).insert(ignore_permissions=True)
+            continue
+
+        totals = as_duration_stats(summary)
+        totals.merge(stats)
+        frappe.db.set_value(
+            INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME,
+            summary.name,
+            as_summary_fields(totals),
+        )
+
+
+def as_summary_fields(stats: DurationStats) -> dict[str, Any]:
+    return {
+        "request_count": stats.request_count,
+        "total_duration": stats.total_duration,
+        "min_duration": stats.min_duration,
+        "max_duration": stats.max_duration,
+        "duration_histogram": stats.histogram.as_json(),
+    }
+
+
+def as_duration_stats(summary: frappe._dict) -> DurationStats:
+    timed = summary.status != "Queued"
+
+    return DurationStats(
+        request_count=summary.request_count,
+        total_duration=summary.total_duration,
+        min_duration=summary.min_duration if timed else None,
+        max_duration=summary.max_duration if timed else None,
+        histogram=LatencyHistogram.from_json(summary.duration_histogram),
+    )
+
+
+def delete_requests(names: list[str]) -> None:
+    for file in frappe.get_all(
+        "File",
+        filters={
+            "attached_to_doctype": "Integration Request",
+            "attached_to_name": ["in", names],
+        },
+        pluck="name",
+    ):
+        frappe.delete_doc("File", file, ignore_permissions=True)
+
+    frappe.db.delete(
+        "Version", {"ref_doctype": "Integration Request", "docname": ["in", names]}
+    )
+    frappe.db.delete("Integration Request", {"name": ["in", names]})
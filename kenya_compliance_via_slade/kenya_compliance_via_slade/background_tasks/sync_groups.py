@@ -0,0 +1,293 @@
+"""Groups of independent eTims syncs, run as one background job per sync.
+
+Starting a group enqueues all of its jobs at once, so they run side by side on as
+many workers as serve the queue. Each job records its outcome in Redis, and the
+last one to finish joins the group: it runs the group's follow-up, e.g. syncs that
+need the group's records, and reports the combined status. Groups started from a
+settings form report their progress to it as they go.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any, Callable
+
+import frappe
+
+from ..apis.process_request import process_request
+from ..doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
+from ..logger import etims_logger
+from ..utils import parse_request_data, user_details_fetch
+from .delta_sync import sync_reference_data
+from .task_response_handlers import (
+    update_branches,
+    update_countries,
+    update_currencies,
+    update_packaging_units,
+    update_taxation_type,
+    update_unit_of_quantity,
+    update_workstations,
+    warehouse_search_on_success,
+)
+
+SYNC_QUEUE = "long"
+
+# A group whose jobs were lost can be started again after this long
+GROUP_TIMEOUT = 3600  # seconds
+
+
+@dataclass(frozen=True)
+class SyncTask:
+    route_key: str
+    handler_function: Callable
+    doctype: str = SETTINGS_DOCTYPE_NAME
+    incremental: bool = True  # Whether it may only fetch records modified since
+
+    def run(self, request_data: dict, error_callback: Callable | None = None) -> str:
+        sync = sync_reference_data if self.incremental else process_request
+
+        return sync(
+            request_data,
+            self.route_key,
+            self.handler_function,
+            doctype=self.doctype,
+            error_callback=error_callback,
+        )
+
+
+@dataclass(frozen=True)
+class SyncGroup:
+    title: str
+    tasks: tuple[SyncTask, ...]
+    on_complete: Callable[[dict], None] | None = None
+
+
+def sync_locations(request_data: dict) -> None:
+    # Locations are matched to the branches the group synced
+    process_request(
+        {"location_type": "internal"},
+        "LocationsSearchReq",
+        warehouse_search_on_success,
+        doctype="Warehouse",
+    )
+
+
+def complete_onboarding(request_data: dict) -> None:
+    sync_locations(request_data)
+
+    # Links the settings to the user's synced branch, workstation and department
+    if request_data.get("document_name"):
+        user_details_fetch(request_data["document_name"])
+
+
+ORGANISATION_UNIT_TASKS = (
+    SyncTask("BhfSearchReq", update_branches, incremental=False),
+    SyncTask("WorkstationSearchReq", update_workstations, incremental=False),
+)
+
+SYNC_GROUPS = {
+    "code_lists": SyncGroup(
+        "Code List Sync",
+        (
+            SyncTask("CurrencyCountrySearchReq", update_countries),
+            SyncTask("CurrencySearchReq", update_currencies),
+            SyncTask("PackagingUnitSearchReq", update_packaging_units),
+            SyncTask("QuantityUnitsSearchReq", update_unit_of_quantity),
+            SyncTask("TaxSearchReq", update_taxation_type),
+            # SyncTask("PaymentMtdSearchReq", update_payment_methods),
+        ),
+    ),
+    "organisation_units": SyncGroup(
+        "Organisation Units Sync", ORGANISATION_UNIT_TASKS, sync_locations
+    ),
+    "onboarding": SyncGroup(
+        "eTims Setup", ORGANISATION_UNIT_TASKS, complete_onboarding
+    ),
+}
+
+
+def start_sync_group(group_name: str, request_data: str | dict | None) -> str:
+    """Enqueues the group's syncs, once the current transaction is committed"""
+    group = SYNC_GROUPS[group_name]
+    data = dict(parse_request_data(request_data or {}))
+    group_id = frappe.generate_hash(length=10)
+    running_key = get_running_key(group_name, data)
+
+    if not frappe.cache.set(running_key, group_id, nx=True, ex=GROUP_TIMEOUT):
+        return f"{group.title} is already in progress."
+
+    frappe.db.after_rollback.add(lambda: frappe.cache.delete(running_key))
+    frappe.cache.set(get_key(group_id, "pending"), len(group.tasks), ex=GROUP_TIMEOUT)
+
+    for index, task in enumerate(group.tasks):
+        set_task_status(group_id, task.route_key, "Queued")
+        frappe.enqueue(
+            run_sync_task,
+            queue=SYNC_QUEUE,
+            job_id=f"etims_sync|{group_id}|{index}",
+            enqueue_after_commit=True,
+            group_name=group_name,
+            group_id=group_id,
+            index=index,
+            request_data=data,
+        )
+
+    return f"{group.title} started."
+
+
+def run_sync_group(group_name: str, request_data: str | dict | None) -> str:
+    """Runs the group's syncs one after another in the current process"""
+    group = SYNC_GROUPS[group_name]
+    data = dict(parse_request_data(request_data or {}))
+
+    messages = [task.run(dict(data)) for task in group.tasks]
+
+    if group.on_complete:
+        group.on_complete(dict(data))
+
+    return " ".join(message for message in messages if message)
+
+
+def run_sync_task(
+    group_name: str, group_id: str, index: int, request_data: dict
+) -> None:
+    group = SYNC_GROUPS[group_name]
+    task = group.tasks[index]
+    errors, responses = [], []
+
+    def handle_response(*args: Any, **kwargs: Any) -> None:
+        responses.append(True)
+        task.handler_function(*args, **kwargs)
+
+    set_task_status(group_id, task.route_key, "Running")
+
+    try:
+        message = replace(task, handler_function=handle_response).run(
+            dict(request_data),
+            lambda response, **kwargs: errors.append(response),
+        )
+    except Exception as error:
+        frappe.db.rollback()
+        frappe.log_error(title=f"{group.title}: {task.route_key} failed")
+        status, message = "Failed", str(error)
+    else:
+        frappe.db.commit()
+        status, message = get_task_outcome(task, message, errors, bool(responses))
+
+    set_task_status(group_id, task.route_key, status, message)
+
+    remaining = frappe.cache.incr(get_key(group_id, "pending"), -1)
+    publish_group_progress(
+        group,
+        request_data,
+        len(group.tasks) - remaining,
+        f"{task.route_key}: {status}",
+    )
+
+    if remaining == 0:
+        join_sync_group(group_name, group_id, request_data)
+
+
+def get_task_outcome(
+    task: SyncTask, message: str | None, errors: list, responded: bool
+) -> tuple[str, str | None]:
+    """The task's status and message. Syncs that were skipped, e.g. while the
+    route's circuit is open, or that got no response, e.g. on connection errors,
+    failed too, although no error was reported for them."""
+    if errors:
+        return "Failed", str(errors[0])
+
+    if message and ("skipped" in message or message.startswith("Failed")):
+        return "Failed", message
+
+    if not responded:
+        return "Failed", f"{task.route_key} got no response from eTims."
+
+    return "Completed", message
+
+
+def join_sync_group(group_name: str, group_id: str, request_data: dict) -> None:
+    """Runs the group's follow-up once all of its syncs finished, and reports how
+    they went"""
+    group = SYNC_GROUPS[group_name]
+
+    if group.on_complete:
+        step = group.on_complete.__name__
+
+        try:
+            group.on_complete(dict(request_data))
+        except Exception as error:
+            frappe.db.rollback()
+            frappe.log_error(title=f"{group.title}: {step} failed")
+            set_task_status(group_id, step, "Failed", str(error))
+        else:
+            frappe.db.commit()
+            set_task_status(group_id, step, "Completed")
+
+    statuses = get_sync_group_status(group_id)
+    failed = [step for step, status in statuses.items() if status["status"] == "Failed"]
+    frappe.cache.delete(get_running_key(group_name, request_data))
+
+    if failed:
+        summary = f"{group.title} finished. Failed: {', '.join(failed)}."
+        etims_logger.warning(summary)
+    else:
+        summary = f"{group.title} completed successfully."
+        etims_logger.info(summary)
+
+    if request_data.get("document_name"):
+        frappe.publish_realtime(
+            "msgprint",
+            {
+                "message": summary,
+                "title": group.title,
+                "indicator": "orange" if failed else "green",
+            },
+            doctype=SETTINGS_DOCTYPE_NAME,
+            docname=request_data["document_name"],
+        )
+
+
+def get_sync_group_status(group_id: str) -> dict[str, dict[str, Any]]:
+    """The status and message of each of the group's steps"""
+    return {
+        frappe.safe_decode(step): status
+        for step, status in frappe.cache.hgetall(get_status_key(group_id)).items()
+    }
+
+
+def set_task_status(
+    group_id: str, step: str, status: str, message: str | None = None
+) -> None:
+    status_key = get_status_key(group_id)
+    frappe.cache.hset(status_key, step, {"status": status, "message": message})
+    frappe.cache.expire(frappe.cache.make_key(status_key), GROUP_TIMEOUT)
+
+
+def publish_group_progress(
+    group: SyncGroup, request_data: dict, done: int, description: str
+) -> None:
+    if not request_data.get("document_name"):
+        return
+
+    frappe.publish_progress(
+        done * 100 / len(group.tasks),
+        title=group.title,
+        doctype=SETTINGS_DOCTYPE_NAME,
+        docname=request_data["document_name"],
+        description=description,
+    )
+
+
+def get_running_key(group_name: str, request_data: dict) -> str:
+    company = request_data.get("company_name") or ""
+
+    return frappe.cache.make_key(f"etims_sync_group|{group_name}|{company}|running")
+
+
+def get_status_key(group_id: str) -> str:
+    return f"etims_sync_group|{group_id}|status"
+
+
+def get_key(group_id: str, name: str) -> str:
+    return frappe.cache.make_key(f"etims_sync_group|{group_id}|{name}")
@@ -1,9 +1,12 @@
 import json
+from numbers import Number
 
 import frappe
 import frappe.defaults
 from frappe.model.document import Document
+from frappe.utils import cint, cstr, flt
 
+from ..code_tables import get_code_row, get_code_value, invalidate_code_table
 from ..doctype.doctype_names_mapping import (
     COUNTRIES_DOCTYPE_NAME,
     ITEM_CLASSIFICATIONS_DOCTYPE_NAME,
@@ -16,7 +19,10 @@ from ..doctype.doctype_names_mapping import (
     UOM_CATEGORY_DOCTYPE_NAME,
     WORKSTATION_DOCTYPE_NAME,
 )
-from ..utils import get_link_value
+from ..logger import etims_logger
+from ..utils import get_link_value, get_settings
+
+DEFAULT_CODE_LIST_BATCH_SIZE = 500
 
 
 def send_pos_invoices_information() -> None:
@@ -46,54 +52,224 @@ def update_documents(
     doctype_name: str,
     field_mapping: dict,
     filter_field: str = "code",
+    bulk: bool = False,
 ) -> None:
+    """Creates or updates a document of the doctype for each record.
+
+    Records are written in batches of the settings' code list batch size, with a
+    commit after each. The batch's existing documents and each link's targets are
+    read with one query apiece, and records whose mapped values match the stored
+    ones are skipped.
+
+    Changed records are saved through the ORM, unless `bulk` is set: then the batch's
+    new documents are written with one insert and its changed ones with one update.
+    Only `before_insert` runs for them, so bulk is for the app's code list doctypes,
+    which do not validate anything.
+    """
     if isinstance(data, str):
         try:
             data = json.loads(data)
         except json.JSONDecodeError:
             raise ValueError(f"Invalid JSON string: {data}")
 
-    doc_list = data if isinstance(data, list) else data.get("results", [data])
+    doc_list = [
+        record
+        for record in (data if isinstance(data, list) else data.get("results", [data]))
+        if not isinstance(record, str)
+    ]
+    batch_size = get_code_list_batch_size()
+
+    for start in range(0, len(doc_list), batch_size):
+        update_batch(
+            doc_list[start : start + batch_size],
+            doctype_name,
+            field_mapping,
+            filter_field,
+            bulk,
+        )
+        frappe.db.commit()
 
-    for record in doc_list:
-        if isinstance(record, str):
+
+def update_batch(
+    records: list[dict],
+    doctype_name: str,
+    field_mapping: dict,
+    filter_field: str,
+    bulk: bool,
+) -> None:
+    link_targets = get_link_targets(records, field_mapping)
+    columns = set(frappe.get_meta(doctype_name).get_valid_columns())
+    stored_fields = [field for field in field_mapping if field in columns]
+
+    # Later records of a key replace earlier ones, as when they were saved in turn
+    mapped_records, keyless = {}, 0
+    for record in records:
+        values = map_record(record, field_mapping, link_targets)
+
+        if key := get_lookup_key(values.get(filter_field)):
+            mapped_records[key] = values
+        else:
+            keyless += 1
+
+    if keyless:
+        etims_logger.warning(
+            "Skipped %s %s records without a %s", keyless, doctype_name, filter_field
+        )
+
+    if not mapped_records:
+        return
+
+    keys = [values[filter_field] for values in mapped_records.values()]
+    existing = {
+        get_lookup_key(row[filter_field]): row
+        for row in frappe.get_all(
+            doctype_name,
+            filters={filter_field: ["in", keys]},
+            fields=list(dict.fromkeys(["name", filter_field, *stored_fields])),
+        )
+    }
+
+    new_documents, changed_documents = [], {}
+    for key, values in mapped_records.items():
+        row = existing.get(key)
+
+        if not row:
+            new_documents.append(values)
             continue
 
-        filter_key = field_mapping.get(filter_field)
-        filter_value = record.get(filter_key)
-        doc_name = frappe.db.get_value(
-            doctype_name, {filter_field: filter_value}, "name"
+        changes = {
+            field: values[field]
+            for field in stored_fields
+            if field in values and values_differ(row[field], values[field])
+        }
+        if changes:
+            changed_documents[row.name] = changes if bulk else values
+
+    if bulk:
+        insert_documents(doctype_name, new_documents)
+        if changed_documents:
+            frappe.db.bulk_update(doctype_name, changed_documents)
+
+        # Bulk writes bypass the controllers, which invalidate the index otherwise
+        if new_documents or changed_documents:
+            invalidate_code_table(doctype_name)
+        return
+
+    for name, values in [
+        *((None, values) for values in new_documents),
+        *changed_documents.items(),
+    ]:
+        doc = (
+            frappe.get_doc(doctype_name, name) if name else frappe.new_doc(doctype_name)
         )
-        if doc_name:
-            doc = frappe.get_doc(doctype_name, doc_name)
-        else:
-            doc = frappe.new_doc(doctype_name)
-
-        for field, value in field_mapping.items():
-            if callable(value):
-                setattr(doc, field, value(record))
-            elif isinstance(value, dict):
-                linked_doctype = value.get("doctype")
-                link_field = value.get("link_field")
-                link_filter_field = value.get("filter_field", "custom_slade_id")
-                link_extract_field = value.get("extract_field", "name")
-                link_filter_value = record.get(link_field)
-                if linked_doctype and link_filter_value:
-                    linked_value = frappe.db.get_value(
-                        linked_doctype,
-                        {link_filter_field: link_filter_value},
-                        link_extract_field,
-                    )
-                    setattr(doc, field, linked_value or "")
-            else:
-                setattr(doc, field, record.get(value, ""))
+        doc.update(values)
 
         try:
             doc.save(ignore_permissions=True)
         except Exception:
             continue
 
-    frappe.db.commit()
+
+def insert_documents(doctype_name: str, new_documents: list[dict]) -> None:
+    rows = []
+
+    for values in new_documents:
+        doc = frappe.new_doc(doctype_name)
+        doc.update(values)
+
+        try:
+            doc.run_method("before_insert")
+            doc.set_new_name()
+        except Exception:
+            continue
+
+        doc.set_user_and_timestamp()
+        doc.docstatus = 0
+        doc.idx = 0
+        rows.append(doc.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True))
+
+    if not rows:
+        return
+
+    fields = list(rows[0])
+    # Documents created since the batch was read are skipped, like failed saves are
+    frappe.db.bulk_insert(
+        doctype_name,
+        fields,
+        [[row.get(field) for field in fields] for row in rows],
+        ignore_duplicates=True,
+    )
+
+
+def map_record(record: dict, field_mapping: dict, link_targets: dict) -> dict:
+    values = {}
+
+    for field, value in field_mapping.items():
+        if callable(value):
+            values[field] = value(record)
+        elif isinstance(value, dict):
+            link_filter_value = record.get(value.get("link_field"))
+            if value.get("doctype") and link_filter_value:
+                values[field] = link_targets[field].get(link_filter_value) or ""
+        else:
+            values[field] = record.get(value, "")
+
+    return values
+
+
+def get_link_targets(records: list[dict], field_mapping: dict) -> dict[str, dict]:
+    """The linked value of each link key in the records, per linked field"""
+    link_targets = {}
+
+    for field, value in field_mapping.items():
+        if not isinstance(value, dict) or not value.get("doctype"):
+            continue
+
+        link_filter_field = value.get("filter_field", "custom_slade_id")
+        link_extract_field = value.get("extract_field", "name")
+        link_keys = {record.get(value.get("link_field")) for record in records} - {
+            None,
+            "",
+        }
+
+        link_targets[field] = (
+            dict(
+                frappe.get_all(
+                    value["doctype"],
+                    filters={link_filter_field: ["in", list(link_keys)]},
+                    fields=[link_filter_field, link_extract_field],
+                    as_list=True,
+                )
+            )
+            if link_keys
+            else {}
+        )
+
+    return link_targets
+
+
+def get_lookup_key(value: object) -> str:
+    # The database compares keys ignoring case and trailing spaces
+    return cstr(value).rstrip().casefold()
+
+
+def values_differ(stored: object, value: object) -> bool:
+    if stored in (None, "") and value in (None, ""):
+        return False
+
+    if isinstance(stored, Number) or isinstance(value, Number):
+        return flt(stored) != flt(value)
+
+    return cstr(stored) != cstr(value)
+
+
+def get_code_list_batch_size() -> int:
+    settings = get_settings()
+
+    return (
+        cint(settings and settings.get("code_list_batch_size"))
+        or DEFAULT_CODE_LIST_BATCH_SIZE
+    )
 
 
 def update_unit_of_quantity(response: dict, **kwargs) -> None:
@@ -104,7 +280,7 @@ def update_unit_of_quantity(response: dict, **kwargs) -> None:
         "code_name": "name",
         "code_description": "description",
     }
-    update_documents(response, UNIT_OF_QUANTITY_DOCTYPE_NAME, field_mapping)
+    update_documents(response, UNIT_OF_QUANTITY_DOCTYPE_NAME, field_mapping, bulk=True)
 
 
 def update_packaging_units(response: dict, **kwargs) -> None:
@@ -115,7 +291,7 @@ def update_packaging_units(response: dict, **kwargs) -> None:
         "sort_order": "sort_order",
         "code_description": "description",
     }
-    update_documents(response, PACKAGING_UNIT_DOCTYPE_NAME, field_mapping)
+    update_documents(response, PACKAGING_UNIT_DOCTYPE_NAME, field_mapping, bulk=True)
 
 
 def update_payment_methods(response: dict, **kwargs) -> None:
@@ -133,7 +309,11 @@ def update_payment_methods(response: dict, **kwargs) -> None:
         "account": "account",
     }
     update_documents(
-        response, PAYMENT_TYPE_DOCTYPE_NAME, field_mapping, filter_field="slade_id"
+        response,
+        PAYMENT_TYPE_DOCTYPE_NAME,
+        field_mapping,
+        filter_field="slade_id",
+        bulk=True,
     )
 
 
@@ -162,6 +342,7 @@ def update_item_classification_codes(response: dict | list, **kwargs) -> None:
         ITEM_CLASSIFICATIONS_DOCTYPE_NAME,
         field_mapping,
         filter_field="itemclscd",
+        bulk=True,
     )
 
 
@@ -176,9 +357,7 @@ def update_taxation_type(response: dict, **kwargs) -> None:
             else taxation_type["name"]
         )
         try:
-            doc_name = frappe.db.get_value(
-                TAXATION_TYPE_DOCTYPE_NAME, {"cd": code}, "name"
-            )
+            doc_name = get_code_value(TAXATION_TYPE_DOCTYPE_NAME, "cd", code)
             doc = frappe.get_doc(TAXATION_TYPE_DOCTYPE_NAME, doc_name)
 
         except Exception:
@@ -200,22 +379,27 @@ def update_taxation_type(response: dict, **kwargs) -> None:
 def update_countries(response: list, **kwargs) -> None:
     doc: Document | None = None
     for code, details in response.items():
-        country_name = details.get("name", "").strip().lower()
-        existing_doc = frappe.get_value(
-            COUNTRIES_DOCTYPE_NAME, {"name": ["like", country_name]}
-        )
+        values = {
+            "code": code,
+            "code_name": details.get("name"),
+            "currency_code": details.get("currency_code"),
+            "sort_order": details.get("sort_order", 0),
+            "code_description": details.get("description", ""),
+        }
+        # Countries are named after their names, matched as in a LIKE query
+        existing = get_code_row(COUNTRIES_DOCTYPE_NAME, "name", details.get("name"))
+
+        if existing and not any(
+            values_differ(existing[field], value) for field, value in values.items()
+        ):
+            continue
 
-        if existing_doc:
-            doc = frappe.get_doc(COUNTRIES_DOCTYPE_NAME, existing_doc)
+        if existing:
+            doc = frappe.get_doc(COUNTRIES_DOCTYPE_NAME, existing["name"])
         else:
             doc = frappe.new_doc(COUNTRIES_DOCTYPE_NAME)
 
-        doc.code = code
-        doc.code_name = details.get("name")
-        doc.currency_code = details.get("currency_code")
-        doc.sort_order = details.get("sort_order", 0)
-        doc.code_description = details.get("description", "")
-
+        doc.update(values)
         doc.save(ignore_permissions=True)
 
     frappe.db.commit()
@@ -0,0 +1,261 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from . import delta_sync
+from .delta_sync import MODIFIED_SINCE_PARAM, SyncRun, sync_reference_data
+
+
+def serve_pages(requests: list[dict], *pages: dict) -> callable:
+    """Stands in for `process_request`, handing each page to the handler"""
+
+    def process_request(data: dict, route_key: str, handler, **kwargs) -> str:
+        requests.append(data)
+        for page in pages:
+            handler(response=page, document_name=None, doctype=None)
+        return f"{route_key} completed successfully."
+
+    return process_request
+
+
+class TestDeltaSync(FrappeTestCase):
+    """Test Cases"""
+
+    def test_run_complete_only_once_every_page_is_handled(self) -> None:
+        run = SyncRun(lambda **kwargs: None, incremental=False)
+        run.handle({"results": [{"id": "1"}], "next": "?page=2", "total_pages": 2})
+        self.assertFalse(run.complete)
+
+        run.handle({"results": [{"id": "2"}], "next": None, "total_pages": 2})
+        self.assertTrue(run.complete)
+
+        run.fail({"detail": "Server error"})
+        self.assertFalse(run.complete)
+
+    def test_checksum_ignores_record_order(self) -> None:
+        records = [{"id": "1", "name": "Box"}, {"id": "2", "name": "Bag"}]
+        first, second = SyncRun(print, False), SyncRun(print, False)
+
+        for record in records:
+            first.add_record(record)
+        for record in reversed(records):
+            second.add_record(record)
+
+        self.assertEqual(first.checksum, second.checksum)
+
+    def test_incremental_sync_requests_changes_since_high_water_mark(self) -> None:
+        state = frappe._dict(
+            name="route",
+            incremental_sync=1,
+            sync_high_water_mark="2026-01-01T00:00:00+03:00",
+            last_full_sync=datetime.now() - timedelta(days=1),
+            records_synced_since_full_sync=0,
+        )
+        requests = []
+        page = {
+            "results": [
+                {"id": "1", "updated": "2026-01-02T08:00:00+03:00"},
+                {"id": "2", "updated": "2026-01-03T08:00:00+03:00"},
+            ],
+            "next": None,
+        }
+
+        with (
+            patch.object(delta_sync, "get_sync_state", return_value=state),
+            patch.object(delta_sync, "process_request", serve_pages(requests, page)),
+            patch.object(frappe.db, "set_value") as set_value,
+        ):
+            sync_reference_data({}, "PackagingUnitSearchReq", lambda **kwargs: None)
+
+        self.assertEqual(requests[0][MODIFIED_SINCE_PARAM], "2026-01-01T00:00:00+03:00")
+        updates = set_value.call_args.args[2]
+        self.assertEqual(updates["sync_high_water_mark"], "2026-01-03T08:00:00+03:00")
+        self.assertEqual(updates["records_synced_since_full_sync"], 2)
+
+    def test_forced_sync_requests_every_record(self) -> None:
+        state = frappe._dict(
+            name="route",
+            incremental_sync=1,
+            sync_high_water_mark="2026-01-01T00:00:00+03:00",
+            last_full_sync=datetime.now(),
+        )
+        requests = []
+
+        with (
+            patch.object(delta_sync, "get_sync_state", return_value=state),
+            patch.object(
+                delta_sync, "process_request", serve_pages(requests, {"results": []})
+            ),
+            patch.object(frappe.db, "set_value") as set_value,
+        ):
+            sync_reference_data(
+                {"force_full_sync": 1}, "PackagingUnitSearchReq", lambda **kwargs: None
+            )
+
+        self.assertNotIn(MODIFIED_SINCE_PARAM, requests[0])
+        self.assertNotIn("force_full_sync", requests[0])
+        self.assertIn("full_sync_checksum", set_value.call_args.args[2])
+
+    def test_interrupted_sync_resumes_from_checkpoint(self) -> None:
+        pages = [
+            {
+                "results": [{"id": str(page), "updated": f"2026-01-0{page}T00:00:00"}],
+                "current_page": page,
+                "total_pages": 3,
+                "next": f"https://test.com/?page={page + 1}" if page < 3 else None,
+            }
+            for page in (1, 2, 3)
+        ]
+        state = frappe._dict(name="route", incremental_sync=1)
+        saved = {}
+        requested_urls = []
+
+        def process_request(data: dict, route_key: str, handler, **kwargs) -> str:
+            requested_urls.append(kwargs.get("url"))
+            start = 2 if kwargs.get("url") else 0
+            for page in pages[start:]:
+                handler(response=page)
+            return f"{route_key} completed successfully."
+
+        def interrupt(response: dict, **kwargs) -> None:
+            if response["current_page"] == 3:
+                raise ConnectionError("Worker stopped")
+
+        with (
+            patch.object(delta_sync, "get_sync_state", return_value=state),
+            patch.object(delta_sync, "process_request", process_request),
+            patch.object(
+                frappe.db,
+                "set_value",
+                side_effect=lambda doctype, name, field, value=None, **kwargs: (
+                    saved.update(field if isinstance(field, dict) else {field: value})
+                ),
+            ),
+        ):
+            with self.assertRaises(ConnectionError):
+                sync_reference_data({}, "ItemClsSearchReq", interrupt, resumable=True)
+
+            state.sync_checkpoint = saved["sync_checkpoint"]
+            sync_reference_data(
+                {}, "ItemClsSearchReq", lambda **kwargs: None, resumable=True
+            )
+
+        uninterrupted = SyncRun(lambda **kwargs: None, incremental=False)
+        for page in pages:
+            uninterrupted.handle(page)
+
+        self.assertEqual(requested_urls, [None, "https://test.com/?page=3"])
+        self.assertIsNone(saved["sync_checkpoint"])
+        self.assertEqual(saved["full_sync_checksum"], uninterrupted.checksum)
+        self.assertEqual(saved["sync_high_water_mark"], "2026-01-03T00:00:00")
+
+    def test_sync_state_kept_per_settings(self) -> None:
+        stored: dict[tuple[str, str], dict] = {}
+        requests = []
+
+        def get_value(doctype: str, filters: dict, fields: tuple, **kwargs) -> dict:
+            key = (filters["settings"], filters["route_key"])
+            return frappe._dict(stored[key]) if key in stored else None
+
+        def set_value(doctype: str, name: str, updates: dict, **kwargs) -> None:
+            next(state for state in stored.values() if state["name"] == name).update(
+                updates
+            )
+
+        class StandInDoc(frappe._dict):
+            def insert(self, **kwargs) -> "StandInDoc":
+                self.name = f"{self.settings}|{self.route_key}"
+                stored[(self.settings, self.route_key)] = dict(self)
+                return self
+
+        def sync(company: str, *modified: str) -> None:
+            page = {
+                "results": [
+                    {"id": str(index), "updated": updated}
+                    for index, updated in enumerate(modified)
+                ],
+                "next": None,
+            }
+            with patch.object(
+                delta_sync, "process_request", serve_pages(requests, page)
+            ):
+                sync_reference_data(
+                    {"company_name": company, "branch_id": "00"},
+                    "PriceListsSearchReq",
+                    lambda **kwargs: None,
+                )
+
+        with (
+            patch.object(
+                delta_sync,
+                "get_settings",
+                lambda company, branch: {"name": f"{company} Settings"},
+            ),
+            patch.object(delta_sync, "get_incremental_sync", return_value=1),
+            patch.object(frappe.db, "get_value", get_value),
+            patch.object(frappe.db, "set_value", set_value),
+            patch.object(frappe, "get_doc", StandInDoc),
+        ):
+            sync("Company A", "2026-01-03T00:00:00")
+            sync("Company B", "2026-01-01T00:00:00")
+            sync("Company A")
+            sync("Company B")
+
+        # Each company's first sync is a full one, and its next starts from its mark
+        self.assertNotIn(MODIFIED_SINCE_PARAM, requests[0])
+        self.assertNotIn(MODIFIED_SINCE_PARAM, requests[1])
+        self.assertEqual(requests[2][MODIFIED_SINCE_PARAM], "2026-01-03T00:00:00")
+        self.assertEqual(requests[3][MODIFIED_SINCE_PARAM], "2026-01-01T00:00:00")
+        self.assertEqual(
+            {key: state["sync_high_water_mark"] for key, state in stored.items()},
+            {
+                ("Company A Settings", "PriceListsSearchReq"): "2026-01-03T00:00:00",
+                ("Company B Settings", "PriceListsSearchReq"): "2026-01-01T00:00:00",
+            },
+        )
+
+    def test_drift_logged_when_incremental_syncs_only_see_boundary_record(
+        self,
+    ) -> None:
+        mark = "2026-01-03T00:00:00+03:00"
+        state = frappe._dict(
+            name="route",
+            incremental_sync=1,
+            sync_high_water_mark=mark,
+            last_full_sync=datetime.now() - timedelta(days=1),
+            full_sync_checksum="0" * 64,
+            records_synced_since_full_sync=0,
+        )
+        boundary = {"results": [{"id": "1", "updated": mark}], "next": None}
+        changed = {
+            "results": [
+                {"id": "1", "updated": mark},
+                {"id": "2", "name": "Changed", "updated": "2026-01-01T00:00:00+03:00"},
+            ],
+            "next": None,
+        }
+
+        def sync(page: dict, data: dict) -> None:
+            with patch.object(delta_sync, "process_request", serve_pages([], page)):
+                sync_reference_data(
+                    data, "PackagingUnitSearchReq", lambda **kwargs: None
+                )
+
+        with (
+            patch.object(delta_sync, "get_sync_state", return_value=state),
+            patch.object(frappe.db, "set_value"),
+            patch.object(delta_sync.etims_logger, "warning") as warning,
+        ):
+            # The server filters on the mark, so the boundary record comes back
+            sync(boundary, {})
+            self.assertEqual(state.records_synced_since_full_sync, 0)
+            self.assertEqual(state.sync_high_water_mark, mark)
+            warning.assert_not_called()
+
+            # Yet the full sync finds a record the filter missed
+            sync(changed, {"force_full_sync": 1})
+
+        warning.assert_called_once()
+        self.assertIn("PackagingUnitSearchReq", warning.call_args.args)
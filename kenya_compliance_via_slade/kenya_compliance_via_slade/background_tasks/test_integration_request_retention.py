@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from ..apis.request_timings import DurationStats
+from .integration_request_retention import get_duration, summarise
+
+
+class TestIntegrationRequestRetention(FrappeTestCase):
+    """Test Cases"""
+
+    def test_requests_summarised_per_day_service_and_status(self) -> None:
+        rows = [
+            frappe._dict(
+                integration_request_service="TrnsSalesSaveWrReq",
+                status="Completed",
+                creation=datetime(2026, 1, 1, 10, 0, 0),
+                completed_at=datetime(2026, 1, 1, 10, 0, seconds),
+            )
+            for seconds in (1, 3, 5)
+        ]
+        rows.append(
+            frappe._dict(
+                integration_request_service="TrnsSalesSaveWrReq",
+                status="Queued",
+                creation=datetime(2026, 1, 1, 23, 59, 0),
+                completed_at=datetime(2026, 1, 2, 0, 0, 0),
+            )
+        )
+
+        summaries = summarise(rows)
+
+        completed = summaries[(date(2026, 1, 1), "TrnsSalesSaveWrReq", "Completed")]
+        self.assertEqual(
+            (
+                completed.request_count,
+                completed.total_duration,
+                completed.min_duration,
+                completed.max_duration,
+            ),
+            (3, 9, 1, 5),
+        )
+        self.assertAlmostEqual(completed.percentile(0.5), 3, delta=0.1)
+
+        queued = summaries[(date(2026, 1, 1), "TrnsSalesSaveWrReq", "Queued")]
+        self.assertEqual(queued, DurationStats(request_count=1))
+
+    def test_measured_duration_preferred(self) -> None:
+        row = frappe._dict(
+            status="Completed",
+            custom_total_time=250,
+            creation=datetime(2026, 1, 1, 10, 0, 0),
+            completed_at=datetime(2026, 1, 1, 10, 0, 5),
+        )
+
+        self.assertEqual(get_duration(row), 0.25)
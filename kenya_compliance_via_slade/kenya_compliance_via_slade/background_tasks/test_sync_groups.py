@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import Callable
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from . import sync_groups
+from .sync_groups import SyncGroup, run_sync_task, start_sync_group
+
+
+@dataclass(frozen=True)
+class StandInTask:
+    route_key: str
+    error: dict | None = None
+    reaches_server: bool = True
+    message: str = "completed successfully."
+    handler_function: Callable = lambda **kwargs: None
+
+    def run(self, request_data: dict, error_callback: Callable | None = None) -> str:
+        if self.error:
+            error_callback(self.error)
+
+        if self.reaches_server:
+            self.handler_function(response={"results": []})
+
+        return f"{self.route_key} {self.message}"
+
+
+class TestSyncGroups(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        group = SyncGroup(
+            "Test Sync",
+            (
+                StandInTask("PackagingUnitSearchReq"),
+                StandInTask("TaxSearchReq", error={"detail": "Server error"}),
+            ),
+        )
+        unreachable = SyncGroup(
+            "Unreachable Sync",
+            (
+                # e.g. a connection error, which is logged but not reported
+                StandInTask("QuantityUnitsSearchReq", reaches_server=False),
+                StandInTask(
+                    "CurrencySearchReq",
+                    reaches_server=False,
+                    message="skipped. Requests are paused.",
+                ),
+            ),
+        )
+        patcher = patch.dict(
+            sync_groups.SYNC_GROUPS, {"test": group, "unreachable": unreachable}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_group_started_once_until_it_finishes(self) -> None:
+        request_data = {"company_name": "Test Company", "document_name": "settings"}
+
+        with (
+            patch.object(frappe, "enqueue") as enqueue,
+            patch.object(frappe.db, "after_rollback"),
+            patch.object(frappe, "publish_progress"),
+            patch.object(frappe, "publish_realtime") as publish_realtime,
+        ):
+            self.assertEqual(
+                start_sync_group("test", request_data), "Test Sync started."
+            )
+            self.assertEqual(
+                start_sync_group("test", request_data),
+                "Test Sync is already in progress.",
+            )
+            self.assertEqual(enqueue.call_count, 2)
+
+            # The workers run the jobs, the last one joins the group
+            for call in enqueue.call_args_list:
+                kwargs = {
+                    key: call.kwargs[key]
+                    for key in ("group_name", "group_id", "index", "request_data")
+                }
+                run_sync_task(**kwargs)
+
+            summary = publish_realtime.call_args.args[1]
+            self.assertEqual(summary["indicator"], "orange")
+            self.assertIn("TaxSearchReq", summary["message"])
+            self.assertNotIn("PackagingUnitSearchReq", summary["message"])
+
+            self.assertEqual(
+                start_sync_group("test", request_data), "Test Sync started."
+            )
+
+    def test_syncs_that_got_no_response_failed(self) -> None:
+        request_data = {"company_name": "Test Company", "document_name": "settings"}
+
+        with (
+            patch.object(frappe, "enqueue") as enqueue,
+            patch.object(frappe.db, "after_rollback"),
+            patch.object(frappe, "publish_progress"),
+            patch.object(frappe, "publish_realtime") as publish_realtime,
+        ):
+            start_sync_group("unreachable", request_data)
+
+            for call in enqueue.call_args_list:
+                kwargs = {
+                    key: call.kwargs[key]
+                    for key in ("group_name", "group_id", "index", "request_data")
+                }
+                run_sync_task(**kwargs)
+
+        summary = publish_realtime.call_args.args[1]
+        self.assertEqual(summary["indicator"], "orange")
+        self.assertIn("QuantityUnitsSearchReq", summary["message"])
+        self.assertIn("CurrencySearchReq", summary["message"])
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from ..doctype.doctype_names_mapping import UNIT_OF_QUANTITY_DOCTYPE_NAME
+from . import task_response_handlers
+from .task_response_handlers import update_unit_of_quantity, values_differ
+
+
+class TestTaskResponseHandlers(FrappeTestCase):
+    """Test Cases"""
+
+    def test_values_compared_as_stored(self) -> None:
+        self.assertFalse(values_differ(None, ""))
+        self.assertFalse(values_differ(2, "2"))
+        self.assertFalse(values_differ(0.5, 0.50))
+        self.assertTrue(values_differ("Nos", "Numbers"))
+        self.assertTrue(values_differ(None, "Numbers"))
+
+    def test_bulk_sync_writes_only_new_and_changed_records(self) -> None:
+        stored = [
+            frappe._dict(
+                name="U",
+                slade_id="1",
+                code="U",
+                sort_order=1,
+                code_name="Pieces",
+                code_description="Pieces",
+            ),
+            frappe._dict(
+                name="KG",
+                slade_id="2",
+                code="KG",
+                sort_order=2,
+                code_name="Kilogram",
+                code_description="Kilogram",
+            ),
+        ]
+        response = {
+            "results": [
+                {
+                    "id": "1",
+                    "code": "U",
+                    "sort_order": 1,
+                    "name": "Pieces",
+                    "description": "Pieces",
+                },
+                {
+                    "id": "2",
+                    "code": "KG",
+                    "sort_order": "2",
+                    "name": "Kilogramme",
+                    "description": "Kilogram",
+                },
+                {"id": "3", "code": "L", "sort_order": 3, "name": "Litre"},
+            ]
+        }
+
+        with (
+            patch.object(task_response_handlers, "get_settings", return_value=None),
+            patch.object(frappe, "get_all", return_value=stored),
+            patch.object(frappe.db, "bulk_insert") as bulk_insert,
+            patch.object(frappe.db, "bulk_update") as bulk_update,
+        ):
+            update_unit_of_quantity(response)
+
+        bulk_update.assert_called_once_with(
+            UNIT_OF_QUANTITY_DOCTYPE_NAME, {"KG": {"code_name": "Kilogramme"}}
+        )
+
+        doctype, fields, rows = bulk_insert.call_args.args
+        self.assertEqual(doctype, UNIT_OF_QUANTITY_DOCTYPE_NAME)
+        self.assertEqual(len(rows), 1)
+
+        inserted = dict(zip(fields, rows[0]))
+        self.assertEqual(inserted["name"], "L")
+        # Defaulted by the doctype's before_insert
+        self.assertEqual(inserted["code_description"], "L")
+
+    def test_records_without_a_code_are_skipped(self) -> None:
+        response = {
+            "results": [
+                {"id": "4", "code": "", "name": "Unnamed"},
+                {"id": "5", "code": None, "name": "Unknown"},
+                {"id": "6", "code": "BX", "name": "Box"},
+            ]
+        }
+
+        with (
+            patch.object(task_response_handlers, "get_settings", return_value=None),
+            patch.object(frappe, "get_all", return_value=[]),
+            patch.object(frappe.db, "bulk_insert") as bulk_insert,
+            patch.object(frappe.db, "bulk_update"),
+        ):
+            update_unit_of_quantity(response)
+
+        doctype, fields, rows = bulk_insert.call_args.args
+        self.assertEqual([dict(zip(fields, row))["code"] for row in rows], ["BX"])
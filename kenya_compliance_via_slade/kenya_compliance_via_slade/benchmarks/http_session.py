@@ -0,0 +1,85 @@
+"""Compares per-request latency of one-off requests against the pooled sessions.
+
+Run against a throwaway local stand-in server with:
+
+    bench --site <site> execute kenya_compliance_via_slade.kenya_compliance_via_slade.benchmarks.http_session.run
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+import requests
+
+from ..apis.session_pool import get_session, session_pool
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a small JSON body over a keep-alive connection"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"id": "stand-in", "status": "ok"}).encode()
+
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def time_requests(send: Callable[[], requests.Response], count: int) -> list[float]:
+    durations = []
+
+    for _ in range(count):
+        start = time.perf_counter()
+        send()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return durations
+
+
+def summarise(label: str, durations: list[float]) -> dict[str, str | float]:
+    ordered = sorted(durations)
+
+    return {
+        "mode": label,
+        "requests": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 3),
+    }
+
+
+def run(count: int = 500) -> list[dict[str, str | float]]:
+    """Send `count` requests with and without the pooled session and return the
+    results, which `bench execute` prints"""
+    count = int(count)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/sales/sales_invoices/"
+    payload = {"document_name": "ACC-SINV-2025-00001"}
+
+    try:
+        unpooled = time_requests(lambda: requests.post(url, json=payload), count)
+
+        session = get_session(url, pool_size=10, idle_timeout=60)
+        pooled = time_requests(lambda: session.post(url, json=payload), count)
+    finally:
+        session_pool.close_all()
+        server.shutdown()
+        server.server_close()
+
+    return [summarise("requests.post", unpooled), summarise("pooled", pooled)]
@@ -0,0 +1,315 @@
+"""End-to-end throughput of the integration's pipelines against the Slade360 stand-in.
+
+Each scenario runs a real entry point, and every job it enqueues runs inline, so one
+run covers a whole pipeline:
+
+- Sales invoice submission: invoice, lines, transition, signing and details
+- Item registration: product, inventory adjustment, line and transition
+- Stock ledger submission: operation, lines and transition
+- Code list refresh: currencies, countries, units and taxes, every page
+
+Run on a development site with existing test data:
+
+    bench --site <site> execute kenya_compliance_via_slade.kenya_compliance_via_slade.benchmarks.pipelines.run --kwargs "{'iterations': 50, 'latency': 20}"
+
+Requests go to a local stand-in server, never to Slade360. The active settings
+records are reused with their URLs pointed at the stand-in, and every run is rolled
+back, so runs are identical and leave no records behind. Files written by a run
+(e.g. QR code images) stay on disk.
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+from unittest.mock import patch
+
+import frappe
+
+from ..apis import api_builder, token_manager
+from ..apis.apis import perform_item_registration
+from ..apis.session_pool import get_base_url, session_pool
+from ..background_tasks.sync_groups import run_sync_group
+from ..logger import etims_logger
+from ..overrides.server.shared_overrides import generic_invoices_on_submit_override
+from ..overrides.server.stock_ledger_entry import save_ledger_details
+from ..utils import active_settings_cache, authenticate_and_get_token
+from .stand_in_server import StandInConfig, StandInServer
+
+SAVEPOINT = "etims_benchmark"
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[], Any]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    durations: list[float] = field(default_factory=list)  # milliseconds
+    queries: list[int] = field(default_factory=list)
+    http_requests: list[int] = field(default_factory=list)
+    failures: int = 0
+    elapsed: float = 0  # seconds
+
+    def summarise(self) -> dict[str, str | int | float]:
+        ordered = sorted(self.durations)
+
+        if not ordered:
+            return {"scenario": self.name, "runs": 0, "failures": self.failures}
+
+        return {
+            "scenario": self.name,
+            "runs": len(ordered),
+            "failures": self.failures,
+            "runs_per_second": round(len(ordered) / self.elapsed, 2),
+            "mean_ms": round(statistics.fmean(ordered), 2),
+            "p50_ms": round(percentile(ordered, 0.50), 2),
+            "p95_ms": round(percentile(ordered, 0.95), 2),
+            "p99_ms": round(percentile(ordered, 0.99), 2),
+            "queries_per_run": round(statistics.fmean(self.queries), 1),
+            "http_requests_per_run": round(statistics.fmean(self.http_requests), 1),
+        }
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run(
+    iterations: int = 20,
+    latency: float = 20,
+    latency_jitter: float = 0,
+    error_rate: float = 0,
+    page_size: int = 100,
+    record_count: int = 100,
+    sales_invoice: str | None = None,
+    item: str | None = None,
+    stock_ledger_entry: str | None = None,
+) -> list[dict[str, str | int | float]]:
+    """Runs every scenario `iterations` times and returns throughput, latency
+    percentiles and database queries per run, which `bench execute` prints.
+
+    Documents default to the most recent suitable ones on the site. Scenarios
+    without a suitable document are skipped.
+    """
+    if not frappe.conf.developer_mode:
+        frappe.throw("Benchmarks can only be run on sites in developer mode.")
+
+    config = StandInConfig(
+        latency=float(latency),
+        latency_jitter=float(latency_jitter),
+        error_rate=float(error_rate),
+        page_size=int(page_size),
+        record_count=int(record_count),
+    )
+    with StandInServer(config) as server, stand_in_site(server) as sql:
+        scenarios = get_scenarios(sales_invoice, item, stock_ledger_entry)
+        results = [
+            run_scenario(scenario, int(iterations), server, sql)
+            for scenario in scenarios
+        ]
+
+    return [result.summarise() for result in results]
+
+
+def get_scenarios(
+    sales_invoice: str | None, item: str | None, stock_ledger_entry: str | None
+) -> list[Scenario]:
+    sales_invoice = sales_invoice or frappe.db.get_value(
+        "Sales Invoice",
+        {"docstatus": 1, "is_return": 0},
+        "name",
+        order_by="creation desc",
+    )
+    item = item or frappe.db.get_value(
+        "Item",
+        {"disabled": 0, "custom_taxation_type": ["is", "set"]},
+        "name",
+        order_by="creation desc",
+    )
+    # Material transfers are not submitted, and other stock entries depend on
+    # their purpose, so default to entries of the other voucher types
+    stock_ledger_entry = stock_ledger_entry or frappe.db.get_value(
+        "Stock Ledger Entry",
+        {"is_cancelled": 0, "voucher_type": ["!=", "Stock Entry"]},
+        "name",
+        order_by="creation desc",
+    )
+    settings = active_settings_cache.get()[0]
+    code_list_request = {
+        "company_name": settings.company,
+        "branch_id": settings.bhfid,
+        # Every run downloads the full lists, rather than the changes since the last
+        "force_full_sync": 1,
+    }
+
+    scenarios = [
+        Scenario(
+            "Code list refresh",
+            lambda: run_sync_group("code_lists", dict(code_list_request)),
+        )
+    ]
+
+    if sales_invoice:
+        scenarios.append(
+            Scenario(
+                "Sales invoice submission",
+                lambda: generic_invoices_on_submit_override(
+                    frappe.get_doc("Sales Invoice", sales_invoice), "Sales Invoice"
+                ),
+            )
+        )
+
+    if item:
+        scenarios.append(
+            Scenario("Item registration", lambda: perform_item_registration(item))
+        )
+
+    if stock_ledger_entry:
+        scenarios.append(
+            Scenario(
+                "Stock ledger submission",
+                lambda: save_ledger_details(stock_ledger_entry),
+            )
+        )
+
+    return scenarios
+
+
+def run_scenario(
+    scenario: Scenario, iterations: int, server: StandInServer, sql: Any
+) -> ScenarioResult:
+    result = ScenarioResult(scenario.name)
+
+    # Warm up caches, sessions and the token
+    with rolled_back():
+        run_safely(scenario)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with rolled_back():
+            queries = sql.call_count
+            http_requests = server.hits.total()
+            start = time.perf_counter()
+
+            if not run_safely(scenario):
+                result.failures += 1
+                continue
+
+            result.durations.append((time.perf_counter() - start) * 1000)
+            result.queries.append(sql.call_count - queries)
+            result.http_requests.append(server.hits.total() - http_requests)
+
+    result.elapsed = time.perf_counter() - started
+
+    return result
+
+
+def run_safely(scenario: Scenario) -> bool:
+    try:
+        scenario.run()
+    except Exception:
+        etims_logger.exception("Benchmark scenario %s failed", scenario.name)
+        return False
+
+    return True
+
+
+@contextmanager
+def rolled_back() -> Iterator[None]:
+    """Undoes the database changes made inside the block, so every run starts alike"""
+    frappe.db.savepoint(SAVEPOINT)
+
+    try:
+        yield
+    finally:
+        frappe.db.rollback(save_point=SAVEPOINT)
+
+
+@contextmanager
+def stand_in_site(server: StandInServer) -> Iterator[Any]:
+    """Points the integration at the stand-in server for the current process.
+
+    Yields the patched `frappe.db.sql`, whose call count is the number of queries.
+    """
+    active_settings = active_settings_cache.get()
+
+    if not active_settings:
+        frappe.throw("Benchmarks need an active Navari KRA eTims Settings record.")
+
+    stand_in_settings = [
+        frappe._dict(
+            settings,
+            server_url=server.url,
+            auth_server_url=server.url,
+            # Circuit state is shared with the site's real traffic through Redis
+            enable_circuit_breaker=0,
+            # Logs queued in Redis would be written after the rollback
+            request_logging=(
+                "Buffered"
+                if settings.get("request_logging") == "Background"
+                else settings.get("request_logging")
+            ),
+        )
+        for settings in active_settings
+    ]
+    enqueue = frappe.enqueue
+
+    def run_now(method: str | Callable, **kwargs: Any) -> Any:
+        kwargs["now"] = True
+        return enqueue(method, **kwargs)
+
+    def refresh_access_token(settings_name: str) -> token_manager.AccessToken:
+        token_details = authenticate_and_get_token(
+            server.url, "benchmark", "benchmark", "benchmark", "benchmark"
+        )
+        token = token_manager.AccessToken(
+            token_details["access_token"], time.time() + token_details["expires_in"]
+        )
+        token_manager.cache_token(settings_name, token)
+
+        return token
+
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch.object(active_settings_cache, "get", return_value=stand_in_settings)
+        )
+        # Keep the site's own tokens, and route dates, out of the benchmark
+        stack.enter_context(
+            patch.object(
+                token_manager,
+                "get_token_key",
+                lambda settings_name: f"etims_benchmark_token|{settings_name}",
+            )
+        )
+        stack.enter_context(
+            patch.object(token_manager, "load_token", return_value=None)
+        )
+        stack.enter_context(
+            patch.object(
+                token_manager, "refresh_access_token", side_effect=refresh_access_token
+            )
+        )
+        stack.enter_context(patch.object(api_builder, "update_last_request_date"))
+        stack.enter_context(patch("frappe.enqueue", side_effect=run_now))
+        stack.enter_context(patch.object(frappe.local.db, "commit"))
+        sql = stack.enter_context(
+            patch.object(frappe.local.db, "sql", wraps=frappe.local.db.sql)
+        )
+
+        try:
+            yield sql
+        finally:
+            for settings in stand_in_settings:
+                token_manager.clear_cached_token(settings.name)
+
+            session_pool.close(get_base_url(server.url))
+            frappe.db.rollback()
@@ -0,0 +1,317 @@
+"""A local stand-in for the Slade360 API and OAuth server.
+
+Every route in the routes fixture is served with generated records, so the
+integration can be exercised without network access or a Slade360 account. Latency,
+error rate and page sizes are configurable.
+
+Start one for manual testing with:
+
+    python -m kenya_compliance_via_slade.kenya_compliance_via_slade.benchmarks.stand_in_server --port 8765 --latency 50
+
+then point the server and auth server URLs of a test site's settings record at it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+ROUTES_FIXTURE = (
+    Path(__file__).resolve().parents[2] / "fixtures" / "navari_etims_routes.json"
+)
+TOKEN_PATH = "/oauth2/token/"
+
+
+@dataclass
+class StandInConfig:
+    latency: float = 0  # milliseconds added to every response
+    latency_jitter: float = 0  # up to this many milliseconds more, at random
+    error_rate: float = 0  # share of API requests answered with `error_status`
+    error_status: int = 503
+    page_size: int = 100
+    record_count: int = 250  # records in every list
+    token_lifetime: int = 3600  # seconds
+
+
+@dataclass(frozen=True)
+class Route:
+    route_key: str
+    url_path: str
+    pattern: re.Pattern
+
+    @property
+    def is_parametrised(self) -> bool:
+        return bool(self.pattern.groupindex)
+
+
+def load_routes(fixture_path: Path = ROUTES_FIXTURE) -> list[Route]:
+    """Reads the routes fixture. Specific paths are listed before parametrised ones"""
+    with open(fixture_path) as fixture:
+        routes_tables = json.load(fixture)
+
+    routes = []
+    for routes_table in routes_tables:
+        for row in routes_table["routes_table"]:
+            url_path = row["url_path"]
+            pattern = re.escape(url_path.rstrip("/"))
+            pattern = re.sub(r"\\\{(\w+)\\\}", r"(?P<\1>[^/]+)", pattern)
+            routes.append(
+                Route(
+                    row["url_path_function"],
+                    url_path,
+                    re.compile(f"^{pattern}/?$"),
+                )
+            )
+
+    return sorted(routes, key=lambda route: route.is_parametrised)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves the Slade360 routes on a free local port from a background thread.
+
+    Use it as a context manager, or call `start` and `stop`. Requests served are
+    counted per method and route in `hits`, e.g. hits["POST /api/sales/salesinvoices/"].
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        config: StandInConfig | None = None,
+        routes: list[Route] | None = None,
+        port: int = 0,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.config = config or StandInConfig()
+        self.routes = routes if routes is not None else load_routes()
+        self.hits: Counter[str] = Counter()
+        self.tokens: dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> StandInServer:
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> StandInServer:
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def match(self, path: str) -> tuple[Route | None, str | None]:
+        """Finds the route serving a path, and the resource id in the path if any"""
+        for route in self.routes:
+            if match := route.pattern.match(path):
+                return route, next(iter(match.groupdict().values()), None)
+
+        return None, None
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.hits[name] += 1
+
+    def issue_token(self) -> dict[str, Any]:
+        access_token = uuid.uuid4().hex
+
+        with self.lock:
+            self.tokens[access_token] = time.time() + self.config.token_lifetime
+
+        return {
+            "access_token": access_token,
+            "refresh_token": uuid.uuid4().hex,
+            "expires_in": self.config.token_lifetime,
+            "token_type": "Bearer",
+            "scope": "read write",
+        }
+
+    def is_authorised(self, authorization: str | None) -> bool:
+        token = (authorization or "").removeprefix("Bearer ").strip()
+
+        with self.lock:
+            return self.tokens.get(token, 0) > time.time()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: StandInServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.handle_api_request()
+
+    def do_POST(self) -> None:  # noqa: N802
+        if urlsplit(self.path).path == TOKEN_PATH:
+            self.read_body()
+            self.server.count("token")
+            self.respond(200, self.server.issue_token())
+            return
+
+        self.handle_api_request()
+
+    def do_PATCH(self) -> None:  # noqa: N802
+        self.handle_api_request()
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self.handle_api_request()
+
+    def handle_api_request(self) -> None:
+        config = self.server.config
+        url = urlsplit(self.path)
+        body = self.read_body()
+        route, resource_id = self.server.match(url.path)
+
+        time.sleep((config.latency + random.random() * config.latency_jitter) / 1000)
+
+        if route is None:
+            self.respond(404, {"detail": f"No stand-in route for {url.path}"})
+            return
+
+        self.server.count(f"{self.command} {route.url_path}")
+
+        if not self.server.is_authorised(self.headers.get("Authorization")):
+            self.respond(401, {"detail": "Invalid or expired token"})
+            return
+
+        if config.error_rate and random.random() < config.error_rate:
+            self.respond(
+                config.error_status,
+                {"detail": "Stand-in failure"},
+                {"Retry-After": "1"} if config.error_status in (429, 503) else None,
+            )
+            return
+
+        if self.command == "GET" and resource_id:
+            self.respond(200, build_record(resource_id))
+        elif self.command == "GET":
+            self.respond(200, self.build_page(url.path, parse_qs(url.query)))
+        elif self.command == "POST":
+            self.respond(201, {**body, **build_record(uuid.uuid4().hex)})
+        else:
+            self.respond(200, {**body, "id": resource_id or body.get("id")})
+
+    def build_page(self, path: str, query: dict[str, list[str]]) -> dict[str, Any]:
+        config = self.server.config
+        page = int(query.get("page", ["1"])[0])
+        start = (page - 1) * config.page_size
+        end = min(start + config.page_size, config.record_count)
+        next_page = None
+
+        if end < config.record_count:
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query["page"] = page + 1
+            next_page = f"{self.server.url}{path}?{urlencode(next_query)}"
+
+        return {
+            "count": config.record_count,
+            "next": next_page,
+            "previous": None,
+            "results": [build_record(f"{index:08d}") for index in range(start, end)],
+        }
+
+    def read_body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        try:
+            parsed = json.loads(body) if body else {}
+        except ValueError:
+            # Form encoded, e.g. token requests
+            return {}
+
+        return parsed if isinstance(parsed, dict) else {}
+
+    def respond(
+        self, status: int, payload: Any, headers: dict[str, str] | None = None
+    ) -> None:
+        body = json.dumps(payload).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def build_record(record_id: str) -> dict[str, Any]:
+    """A record with the fields the response handlers read from most resources"""
+    return {
+        "id": record_id,
+        "code": record_id[-4:],
+        "name": f"Stand-in {record_id}",
+        "description": "Generated by the Slade360 stand-in server",
+        "sort_order": 1,
+        "active": True,
+        "sent_to_etims": True,
+        "percentage": 16,
+        "scu_data": {
+            "qr_code_url": f"https://etims.example.com/qr/{record_id}",
+            "scu_receipt_number": 1,
+            "scu_receipt_timestamp": "2025-01-01T00:00:00+03:00",
+            "scu_receipt_signature": record_id.upper(),
+            "scu_internal_data": record_id.upper(),
+            "scu_id": "KRACU0000000001",
+            "scu_mrc_number": "KRAMW00000000000001",
+            "scu_invoice_number": record_id,
+        },
+        "sales_invoice_tax_table": {},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds")
+    parser.add_argument("--latency-jitter", type=float, default=0, help="milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--record-count", type=int, default=250)
+    parser.add_argument("--token-lifetime", type=int, default=3600, help="seconds")
+    arguments = parser.parse_args()
+
+    config = StandInConfig(
+        latency=arguments.latency,
+        latency_jitter=arguments.latency_jitter,
+        error_rate=arguments.error_rate,
+        error_status=arguments.error_status,
+        page_size=arguments.page_size,
+        record_count=arguments.record_count,
+        token_lifetime=arguments.token_lifetime,
+    )
+    server = StandInServer(config, port=arguments.port)
+    print(f"Slade360 stand-in serving {len(server.routes)} routes on {server.url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
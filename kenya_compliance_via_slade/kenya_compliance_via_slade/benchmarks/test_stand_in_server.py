@@ -0,0 +1,58 @@
+import requests
+
+from frappe.tests.utils import FrappeTestCase
+
+from .stand_in_server import StandInConfig, StandInServer
+
+
+class TestStandInServer(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        self.server = StandInServer(StandInConfig(page_size=2, record_count=5)).start()
+        token = requests.post(f"{self.server.url}/oauth2/token/", timeout=5).json()
+        self.headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_unauthorised_request_rejected(self) -> None:
+        response = requests.get(f"{self.server.url}/api/products/taxes/", timeout=5)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_paginated(self) -> None:
+        url = f"{self.server.url}/api/products/taxes/"
+        records = []
+
+        while url:
+            page = requests.get(url, headers=self.headers, timeout=5).json()
+            records.extend(page["results"])
+            url = page["next"]
+
+        self.assertEqual(len(records), 5)
+        self.assertEqual(self.server.hits["GET /api/products/taxes/"], 3)
+
+    def test_resource_id_taken_from_path(self) -> None:
+        response = requests.patch(
+            f"{self.server.url}/api/sales/salesinvoices/abc123/transition/DRAFT_SUBMIT_APPROVE/",
+            json={"invoice_id": "abc123"},
+            headers=self.headers,
+            timeout=5,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], "abc123")
+
+    def test_errors_injected(self) -> None:
+        self.server.config.error_rate = 1
+
+        response = requests.post(
+            f"{self.server.url}/api/sales/salesinvoices/",
+            json={},
+            headers=self.headers,
+            timeout=5,
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
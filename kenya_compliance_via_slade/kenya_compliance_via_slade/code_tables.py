@@ -0,0 +1,117 @@
+"""In-memory indexes of the small eTims code tables, e.g. countries and units.
+
+Each table is read in full when first needed, into an index from the normalised
+values of its code, Slade id and name fields to its rows. The index is held in
+every worker's memory through a `VersionedCache`, so resolving a code costs a
+Redis lookup rather than a query. The tables' controllers invalidate it when a row
+is saved or deleted, as do the syncs that write the tables in bulk.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import frappe
+from frappe.utils import cstr
+
+from .doctype.doctype_names_mapping import (
+    COUNTRIES_DOCTYPE_NAME,
+    IMPORTED_ITEMS_STATUS_DOCTYPE_NAME,
+    PACKAGING_UNIT_DOCTYPE_NAME,
+    TAXATION_TYPE_DOCTYPE_NAME,
+    UNIT_OF_QUANTITY_DOCTYPE_NAME,
+)
+from .versioned_cache import VersionedCache
+
+
+@dataclass(frozen=True)
+class CodeTable:
+    key_fields: tuple[str, ...]  # Fields rows can be looked up by, besides name
+    value_fields: tuple[str, ...] = ()  # Other fields held for each row
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return ("name", *self.key_fields, *self.value_fields)
+
+
+CODE_TABLES = {
+    COUNTRIES_DOCTYPE_NAME: CodeTable(
+        ("code", "code_name"), ("currency_code", "sort_order", "code_description")
+    ),
+    IMPORTED_ITEMS_STATUS_DOCTYPE_NAME: CodeTable(("code", "code_name")),
+    PACKAGING_UNIT_DOCTYPE_NAME: CodeTable(
+        ("code", "slade_id", "code_name"), ("sort_order", "code_description")
+    ),
+    UNIT_OF_QUANTITY_DOCTYPE_NAME: CodeTable(
+        ("code", "slade_id", "code_name"), ("sort_order", "code_description")
+    ),
+    TAXATION_TYPE_DOCTYPE_NAME: CodeTable(
+        ("cd", "slade_id", "cdnm"), ("cddesc", "useyn", "srtord", "userdfncd1")
+    ),
+}
+
+
+def normalise_key(value: Any) -> str:
+    """Case and whitespace differences are ignored, as when comparing in MariaDB"""
+    return " ".join(cstr(value).split()).casefold()
+
+
+def load_code_table(doctype: str) -> dict[str, dict[str, dict]]:
+    table = CODE_TABLES[doctype]
+    index = {field: {} for field in ("name", *table.key_fields)}
+
+    # The first row of a key is the one `frappe.db.get_value` would return
+    for row in frappe.get_all(
+        doctype, fields=list(table.fields), order_by="modified desc"
+    ):
+        row = dict(row)
+
+        for field, rows in index.items():
+            if key := normalise_key(row[field]):
+                rows.setdefault(key, row)
+
+    return index
+
+
+code_table_caches = {
+    doctype: VersionedCache(
+        f"code_table|{doctype}", lambda doctype=doctype: load_code_table(doctype)
+    )
+    for doctype in CODE_TABLES
+}
+
+
+def is_indexed(doctype: str, field: str, return_field: str = "name") -> bool:
+    table = CODE_TABLES.get(doctype)
+
+    return bool(
+        table and field in ("name", *table.key_fields) and return_field in table.fields
+    )
+
+
+def get_code_row(doctype: str, field: str, value: Any) -> dict | None:
+    """The code table's row whose field matches the value, e.g. the country whose
+    name is "kenya". The row must not be modified."""
+    if not (key := normalise_key(value)):
+        return None
+
+    return code_table_caches[doctype].get()[field].get(key)
+
+
+def get_code_value(
+    doctype: str, field: str, value: Any, return_field: str = "name"
+) -> Any:
+    """Like `frappe.db.get_value(doctype, {field: value}, return_field)`, but read
+    from the index where the doctype is a code table indexed by the field"""
+    if not is_indexed(doctype, field, return_field):
+        return frappe.db.get_value(doctype, {field: value}, return_field)
+
+    row = get_code_row(doctype, field, value)
+
+    return row[return_field] if row else None
+
+
+def invalidate_code_table(doctype: str) -> None:
+    if doctype in code_table_caches:
+        code_table_caches[doctype].invalidate()
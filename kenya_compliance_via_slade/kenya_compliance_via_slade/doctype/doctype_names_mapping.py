@@ -41,6 +41,11 @@ REGISTERED_STOCK_MOVEMENTS_ITEM_DOCTYPE_NAME: Final[str] = (
 REGISTERED_IMPORTED_ITEM_DOCTYPE_NAME: Final[str] = (
     "Navari eTims Registered Imported Item"
 )
+INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME: Final[str] = (
+    "Navari eTims Integration Request Daily Summary"
+)
+INVOICE_SUBMISSION_DOCTYPE_NAME: Final[str] = "Navari eTims Invoice Submission"
+SYNC_STATE_DOCTYPE_NAME: Final[str] = "Navari eTims Sync State"
 
 # Global Variables
 SANDBOX_SERVER_URL: Final[str] = "https://etims-api-sbx.kra.go.ke/etims-api"
@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from ...code_tables import invalidate_code_table
+
 
 class NavarieTimsImportItemStatus(Document):
-    pass
+    def on_update(self) -> None:
+        invalidate_code_table(self.doctype)
+
+    def on_trash(self) -> None:
+        invalidate_code_table(self.doctype)
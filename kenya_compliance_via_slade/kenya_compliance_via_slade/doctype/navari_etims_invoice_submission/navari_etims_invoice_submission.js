@@ -0,0 +1,24 @@
+// Copyright (c) 2026, Navari Ltd and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Navari eTims Invoice Submission", {
+  refresh: function (frm) {
+    if (frm.doc.status === "Failed") {
+      frm.add_custom_button(__("Retry"), function () {
+        frappe.call({
+          method:
+            "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.invoice_submission.retry_invoice_submission",
+          args: {
+            name: frm.doc.name,
+          },
+          callback: (response) => {
+            frm.reload_doc();
+          },
+          error: (error) => {
+            // Error Handling is Defered to the Server
+          },
+        });
+      });
+    }
+  },
+});
@@ -0,0 +1,15 @@
+# Copyright (c) 2026, Navari Ltd and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from ..doctype_names_mapping import INVOICE_SUBMISSION_DOCTYPE_NAME
+
+
+class NavarieTimsInvoiceSubmission(Document):
+    pass
+
+
+def on_doctype_update() -> None:
+    frappe.db.add_index(INVOICE_SUBMISSION_DOCTYPE_NAME, ["invoice_type", "invoice"])
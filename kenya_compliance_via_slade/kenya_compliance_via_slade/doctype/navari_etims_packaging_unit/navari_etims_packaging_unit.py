@@ -4,6 +4,8 @@
 # import frappe
 from frappe.model.document import Document
 
+from ...code_tables import invalidate_code_table
+
 
 class NavarieTimsPackagingUnit(Document):
     def before_insert(self) -> None:
@@ -11,3 +13,9 @@ class NavarieTimsPackagingUnit(Document):
             self.code_description = self.code
         if not self.code_name and self.code:
             self.code_name = self.code
+
+    def on_update(self) -> None:
+        invalidate_code_table(self.doctype)
+
+    def on_trash(self) -> None:
+        invalidate_code_table(self.doctype)
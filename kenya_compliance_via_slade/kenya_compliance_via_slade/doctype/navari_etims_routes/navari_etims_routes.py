@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from ...utils import routes_cache
+
 
 class NavarieTimsRoutes(Document):
-    pass
+    def on_update(self) -> None:
+        routes_cache.invalidate()
+
+    def on_trash(self) -> None:
+        routes_cache.invalidate()
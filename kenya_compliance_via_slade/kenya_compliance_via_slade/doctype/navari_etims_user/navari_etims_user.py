@@ -4,6 +4,15 @@
 # import frappe
 from frappe.model.document import Document
 
+from ...utils import etims_user_workstations_cache
+
 
 class NavarieTimsUser(Document):
-    pass
+    def on_update(self) -> None:
+        if self.has_value_changed("workstation") or self.has_value_changed(
+            "system_user"
+        ):
+            etims_user_workstations_cache.invalidate()
+
+    def on_trash(self) -> None:
+        etims_user_workstations_cache.invalidate()
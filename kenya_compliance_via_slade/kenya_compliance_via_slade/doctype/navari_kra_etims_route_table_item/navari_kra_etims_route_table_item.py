@@ -6,6 +6,20 @@ from datetime import datetime
 # import frappe
 from frappe.model.document import Document
 
+from ...utils import routes_cache
+
+# Fields held in the routes cache, other than last_request_date which changes with
+# every request and is allowed to go stale
+CACHED_FIELDS = (
+    "url_path_function",
+    "url_path",
+    "fetch_pages_concurrently",
+    "max_concurrent_pages",
+    "max_concurrent_requests",
+    "disable_retries",
+    "incremental_sync",
+)
+
 
 class NavariKRAeTimsRouteTableItem(Document):
     """Route Table doctype child table"""
@@ -22,3 +36,11 @@ class NavariKRAeTimsRouteTableItem(Document):
 
         if not self.last_request_date:
             self.last_request_date = datetime.now()
+
+    def on_update(self) -> None:
+        # Rows saved on their own, rather than through the routes document
+        if any(self.has_value_changed(fieldname) for fieldname in CACHED_FIELDS):
+            routes_cache.invalidate()
+
+    def on_trash(self) -> None:
+        routes_cache.invalidate()
@@ -4,19 +4,27 @@ import frappe
 import frappe.defaults
 from frappe.model.document import Document
 
+from ...apis.session_pool import get_base_url, session_pool
+from ...apis.token_manager import clear_cached_token
+from ...background_tasks.sync_groups import start_sync_group
 from ...background_tasks.tasks import (
     refresh_notices,
-    search_organisations_request,
     send_purchase_information,
     send_sales_invoices_information,
     send_stock_information,
 )
-from ...utils import user_details_fetch
+from ...doctype.doctype_names_mapping import SYNC_STATE_DOCTYPE_NAME
+from ...utils import active_settings_cache
 
 
 class NavariKRAeTimsSettings(Document):
     """ETims Integration Settings doctype"""
 
+    def on_trash(self) -> None:
+        active_settings_cache.invalidate()
+        clear_cached_token(self.name)
+        frappe.db.delete(SYNC_STATE_DOCTYPE_NAME, {"settings": self.name})
+
     def after_insert(self) -> None:
         if self.is_active == 1:
             request_data = {
@@ -24,8 +32,8 @@ class NavariKRAeTimsSettings(Document):
                 "company_name": self.company,
                 "document_name": self.name,
             }
-            search_organisations_request(request_data)
-            user_details_fetch(self.name)
+            # Runs in the background, reporting its progress to the form
+            start_sync_group("onboarding", request_data)
 
     def validate(self) -> None:
         if self.is_active == 1:
@@ -45,6 +53,27 @@ class NavariKRAeTimsSettings(Document):
                 )
 
     def on_update(self) -> None:
+        active_settings_cache.invalidate()
+
+        if self.server_url:
+            # Drop this worker's pooled session so new pool settings take effect
+            session_pool.close(get_base_url(self.server_url))
+
+        if any(
+            self.has_value_changed(fieldname)
+            for fieldname in (
+                "auth_server_url",
+                "auth_username",
+                "client_id",
+                "client_secret",
+                "auth_password",
+                "access_token",
+                "is_active",
+            )
+        ):
+            # Credentials changed, or the token was edited by hand
+            clear_cached_token(self.name)
+
         def get_or_create_scheduled_job(
             method_name: str, frequency: str, cron_format: Optional[str] = None
         ) -> None:
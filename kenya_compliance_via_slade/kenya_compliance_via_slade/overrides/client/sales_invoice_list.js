@@ -12,6 +12,9 @@ frappe.listview_settings[doctypeName].onload = async function (listview) {
     listview.page.add_action_item(__("Bulk Submit to eTims"), function () {
       bulkSubmitInvoices(listview, doctypeName);
     });
+    listview.page.add_action_item(__("Prepare eTims QR Codes"), function () {
+      prerenderQrCodes(listview, doctypeName);
+    });
   }
 };
 
@@ -32,3 +35,23 @@ function bulkSubmitInvoices(listview, doctype) {
     },
   });
 }
+
+function prerenderQrCodes(listview, doctype) {
+  const invoices = listview.get_checked_items().map((item) => item.name);
+
+  frappe.call({
+    method:
+      "kenya_compliance_via_slade.kenya_compliance_via_slade.qr_codes.prerender_qr_codes",
+    args: {
+      doctype: doctype,
+      names: invoices,
+    },
+    freeze: true,
+    callback: (response) => {
+      frappe.show_alert(__("QR codes are being prepared for printing."));
+    },
+    error: (r) => {
+      // Error Handling is Defered to the Server
+    },
+  });
+}
@@ -4,14 +4,13 @@ from frappe import _
 from frappe.model.document import Document
 
 from ...apis.apis import perform_item_registration
-from ...doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
-from ...utils import generate_custom_item_code_etims
+from ...utils import generate_custom_item_code_etims, has_active_settings
 
 
 def on_update(doc: Document, method: str = None) -> None:
     """Item doctype before insertion hook"""
 
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
 
     if not doc.custom_sent_to_slade:
@@ -20,7 +19,7 @@ def on_update(doc: Document, method: str = None) -> None:
 
 def validate(doc: Document, method: str = None) -> None:
     # Check if the tax type field has changed
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
     is_tax_type_changed = doc.has_value_changed("custom_taxation_type")
     if doc.custom_taxation_type and is_tax_type_changed:
@@ -52,7 +51,7 @@ def validate(doc: Document, method: str = None) -> None:
 
 @frappe.whitelist()
 def prevent_item_deletion(doc: dict) -> None:
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
     if doc.custom_item_registered == 1:  # Assuming 1 means registered, adjust as needed
         frappe.throw(_("Cannot delete registered items"))
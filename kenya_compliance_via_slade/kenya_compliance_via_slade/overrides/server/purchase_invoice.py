@@ -3,19 +3,15 @@ from frappe.model.document import Document
 
 from erpnext.controllers.taxes_and_totals import get_itemised_tax_breakup_data
 
-from ...apis.api_builder import EndpointsBuilder
 from ...apis.process_request import process_request
 from ...apis.remote_response_status_handlers import (
     purchase_invoice_submission_on_success,
 )
-from ...doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
-from ...utils import get_taxation_types
-
-endpoints_builder = EndpointsBuilder()
+from ...utils import get_taxation_types, has_active_settings
 
 
 def validate(doc: Document, method: str = None) -> None:
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
     get_itemised_tax_breakup_data(doc)
     if not doc.taxes:
@@ -45,7 +41,7 @@ def submit_purchase_invoice(doc: Document) -> None:
     if doc.is_return == 0 and doc.update_stock == 1:
         # TODO: Handle cases when item tax templates have not been picked
 
-        if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+        if not has_active_settings():
             return
 
         company_name = (
@@ -1,17 +1,14 @@
-from typing import Literal
+from typing import Callable, Literal
 
 import frappe
 from frappe.model.document import Document
 
-from ...apis.api_builder import EndpointsBuilder
+from ...apis.invoice_submission import start_invoice_submission
 from ...apis.process_request import process_request
 from ...apis.remote_response_status_handlers import (
     sales_information_submission_on_success,
 )
-from ...doctype.doctype_names_mapping import SETTINGS_DOCTYPE_NAME
-from ...utils import build_invoice_payload
-
-endpoints_builder = EndpointsBuilder()
+from ...utils import build_invoice_payload, has_active_settings
 
 
 def generic_invoices_on_submit_override(
@@ -25,19 +22,44 @@ def generic_invoices_on_submit_override(
         The Type of the invoice. Either Sales, or POS
     """
 
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
 
-    for item in doc.items:
-        item_doc = frappe.get_doc("Item", item.item_code)
-        if not item_doc.custom_slade_id:
-            from ...apis.apis import perform_item_registration
+    start_invoice_submission(doc, invoice_type)
 
-            perform_item_registration(item_doc.name)
-            frappe.msgprint(
-                f"Item {item.item_code} is not registered. Cannot send invoice to eTims."
-            )
-            return
+
+def send_invoice_information(
+    doc: Document,
+    invoice_type: Literal["Sales Invoice", "POS Invoice"],
+    error_callback: Callable | None = None,
+) -> None:
+    """Sends the invoice itself, the first stage of its submission
+
+    Args:
+        doc (Document): The doctype object or record
+        invoice_type (Literal["Sales Invoice", "POS Invoice"]):
+        The Type of the invoice. Either Sales, or POS
+        error_callback (Callable | None): Called with the reason the invoice could
+        not be sent. Defaults to None.
+    """
+
+    def fail(message: str) -> None:
+        frappe.msgprint(message)
+        if error_callback:
+            error_callback(message)
+
+    unregistered_items = get_unregistered_items(doc)
+    if unregistered_items:
+        from ...apis.apis import register_items
+
+        register_items(unregistered_items)
+        unregistered_items = get_unregistered_items(doc)
+
+    if unregistered_items:
+        fail(
+            f"Items {', '.join(unregistered_items)} are not registered. Cannot send invoice to eTims."
+        )
+        return
 
     company_name = (
         doc.company
@@ -51,7 +73,7 @@ def generic_invoices_on_submit_override(
         return_invoice = frappe.get_doc("Sales Invoice", doc.return_against)
         route_key = "SalesCreditNoteSaveReq"
         if not return_invoice.custom_successfully_submitted:
-            frappe.msgprint(
+            fail(
                 f"Return against invoice {doc.return_against} was not successfully submitted. Cannot process return."
             )
             return
@@ -70,6 +92,19 @@ def generic_invoices_on_submit_override(
         ),
         request_method="POST",
         doctype=invoice_type,
+        error_callback=error_callback,
+    )
+
+
+def get_unregistered_items(doc: Document) -> list[str]:
+    """The invoice's items without a Slade360 id"""
+    return frappe.get_all(
+        "Item",
+        filters={
+            "name": ["in", list({item.item_code for item in doc.items})],
+            "custom_slade_id": ["is", "not set"],
+        },
+        pluck="name",
     )
 
 
@@ -4,21 +4,14 @@ from hashlib import sha256
 import frappe
 from frappe.model.document import Document
 
-from ...apis.api_builder import EndpointsBuilder
-
 # from ...apis.apis import save_operation_type
 from ...apis.process_request import process_request
-from ...doctype.doctype_names_mapping import (
-    OPERATION_TYPE_DOCTYPE_NAME,
-    SETTINGS_DOCTYPE_NAME,
-)
-from ...utils import extract_document_series_number, get_settings
-
-endpoints_builder = EndpointsBuilder()
+from ...doctype.doctype_names_mapping import OPERATION_TYPE_DOCTYPE_NAME
+from ...utils import extract_document_series_number, get_settings, has_active_settings
 
 
 def on_update(doc: Document, method: str | None = None) -> None:
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
 
     save_ledger_details(doc.name)
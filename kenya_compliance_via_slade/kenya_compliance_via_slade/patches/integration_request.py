@@ -0,0 +1,7 @@
+from .create_fields_from_json import create_fields_from_json
+
+
+def execute() -> None:
+    create_fields_from_json(
+        "./custom_fields/integration_request.json", "Integration Request"
+    )
@@ -0,0 +1,51 @@
+import frappe
+from frappe.utils import now_datetime
+
+from ..apis.invoice_submission import get_resume_stage, get_submission_timeframe
+from ..doctype.doctype_names_mapping import INVOICE_SUBMISSION_DOCTYPE_NAME
+
+
+def execute() -> None:
+    """Records the submission of the Sales Invoices the scheduled submission would
+    still have resubmitted, i.e. unfinished ones within the submission timeframe
+    that were sent on submit"""
+    now = now_datetime()
+
+    invoices = frappe.get_all(
+        "Sales Invoice",
+        filters={
+            "docstatus": 1,
+            "custom_qr_code": ["is", "not set"],
+            "update_stock": 1,
+            "custom_defer_etims_submission": 0,
+            "creation": [">=", now - get_submission_timeframe()],
+        },
+        fields=[
+            "name",
+            "custom_slade_id",
+            "custom_transition_successful",
+            "custom_successfully_submitted",
+            "custom_qr_code",
+        ],
+    )
+    existing = set(
+        frappe.get_all(
+            INVOICE_SUBMISSION_DOCTYPE_NAME,
+            filters={"invoice_type": "Sales Invoice"},
+            pluck="invoice",
+        )
+    )
+
+    for invoice in invoices:
+        if invoice.name in existing:
+            continue
+
+        frappe.get_doc(
+            {
+                "doctype": INVOICE_SUBMISSION_DOCTYPE_NAME,
+                "invoice_type": "Sales Invoice",
+                "invoice": invoice.name,
+                "stage": get_resume_stage(invoice),
+                "next_attempt_at": now,
+            }
+        ).insert(ignore_permissions=True)
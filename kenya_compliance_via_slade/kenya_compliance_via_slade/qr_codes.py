@@ -0,0 +1,110 @@
+"""QR codes of signed invoices, rendered when first shown rather than when signed.
+
+Invoices only store the QR code URL eTims returns. The PNG is rendered the first
+time a form or print format asks for it, and cached in Redis under a hash of the
+URL, so an invoice printed many times is rendered once and no File records are
+created. Batch printing can render a set of invoices' codes ahead, in a background
+job that spreads them over a process pool.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode
+
+import frappe
+
+from .utils import add_file_info, bytes_to_base64_string, get_qr_code_bytes
+
+QR_CODE_CACHE_TTL = 7 * 86400  # seconds, rendering again after is cheap
+
+
+def get_qr_code_png(url: str) -> bytes:
+    """The QR code of the URL as a PNG, rendered if it is not cached yet"""
+    cached = frappe.cache.get_value(get_cache_key(url))
+
+    if cached:
+        return cached
+
+    png = get_qr_code_bytes(url, format="PNG")
+    cache_qr_code(url, png)
+
+    return png
+
+
+def get_cache_key(url: str) -> str:
+    return f"etims_qr_code|{hashlib.sha256(url.encode()).hexdigest()}"
+
+
+def cache_qr_code(url: str, png: bytes) -> None:
+    frappe.cache.set_value(get_cache_key(url), png, expires_in_sec=QR_CODE_CACHE_TTL)
+
+
+def get_etims_qr_code(url: str | None) -> str:
+    """Jinja method for print formats: the QR code of the URL as a data URI, or an
+    empty string without one.
+
+    Data URIs are embedded in the page, so they also print to PDF, which cannot
+    fetch private images.
+    """
+    if not url:
+        return ""
+
+    return add_file_info(bytes_to_base64_string(get_qr_code_png(url)))
+
+
+def get_qr_code_image_url(doctype: str, name: str) -> str:
+    """The address the invoice's form loads its QR code image from"""
+    query = urlencode({"doctype": doctype, "name": name})
+
+    return f"/api/method/{get_qr_code_image.__module__}.get_qr_code_image?{query}"
+
+
+@frappe.whitelist()
+def get_qr_code_image(doctype: str, name: str) -> None:
+    """Serves the invoice's QR code as a PNG"""
+    frappe.has_permission(doctype, "read", name, throw=True)
+    url = frappe.db.get_value(doctype, name, "custom_qr_code_url")
+
+    if not url:
+        raise frappe.DoesNotExistError(f"{doctype} {name} has no QR code.")
+
+    frappe.local.response.filename = f"QR-{name}.png"
+    frappe.local.response.filecontent = get_qr_code_png(url)
+    frappe.local.response.type = "download"
+    frappe.local.response.display_content_as = "inline"
+
+
+@frappe.whitelist()
+def prerender_qr_codes(doctype: str, names: list[str] | str) -> int:
+    """Queues the rendering of the invoices' QR codes that are not cached yet, e.g.
+    before printing them in bulk. Returns the number queued."""
+    names = frappe.parse_json(names)
+    frappe.has_permission(doctype, "print", throw=True)
+
+    urls = {
+        url
+        for url in frappe.get_all(
+            doctype,
+            filters={"name": ["in", names], "custom_qr_code_url": ["is", "set"]},
+            pluck="custom_qr_code_url",
+        )
+        if not frappe.cache.get_value(get_cache_key(url))
+    }
+
+    if not urls:
+        return 0
+
+    frappe.enqueue(render_qr_codes, queue="short", urls=sorted(urls))
+
+    return len(urls)
+
+
+def render_qr_codes(urls: list[str]) -> None:
+    """Renders and caches the QR codes of the URLs. Runs as a background job, as it
+    starts a process per CPU."""
+    with ProcessPoolExecutor(max_workers=min(len(urls), os.cpu_count() or 1)) as pool:
+        for url, png in zip(urls, pool.map(get_qr_code_bytes, urls, chunksize=16)):
+            cache_qr_code(url, png)
@@ -0,0 +1,22 @@
+# Copyright (c) 2025, Navari Ltd and contributors
+# For license information, please see license.txt
+
+"""Filters shared by the Integration Request reports"""
+
+from typing import Any, Dict
+
+
+def apply_filters(query: Any, filters: Dict[str, Any], date: Any, service: Any) -> Any:
+    """Limits the query to the report's date range and selected services"""
+    if filters.get("from_date"):
+        query = query.where(date >= filters["from_date"])
+    if filters.get("to_date"):
+        query = query.where(date <= filters["to_date"])
+
+    if filters.get("integration_request_service"):
+        selected_services = filters["integration_request_service"]
+        if isinstance(selected_services, str):
+            selected_services = selected_services.split(",")
+        query = query.where(service.isin(selected_services))
+
+    return query
@@ -1,12 +1,23 @@
 # Copyright (c) 2025, Navari Ltd and contributors
 # For license information, please see license.txt
 
+import math
+from collections import Counter
 from typing import Any, Dict, List, Optional, Tuple
 
-from pypika.functions import Avg, Max, Min
+from pypika import CustomFunction
+from pypika.functions import Count, Floor, Max, Min, Sum
 
 import frappe
 from frappe.query_builder import DocType
+from frappe.utils import cint, flt
+
+from ...apis.request_timings import BUCKET_GROWTH, DurationStats, LatencyHistogram
+from ...doctype.doctype_names_mapping import INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME
+from ..integration_request_filters import apply_filters
+
+Ln = CustomFunction("LN", ["value"])
+Greatest = CustomFunction("GREATEST", ["first", "second"])
 
 
 def execute(
@@ -18,80 +29,141 @@ def execute(
             "fieldname": "integration_request_service",
             "label": "Service",
             "fieldtype": "Data",
-            "width": 450,
+            "width": 350,
+        },
+        {
+            "fieldname": "request_count",
+            "label": "Requests",
+            "fieldtype": "Int",
+            "width": 120,
         },
         {
             "fieldname": "avg_time",
             "label": "Average Time (Seconds)",
             "fieldtype": "Float",
-            "width": 250,
+            "width": 200,
         },
         {
             "fieldname": "min_time",
             "label": "Min Time (Seconds)",
             "fieldtype": "Float",
-            "width": 250,
+            "width": 180,
         },
         {
             "fieldname": "max_time",
             "label": "Max Time (Seconds)",
             "fieldtype": "Float",
-            "width": 250,
+            "width": 180,
+        },
+        {
+            "fieldname": "p95_time",
+            "label": "P95 Time (Seconds)",
+            "fieldtype": "Float",
+            "width": 180,
+        },
+        {
+            "fieldname": "p99_time",
+            "label": "P99 Time (Seconds)",
+            "fieldtype": "Float",
+            "width": 180,
         },
     ]
 
-    IntegrationRequest = DocType("Integration Request")
-    Version = DocType("Version")
+    services: Dict[str, DurationStats] = {}
 
-    # Subquery to get the first `modified` time when `status` changes
-    first_status_change_query = (
-        frappe.qb.from_(Version)
-        .select(
-            Version.ref_doctype,
-            Version.docname,
-            Min(Version.modified).as_("first_modified"),
+    for row in get_timed_requests(filters):
+        histogram = LatencyHistogram(
+            Counter({cint(row.bucket): cint(row.request_count)})
+        )
+
+        services.setdefault(row.integration_request_service, DurationStats()).merge(
+            DurationStats(
+                request_count=cint(row.request_count),
+                total_duration=flt(row.total_time) / 1000,
+                min_duration=flt(row.min_time) / 1000,
+                max_duration=flt(row.max_time) / 1000,
+                histogram=histogram,
+            )
+        )
+
+    # Requests past the retention period only remain as daily summaries
+    for row in get_rolled_up_requests(filters):
+        services.setdefault(row.integration_request_service, DurationStats()).merge(
+            DurationStats(
+                request_count=cint(row.request_count),
+                total_duration=flt(row.total_duration),
+                min_duration=flt(row.min_duration),
+                max_duration=flt(row.max_duration),
+                histogram=LatencyHistogram.from_json(row.duration_histogram),
+            )
         )
-        .where(
-            (Version.ref_doctype == "Integration Request")
-            & (Version.data.like('%"status"%'))
+
+    data = [
+        {
+            "integration_request_service": service,
+            "request_count": stats.request_count,
+            "avg_time": stats.total_duration / stats.request_count,
+            "min_time": stats.min_duration,
+            "max_time": stats.max_duration,
+            "p95_time": stats.percentile(0.95),
+            "p99_time": stats.percentile(0.99),
+        }
+        for service, stats in sorted(
+            services.items(), key=lambda service: service[0] or ""
         )
-        .groupby(Version.ref_doctype, Version.docname)
-    ).as_("status_change_times")
+        if stats.request_count
+    ]
+
+    return columns, data
+
+
+def get_timed_requests(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Counts, totals and extremes of the measured durations of the requests, in
+    milliseconds, per service and histogram bucket"""
+    IntegrationRequest = DocType("Integration Request")
+    total_time = IntegrationRequest.custom_total_time
+    bucket = Floor(Ln(Greatest(total_time, 1)) / math.log(BUCKET_GROWTH))
 
-    # Main query to compute avg, min, and max times based on the first status change
     query = (
         frappe.qb.from_(IntegrationRequest)
-        .join(first_status_change_query)
-        .on(IntegrationRequest.name == first_status_change_query.docname)
         .select(
             IntegrationRequest.integration_request_service,
-            Avg(
-                first_status_change_query.first_modified - IntegrationRequest.creation
-            ).as_("avg_time"),
-            Min(
-                first_status_change_query.first_modified - IntegrationRequest.creation
-            ).as_("min_time"),
-            Max(
-                first_status_change_query.first_modified - IntegrationRequest.creation
-            ).as_("max_time"),
+            bucket.as_("bucket"),
+            Count("*").as_("request_count"),
+            Sum(total_time).as_("total_time"),
+            Min(total_time).as_("min_time"),
+            Max(total_time).as_("max_time"),
         )
-        .groupby(IntegrationRequest.integration_request_service)
-        .orderby(IntegrationRequest.integration_request_service)
+        .where(IntegrationRequest.status != "Queued")
+        # Requests logged before calls were timed have no duration
+        .where(total_time > 0)
+        .groupby(IntegrationRequest.integration_request_service, bucket)
     )
 
-    if filters.get("from_date"):
-        query = query.where(IntegrationRequest.creation >= filters["from_date"])
-    if filters.get("to_date"):
-        query = query.where(IntegrationRequest.creation <= filters["to_date"])
-
-    if filters.get("integration_request_service"):
-        selected_services = filters["integration_request_service"]
-        if isinstance(selected_services, str):
-            selected_services = selected_services.split(",")
-        query = query.where(
-            IntegrationRequest.integration_request_service.isin(selected_services)
-        )
+    return apply_filters(
+        query,
+        filters,
+        IntegrationRequest.creation,
+        IntegrationRequest.integration_request_service,
+    ).run(as_dict=True)
 
-    data = query.run(as_dict=True)
 
-    return columns, data
+def get_rolled_up_requests(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    Summary = DocType(INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME)
+
+    query = (
+        frappe.qb.from_(Summary)
+        .select(
+            Summary.integration_request_service,
+            Summary.request_count,
+            Summary.total_duration,
+            Summary.min_duration,
+            Summary.max_duration,
+            Summary.duration_histogram,
+        )
+        .where(Summary.status != "Queued")
+    )
+
+    return apply_filters(
+        query, filters, Summary.summary_date, Summary.integration_request_service
+    ).run(as_dict=True)
@@ -9,6 +9,11 @@ from pypika.terms import Case
 import frappe
 from frappe.query_builder import DocType
 
+from ...doctype.doctype_names_mapping import INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME
+from ..integration_request_filters import apply_filters
+
+STATUSES = ("Queued", "Completed", "Cancelled", "Failed")
+
 
 def execute(
     filters: Optional[Dict[str, Any]] = None
@@ -62,19 +67,49 @@ def execute(
         .orderby(IntegrationRequest.integration_request_service)
     )
 
-    if filters.get("from_date"):
-        query = query.where(IntegrationRequest.creation >= filters["from_date"])
-    if filters.get("to_date"):
-        query = query.where(IntegrationRequest.creation <= filters["to_date"])
-
-    if filters.get("integration_request_service"):
-        selected_services = filters["integration_request_service"]
-        if isinstance(selected_services, str):
-            selected_services = selected_services.split(",")
-        query = query.where(
-            IntegrationRequest.integration_request_service.isin(selected_services)
+    query = apply_filters(
+        query,
+        filters,
+        IntegrationRequest.creation,
+        IntegrationRequest.integration_request_service,
+    )
+
+    totals = {row.integration_request_service: row for row in query.run(as_dict=True)}
+
+    # Requests past the retention period only remain as daily summaries
+    for row in get_rolled_up_counts(filters):
+        service = totals.setdefault(
+            row.integration_request_service,
+            frappe._dict(
+                integration_request_service=row.integration_request_service,
+                total=0,
+                **{status.lower(): 0 for status in STATUSES},
+            ),
         )
+        service[row.status.lower()] += row.request_count
+        service.total += row.request_count
 
-    data = query.run(as_dict=True)
+    data = sorted(
+        totals.values(), key=lambda row: row.integration_request_service or ""
+    )
 
     return columns, data
+
+
+def get_rolled_up_counts(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    Summary = DocType(INTEGRATION_REQUEST_SUMMARY_DOCTYPE_NAME)
+
+    query = (
+        frappe.qb.from_(Summary)
+        .select(
+            Summary.integration_request_service,
+            Summary.status,
+            Sum(Summary.request_count).as_("request_count"),
+        )
+        .where(Summary.status.isin(STATUSES))
+        .groupby(Summary.integration_request_service, Summary.status)
+    )
+
+    return apply_filters(
+        query, filters, Summary.summary_date, Summary.integration_request_service
+    ).run(as_dict=True)
@@ -0,0 +1,35 @@
+// Copyright (c) 2025, Navari Ltd and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Slade360 Circuit Status"] = {
+  filters: [
+    {
+      fieldname: "open_only",
+      label: "Open Circuits Only",
+      fieldtype: "Check",
+      default: 0,
+    },
+  ],
+
+  onload: function (report) {
+    report.page.add_inner_button(__("Close All Circuits"), function () {
+      const route_paths = (report.data || [])
+        .filter((row) => row.state !== "Closed")
+        .map((row) => row.route_path);
+
+      if (!route_paths.length) {
+        frappe.msgprint(__("All circuits are closed."));
+        return;
+      }
+
+      frappe.call({
+        method:
+          "kenya_compliance_via_slade.kenya_compliance_via_slade.apis.circuit_breaker.reset_circuits",
+        args: { route_paths: route_paths },
+        callback: function () {
+          report.refresh();
+        },
+      });
+    });
+  },
+};
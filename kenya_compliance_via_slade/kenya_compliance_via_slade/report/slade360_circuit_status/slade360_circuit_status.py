@@ -0,0 +1,91 @@
+# Copyright (c) 2025, Navari Ltd and contributors
+# For license information, please see license.txt
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+
+from ...apis.circuit_breaker import (
+    CircuitBreaker,
+    get_circuit_breaker,
+    get_opened_at,
+    get_recent_failures,
+)
+from ...doctype.doctype_names_mapping import ROUTES_TABLE_CHILD_DOCTYPE_NAME
+from ...utils import get_settings
+
+
+def execute(
+    filters: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+
+    columns = [
+        {
+            "fieldname": "route_key",
+            "label": "Route Key",
+            "fieldtype": "Data",
+            "width": 250,
+        },
+        {
+            "fieldname": "route_path",
+            "label": "Route Path",
+            "fieldtype": "Data",
+            "width": 350,
+        },
+        {"fieldname": "state", "label": "State", "fieldtype": "Data", "width": 120},
+        {
+            "fieldname": "recent_failures",
+            "label": "Recent Failures",
+            "fieldtype": "Int",
+            "width": 150,
+        },
+        {
+            "fieldname": "opened_at",
+            "label": "Opened At",
+            "fieldtype": "Datetime",
+            "width": 200,
+        },
+        {
+            "fieldname": "resumes_at",
+            "label": "Trial Request From",
+            "fieldtype": "Datetime",
+            "width": 200,
+        },
+    ]
+
+    settings = get_settings()
+    routes = frappe.get_all(
+        ROUTES_TABLE_CHILD_DOCTYPE_NAME,
+        filters={"parent": "VSCU Slade 360"},
+        fields=["url_path_function", "url_path"],
+        order_by="url_path_function",
+    )
+
+    data = []
+    for route in routes:
+        circuit_breaker = get_circuit_breaker(
+            route.url_path, settings
+        ) or CircuitBreaker(route.url_path)
+        opened_at = get_opened_at(route.url_path)
+
+        data.append(
+            {
+                "route_key": route.url_path_function,
+                "route_path": route.url_path,
+                "state": circuit_breaker.get_state(),
+                "recent_failures": get_recent_failures(route.url_path),
+                "opened_at": datetime.fromtimestamp(opened_at) if opened_at else None,
+                "resumes_at": (
+                    datetime.fromtimestamp(opened_at)
+                    + timedelta(seconds=circuit_breaker.reset_timeout)
+                    if opened_at
+                    else None
+                ),
+            }
+        )
+
+    if filters and filters.get("open_only"):
+        data = [row for row in data if row["state"] != "Closed"]
+
+    return columns, data
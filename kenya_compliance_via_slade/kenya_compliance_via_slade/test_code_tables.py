@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from .background_tasks import task_response_handlers
+from .code_tables import code_table_caches, get_code_value
+from .doctype.doctype_names_mapping import (
+    ITEM_CLASSIFICATIONS_DOCTYPE_NAME,
+    PACKAGING_UNIT_DOCTYPE_NAME,
+)
+
+COUNTRIES = [
+    {
+        "name": "Kenya",
+        "code": "KE",
+        "code_name": "Kenya",
+        "currency_code": "KES",
+        "sort_order": "1",
+        "code_description": "",
+    },
+    {
+        "name": "United Republic of Tanzania",
+        "code": "TZ",
+        "code_name": "United Republic of Tanzania",
+        "currency_code": "TZS",
+        "sort_order": "2",
+        "code_description": "",
+    },
+]
+
+
+class TestCodeTables(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        for cache in code_table_caches.values():
+            cache.invalidate_now()
+            self.addCleanup(cache.invalidate_now)
+
+    def test_lookups_read_the_index(self) -> None:
+        units = [
+            {
+                "name": "BX",
+                "code": "BX",
+                "slade_id": "a1",
+                "code_name": "Box",
+                "sort_order": 1,
+                "code_description": "Box",
+            }
+        ]
+
+        with (
+            patch.object(frappe, "get_all", return_value=units) as get_all,
+            patch.object(frappe.db, "get_value", return_value="Food") as get_value,
+        ):
+            self.assertEqual(
+                get_code_value(PACKAGING_UNIT_DOCTYPE_NAME, "code", "bx"), "BX"
+            )
+            self.assertEqual(
+                get_code_value(PACKAGING_UNIT_DOCTYPE_NAME, "slade_id", "a1", "code"),
+                "BX",
+            )
+            self.assertEqual(
+                get_code_value(PACKAGING_UNIT_DOCTYPE_NAME, "code_name", " BOX "), "BX"
+            )
+            self.assertIsNone(get_code_value(PACKAGING_UNIT_DOCTYPE_NAME, "code", "CT"))
+            self.assertIsNone(get_code_value(PACKAGING_UNIT_DOCTYPE_NAME, "code", None))
+            get_value.assert_not_called()
+
+            # Tables other than the code tables are still queried
+            self.assertEqual(
+                get_code_value(ITEM_CLASSIFICATIONS_DOCTYPE_NAME, "itemclscd", "1"),
+                "Food",
+            )
+
+        get_all.assert_called_once()
+
+    def test_update_countries_saves_only_new_and_changed_countries(self) -> None:
+        response = {
+            "KE": {"name": "Kenya", "currency_code": "KES", "sort_order": 1},
+            "TZ": {
+                "name": "united republic of tanzania",
+                "currency_code": "TZS",
+                "sort_order": 3,
+            },
+            "UG": {"name": "Uganda", "currency_code": "UGX", "sort_order": 4},
+        }
+        saved = []
+
+        class StandInDoc(frappe._dict):
+            def save(self, **kwargs) -> None:
+                saved.append(self)
+
+        with (
+            patch.object(frappe, "get_all", return_value=COUNTRIES),
+            patch.object(frappe.db, "get_value") as get_value,
+            patch.object(
+                frappe, "get_doc", lambda doctype, name: StandInDoc(name=name)
+            ),
+            patch.object(frappe, "new_doc", lambda doctype: StandInDoc()),
+            patch.object(frappe.db, "commit"),
+        ):
+            task_response_handlers.update_countries(response)
+
+        get_value.assert_not_called()
+        self.assertEqual(
+            [(doc.name, doc.code) for doc in saved],
+            [("United Republic of Tanzania", "TZ"), (None, "UG")],
+        )
+        self.assertEqual(saved[0].sort_order, 3)
@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from . import qr_codes
+from .qr_codes import get_cache_key, get_etims_qr_code, get_qr_code_png
+
+QR_CODE_URL = "https://etims.kra.go.ke/common/link/etims/receipt/_test_qr_code"
+
+
+class TestQrCodes(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        frappe.cache.delete_value(get_cache_key(QR_CODE_URL))
+
+    def test_rendered_once(self) -> None:
+        with patch.object(
+            qr_codes, "get_qr_code_bytes", wraps=qr_codes.get_qr_code_bytes
+        ) as render:
+            png = get_qr_code_png(QR_CODE_URL)
+
+            self.assertEqual(get_qr_code_png(QR_CODE_URL), png)
+            self.assertEqual(render.call_count, 1)
+
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+    def test_print_format_method(self) -> None:
+        self.assertTrue(
+            get_etims_qr_code(QR_CODE_URL).startswith("data:image/png;base64,")
+        )
+        self.assertEqual(get_etims_qr_code(None), "")
+
+    def test_prerendering_queued_for_uncached_codes(self) -> None:
+        cached_url = f"{QR_CODE_URL}_cached"
+        qr_codes.cache_qr_code(cached_url, b"\x89PNG")
+        self.addCleanup(frappe.cache.delete_value, get_cache_key(cached_url))
+
+        with (
+            patch.object(frappe, "has_permission"),
+            patch.object(frappe, "get_all", return_value=[QR_CODE_URL, cached_url]),
+            patch.object(frappe, "enqueue") as enqueue,
+        ):
+            queued = qr_codes.prerender_qr_codes(
+                "Sales Invoice", '["SINV-0001", "SINV-0002"]'
+            )
+
+        self.assertEqual(queued, 1)
+        self.assertEqual(enqueue.call_args.args, (qr_codes.render_qr_codes,))
+        self.assertEqual(enqueue.call_args.kwargs["urls"], [QR_CODE_URL])
@@ -0,0 +1,63 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from .versioned_cache import VersionedCache
+
+
+class TestVersionedCache(FrappeTestCase):
+    """Test Cases"""
+
+    def setUp(self) -> None:
+        self.loads = []
+        self.cache = VersionedCache("_test_versioned_cache", self.load)
+        self.cache.invalidate_now()
+
+    def load(self) -> dict:
+        self.loads.append(1)
+        return {"loads": len(self.loads)}
+
+    def test_loaded_once(self) -> None:
+        self.assertEqual(self.cache.get(), {"loads": 1})
+        self.assertEqual(self.cache.get(), {"loads": 1})
+        self.assertEqual(len(self.loads), 1)
+
+    def test_other_workers_reuse_stored_value(self) -> None:
+        self.cache.get()
+        other_worker = VersionedCache("_test_versioned_cache", self.load)
+
+        self.assertEqual(other_worker.get(), {"loads": 1})
+        self.assertEqual(len(self.loads), 1)
+
+    def test_invalidate_reloads_in_every_worker(self) -> None:
+        other_worker = VersionedCache("_test_versioned_cache", self.load)
+        self.cache.get()
+        other_worker.get()
+
+        self.cache.invalidate_now()
+
+        self.assertEqual(other_worker.get(), {"loads": 2})
+        self.assertEqual(self.cache.get(), {"loads": 2})
+
+    def test_value_loaded_after_commit_published_with_new_stamp(self) -> None:
+        other_worker = VersionedCache("_test_versioned_cache", self.load)
+        other_worker.get()
+
+        self.cache.invalidate()
+        self.assertEqual(other_worker.get(), {"loads": 1})  # Not committed yet
+
+        frappe.db.after_commit.run()
+
+        # Loaded once, after the commit, rather than by whichever worker reads first
+        self.assertEqual(other_worker.get(), {"loads": 2})
+        self.assertEqual(self.cache.get(), {"loads": 2})
+        self.assertEqual(len(self.loads), 2)
+
+    def test_value_invalidated_while_loading_not_stored(self) -> None:
+        def load() -> dict:
+            self.cache.invalidate_now()  # Another worker commits a change meanwhile
+            return self.load()
+
+        loading_worker = VersionedCache("_test_versioned_cache", load)
+
+        self.assertEqual(loading_worker.get(), {"loads": 1})
+        self.assertEqual(self.cache.get(), {"loads": 2})
@@ -3,27 +3,33 @@
 import json
 import re
 from base64 import b64encode
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import ROUND_DOWN, Decimal
 from io import BytesIO
 from urllib.parse import urlencode
 
 import aiohttp
 import qrcode
+import redis
 import requests
 from aiohttp import ClientTimeout
 
 import frappe
 from frappe.model.document import Document
+from frappe.utils import get_datetime
 
+from .code_tables import get_code_value
 from .doctype.doctype_names_mapping import (
     ENVIRONMENT_SPECIFICATION_DOCTYPE_NAME,
     ROUTES_TABLE_CHILD_DOCTYPE_NAME,
     ROUTES_TABLE_DOCTYPE_NAME,
     SETTINGS_DOCTYPE_NAME,
+    TAXATION_TYPE_DOCTYPE_NAME,
+    USER_DOCTYPE_NAME,
     WORKSTATION_DOCTYPE_NAME,
 )
 from .logger import etims_logger
+from .versioned_cache import VersionedCache
 
 
 def is_valid_kra_pin(pin: str) -> bool:
@@ -41,6 +47,11 @@ def is_valid_kra_pin(pin: str) -> bool:
     return bool(re.match(pattern, pin))
 
 
+# Bounds each connection and read rather than the whole exchange, which is as long as
+# the response is
+POST_REQUEST_TIMEOUT = ClientTimeout(total=None, sock_connect=10, sock_read=120)
+
+
 async def make_get_request(url: str) -> dict[str, str] | str:
     """Make an Asynchronous GET Request to specified URL
 
@@ -75,8 +86,7 @@ async def make_post_request(
     """
     # TODO: Refactor to a more efficient handling of creation of the session object
     # as described in documentation
-    async with aiohttp.ClientSession(timeout=ClientTimeout(1800)) as session:
-        # Timeout of 1800 or 30 mins, especially for fetching Item classification
+    async with aiohttp.ClientSession(timeout=POST_REQUEST_TIMEOUT) as session:
         async with session.post(url, json=data, headers=headers) as response:
             return await response.json()
 
@@ -111,33 +121,118 @@ def is_valid_url(url: str) -> bool:
     return bool(re.match(pattern, url))
 
 
+def load_routes() -> dict[tuple[str, str], frappe._dict]:
+    """Loads every route, keyed by (vendor, route key) in lower case.
+
+    The first row wins where a route key is repeated, as it did when each route
+    was looked up with its own query.
+    """
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            parent.vendor,
+            child.url_path_function,
+            child.url_path,
+            child.last_request_date,
+            child.fetch_pages_concurrently,
+            child.max_concurrent_pages,
+            child.max_concurrent_requests,
+            child.disable_retries,
+            child.incremental_sync
+        FROM `tab{ROUTES_TABLE_CHILD_DOCTYPE_NAME}` AS child
+        JOIN `tab{ROUTES_TABLE_DOCTYPE_NAME}` AS parent
+        ON child.parent = parent.name
+        ORDER BY parent.name, child.idx
+        """,
+        as_dict=True,
+    )
+
+    routes = {}
+    for row in rows:
+        key = ((row.vendor or "").lower(), (row.url_path_function or "").lower())
+        routes.setdefault(key, row)
+
+    return routes
+
+
+routes_cache = VersionedCache("routes", load_routes)
+
+
+def get_route(search_field: str, vendor: str = "OSCU KRA") -> frappe._dict | None:
+    """Fetches a route's row from the cached routes table.
+
+    Args:
+        search_field (str): The route key, e.g. ItemClsSearchReq
+        vendor (str, optional): The API provider. Defaults to "OSCU KRA".
+
+    Returns:
+        frappe._dict | None: The route, if configured
+    """
+    return routes_cache.get().get((vendor.lower(), search_field.lower()))
+
+
 def get_route_path(
     search_field: str,
     vendor: str = "OSCU KRA",
-    routes_table_doctype: str = ROUTES_TABLE_CHILD_DOCTYPE_NAME,
-    parent_doctype: str = ROUTES_TABLE_DOCTYPE_NAME,
 ) -> tuple[str, str] | None:
+    """Fetches a route's URL path.
 
-    query = f"""
-    SELECT
-        child.url_path,
-        child.last_request_date
-    FROM `tab{routes_table_doctype}` AS child
-    JOIN `tab{parent_doctype}` AS parent
-    ON child.parent = parent.name
-    WHERE child.url_path_function LIKE '{search_field}'
-    AND parent.vendor LIKE '{vendor}'
-    LIMIT 1
+    Returns:
+        tuple[str, str] | None: The URL path, and the route's last request date as of
+        when the routes were last loaded
     """
+    route = get_route(search_field, vendor)
 
-    results = frappe.db.sql(query, as_dict=True)
-
-    if results:
-        return (results[0]["url_path"], results[0]["last_request_date"])
+    if route:
+        return (route.url_path, route.last_request_date)
 
     return None
 
 
+def get_route_page_concurrency(search_field: str, vendor: str = "OSCU KRA") -> int:
+    """Fetches how many pages of a paginated route may be requested concurrently.
+
+    Args:
+        search_field (str): The route key, e.g. ItemClsSearchReq
+        vendor (str, optional): The API provider. Defaults to "OSCU KRA".
+
+    Returns:
+        int: The maximum concurrent page requests. 0 if the route fetches pages one at a time.
+    """
+    route = get_route(search_field, vendor)
+
+    if route and route.fetch_pages_concurrently:
+        return max(int(route.max_concurrent_pages or 1), 1)
+
+    return 0
+
+
+def get_route_request_concurrency(search_field: str, vendor: str = "OSCU KRA") -> int:
+    """Fetches how many single-record requests to a route may be sent concurrently.
+
+    Args:
+        search_field (str): The route key, e.g. SalesLineSaveReq
+        vendor (str, optional): The API provider. Defaults to "OSCU KRA".
+
+    Returns:
+        int: The maximum concurrent requests. 1 if the route takes them one at a time.
+    """
+    route = get_route(search_field, vendor)
+
+    return max(int((route and route.max_concurrent_requests) or 1), 1)
+
+
+def is_route_retry_disabled(search_field: str, vendor: str = "OSCU KRA") -> bool:
+    """Whether failed requests to a route must never be resent automatically"""
+    route = get_route(search_field, vendor)
+
+    return bool(route and route.disable_retries)
+
+
+def clear_routes_cache() -> None:
+    routes_cache.invalidate_now()
+
+
 def get_environment_settings(
     company_name: str,
     vendor: str,
@@ -222,7 +317,7 @@ def get_server_url(company_name: str, branch_id: str = "00") -> str | None:
 def build_headers(company_name: str, branch_id: str) -> dict[str, str] | None:
     """
     Build headers for Slade360 API requests.
-    Checks for token validity and refreshes the token if expired.
+    The access token is refreshed ahead of its expiry by the token manager.
 
     Args:
         company_name (str): The name of the company.
@@ -231,37 +326,12 @@ def build_headers(company_name: str, branch_id: str) -> dict[str, str] | None:
     Returns:
         dict[str, str] | None: The headers including the refreshed token or None if failed.
     """
+    from .apis.token_manager import get_access_token
+
     settings = get_settings(company_name, branch_id)
 
     if settings:
-        access_token = settings.get("access_token")
-        token_expiry = settings.get("token_expiry")
-
-        if (
-            not access_token
-            or not token_expiry
-            or (
-                datetime.strptime(str(token_expiry).split(".")[0], "%Y-%m-%d %H:%M:%S")
-                < datetime.now()
-            )
-        ):
-            new_settings = update_navari_settings_with_token(settings.get("name"))
-
-            if not new_settings:
-                frappe.throw(
-                    "Failed to refresh token. Please check your Slade360 integration settings.",
-                    frappe.AuthenticationError,
-                )
-
-            access_token = new_settings.access_token
-
-        logged_user = frappe.session.user
-        user_data = frappe.db.get_value(
-            "Navari eTims User",
-            {"system_user": logged_user},
-            ["workstation"],
-            as_dict=True,
-        )
+        access_token = get_access_token(settings.get("name"))
 
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -269,11 +339,9 @@ def build_headers(company_name: str, branch_id: str) -> dict[str, str] | None:
             "Accept": "application/json",
         }
 
-        workstation = None
-        if settings and settings.get("workstation"):
-            workstation = settings.get("workstation")
-        elif user_data and user_data.get("workstation"):
-            workstation = user_data.get("workstation")
+        workstation = settings.get("workstation")
+        if not workstation:
+            workstation = etims_user_workstations_cache.get().get(frappe.session.user)
 
         if workstation:
             headers["X-Workstation"] = workstation
@@ -283,9 +351,47 @@ def build_headers(company_name: str, branch_id: str) -> dict[str, str] | None:
     return None
 
 
+def load_active_settings() -> list[frappe._dict]:
+    """Loads every active settings record, most recently modified first"""
+    return frappe.get_all(
+        SETTINGS_DOCTYPE_NAME,
+        filters={"is_active": 1},
+        fields=["*"],
+        order_by="modified desc",
+    )
+
+
+active_settings_cache = VersionedCache("active_settings", load_active_settings)
+
+
+def load_etims_user_workstations() -> dict[str, str]:
+    return {
+        user.system_user: user.workstation
+        for user in frappe.get_all(
+            USER_DOCTYPE_NAME,
+            filters={"workstation": ["is", "set"]},
+            fields=["system_user", "workstation"],
+        )
+        if user.system_user
+    }
+
+
+etims_user_workstations_cache = VersionedCache(
+    "etims_user_workstations", load_etims_user_workstations
+)
+
+
+def has_active_settings() -> bool:
+    """Whether any eTims settings record is active, without querying the database"""
+    return bool(active_settings_cache.get())
+
+
 def get_settings(company_name: str = None, branch_id: str = None) -> dict | None:
     """Fetch settings for a given company and branch.
 
+    Served from the per-worker cache of active settings records, which is refreshed
+    whenever a settings record is saved or deleted.
+
     Args:
         company_name (str, optional): The name of the company. Defaults to None.
         branch_id (str, optional): The branch ID. Defaults to None.
@@ -293,33 +399,27 @@ def get_settings(company_name: str = None, branch_id: str = None) -> dict | None
     Returns:
         dict | None: The settings if found, otherwise None.
     """
-    company_name = (
-        company_name
-        or frappe.defaults.get_user_default("Company")
-        or frappe.get_value("Company", {}, "name")
-    )
-    branch_id = (
-        branch_id
-        or frappe.defaults.get_user_default("Branch")
-        or frappe.get_value("Branch", {}, "name")
-    )
+    active_settings = active_settings_cache.get()
 
-    settings = frappe.db.get_value(
-        SETTINGS_DOCTYPE_NAME,
-        {"company": company_name, "bhfid": branch_id, "is_active": 1},
-        "*",
-        as_dict=True,
-    )
+    if not active_settings:
+        return None
 
-    if not settings:
-        settings = frappe.db.get_value(
-            SETTINGS_DOCTYPE_NAME,
-            {"is_active": 1},
-            "*",
-            as_dict=True,
-        )
+    company_name = company_name or frappe.defaults.get_user_default("Company")
+    branch_id = branch_id or frappe.defaults.get_user_default("Branch")
+
+    # Without a company or branch, any active settings record for the other will do
+    settings = next(
+        (
+            settings
+            for settings in active_settings
+            if (not company_name or settings.company == company_name)
+            and (not branch_id or settings.bhfid == branch_id)
+        ),
+        active_settings[0],
+    )
 
-    return settings
+    # A copy, so callers cannot change the cached record
+    return frappe._dict(settings)
 
 
 def get_branch_id(company_name: str, vendor: str) -> str | None:
@@ -468,24 +568,63 @@ def get_invoice_items_list(invoice: Document) -> list[dict[str, str | int | None
     return items_list
 
 
+LAST_REQUEST_DATES_KEY = "etims_route_last_request_dates"
+
+
 def update_last_request_date(
-    response_datetime: str,
+    response_datetime: str | datetime,
     route: str,
-    routes_table: str = ROUTES_TABLE_CHILD_DOCTYPE_NAME,
 ) -> None:
+    """Records when a route was last called.
+
+    The date is held in Redis and written to the routes table by
+    `flush_last_request_dates`, so requests neither lock the route's row nor commit
+    the caller's transaction early.
+    """
     if len(route) < 5:
         return
 
-    doc = frappe.get_doc(
-        routes_table,
-        {"url_path": route},
-        ["*"],
-    )
+    frappe.cache.hset(LAST_REQUEST_DATES_KEY, route, str(response_datetime))
 
-    doc.last_request_date = response_datetime
 
-    doc.save(ignore_permissions=True)
-    frappe.db.commit()
+def flush_last_request_dates() -> None:
+    """Writes the recorded last request dates to the routes table in one update"""
+    flushing_key = f"{LAST_REQUEST_DATES_KEY}|flushing|{frappe.generate_hash(length=8)}"
+
+    try:
+        # Dates recorded from here on go to a fresh hash
+        frappe.cache.rename(
+            frappe.cache.make_key(LAST_REQUEST_DATES_KEY),
+            frappe.cache.make_key(flushing_key),
+        )
+    except redis.exceptions.ResponseError:
+        return  # Nothing recorded
+
+    last_request_dates = {
+        frappe.safe_decode(route): value
+        for route, value in frappe.cache.hgetall(flushing_key).items()
+    }
+    frappe.cache.delete_value(flushing_key)
+
+    if not last_request_dates:
+        return
+
+    routes = list(last_request_dates)
+    cases = " ".join(["WHEN %s THEN %s"] * len(routes))
+    values = [
+        value
+        for route in routes
+        for value in (route, get_datetime(last_request_dates[route]))
+    ]
+
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{ROUTES_TABLE_CHILD_DOCTYPE_NAME}`
+        SET last_request_date = CASE url_path {cases} END
+        WHERE url_path IN %s
+        """,
+        (*values, routes),
+    )
 
 
 def get_curr_env_etims_settings(
@@ -514,7 +653,7 @@ def get_most_recent_sales_number(
 
 
 def get_qr_code(data: str) -> str:
-    """Generate QR Code data
+    """Generate QR Code data, or take it from the QR code cache
 
     Args:
         data (str): The information used to generate the QR Code
@@ -522,10 +661,9 @@ def get_qr_code(data: str) -> str:
     Returns:
         str: The QR Code.
     """
-    qr_code_bytes = get_qr_code_bytes(data, format="PNG")
-    base_64_string = bytes_to_base64_string(qr_code_bytes)
+    from .qr_codes import get_etims_qr_code
 
-    return add_file_info(base_64_string)
+    return get_etims_qr_code(data)
 
 
 def add_file_info(data: str) -> str:
@@ -601,7 +739,7 @@ A classic example usecase is Apex tevin typecase where the tax rate is fetched f
 
 
 def before_save_(doc: "Document", method: str | None = None) -> None:
-    if not frappe.db.exists(SETTINGS_DOCTYPE_NAME, {"is_active": 1}):
+    if not has_active_settings():
         return
     calculate_tax(doc)
 
@@ -645,8 +783,8 @@ def get_taxation_types(doc: dict) -> dict:
         tax_amount = item.custom_tax_amount
 
         # Fetch the tax rate for the current taxation type from the specified doctype
-        tax_rate = frappe.db.get_value(
-            "Navari KRA eTims Taxation Type", taxation_type, "userdfncd1"
+        tax_rate = get_code_value(
+            TAXATION_TYPE_DOCTYPE_NAME, "name", taxation_type, "userdfncd1"
         )
         # If the taxation type already exists in the dictionary, update the totals
         if taxation_type in taxation_totals:
@@ -711,36 +849,15 @@ def authenticate_and_get_token(
 
 @frappe.whitelist()
 def update_navari_settings_with_token(docname: str) -> str:
-    settings_doc = frappe.get_doc(SETTINGS_DOCTYPE_NAME, docname)
-    if not settings_doc.get("access_token") or (
-        datetime.strptime(
-            str(settings_doc.get("token_expiry")).split(".")[0], "%Y-%m-%d %H:%M:%S"
-        )
-        < datetime.now()
-    ):
-        auth_server_url = settings_doc.auth_server_url
-        username = settings_doc.auth_username
-        client_id = settings_doc.client_id
-        password = settings_doc.get_password("auth_password")
-        client_secret = settings_doc.get_password("client_secret")
-
-        token_details = authenticate_and_get_token(
-            auth_server_url, username, password, client_id, client_secret
-        )
+    from .apis.token_manager import get_access_token, load_token
 
-        if not token_details:
-            return None
-
-        settings_doc.access_token = token_details["access_token"]
-        settings_doc.refresh_token = token_details["refresh_token"]
-        settings_doc.token_expiry = datetime.now() + timedelta(
-            seconds=token_details["expires_in"]
-        )
-        settings_doc.save(ignore_permissions=True)
+    token = load_token(docname)
 
+    if not token or token.is_expired():
+        get_access_token(docname)
         user_details_fetch(docname)
 
-    return settings_doc
+    return frappe.get_doc(SETTINGS_DOCTYPE_NAME, docname)
 
 
 @frappe.whitelist()
@@ -829,7 +946,7 @@ def get_link_value(
     doctype: str, field_name: str, value: str, return_field: str = "name"
 ) -> str:
     try:
-        return frappe.db.get_value(doctype, {field_name: value}, return_field)
+        return get_code_value(doctype, field_name, value, return_field)
     except Exception as e:
         frappe.log_error(
             title=f"Error Fetching Link for {doctype}",
@@ -843,7 +960,7 @@ def get_or_create_link(doctype: str, field_name: str, value: str) -> str:
         return None
 
     try:
-        link_name = frappe.db.get_value(doctype, {field_name: value}, "name")
+        link_name = get_code_value(doctype, field_name, value)
         if not link_name:
             link_name = (
                 frappe.get_doc(
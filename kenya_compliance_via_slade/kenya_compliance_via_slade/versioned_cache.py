@@ -0,0 +1,107 @@
+"""Per-process caching of rarely changing data, kept coherent through Redis"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import frappe
+
+from .logger import etims_logger
+
+CACHE_TTL = 86400  # seconds
+
+
+class VersionedCache:
+    """Holds a value loaded from the database in the memory of every worker process.
+
+    Each worker keeps its own copy, tagged with a version stamp stored in Redis. A
+    copy is used for as long as the stamp is unchanged, so reads cost a single Redis
+    lookup and no queries. `invalidate` loads the value again once the change is
+    committed and stores it in Redis under a new stamp, and every worker picks it up
+    on its next read.
+
+    Values must be picklable and must not be modified by callers.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]) -> None:
+        self.name = name
+        self.loader = loader
+        self._values: dict[str, tuple[str, Any]] = {}
+
+    def get(self) -> Any:
+        version = self.get_version()
+        cached = self._values.get(frappe.local.site)
+
+        if cached and cached[0] == version:
+            return cached[1]
+
+        stored = frappe.cache.get_value(self.value_key, expires=True)
+
+        if stored and stored[0] == version:
+            value = stored[1]
+        else:
+            value = self.loader()
+
+            if self.get_version() != version:
+                # Invalidated while loading, so the value may already be out of date
+                return value
+
+            frappe.cache.set_value(
+                self.value_key, (version, value), expires_in_sec=CACHE_TTL
+            )
+
+        self._values[frappe.local.site] = (version, value)
+        return value
+
+    def get_version(self) -> str:
+        version = frappe.cache.get(self.version_key)
+
+        if version is None:
+            # First use, or Redis was flushed
+            frappe.cache.set(self.version_key, frappe.generate_hash(length=12), nx=True)
+            version = frappe.cache.get(self.version_key)
+
+        return version
+
+    def invalidate(self) -> None:
+        """Replace every worker's copy once the current transaction is committed.
+
+        Invalidating before the commit would let other workers reload, and keep,
+        the data as it was before the change. So would a worker reloading after it
+        in a transaction that began before it, as it reads a snapshot from then.
+        The value is therefore loaded by this worker once it has committed, and
+        stored before the new stamp is, so other workers never load it themselves.
+        """
+        self._values.pop(frappe.local.site, None)
+        frappe.db.after_commit.add(self.refresh)
+
+    def refresh(self) -> None:
+        """Load the value and make it current in every worker"""
+        new_version = frappe.generate_hash(length=12)
+        version = new_version.encode()  # As the stamp is read back from Redis
+
+        try:
+            value = self.loader()
+        except Exception:
+            # Left to the workers to load on their next read
+            etims_logger.exception("Reloading the %s cache failed", self.name)
+            self.invalidate_now()
+            return
+
+        frappe.cache.set_value(
+            self.value_key, (version, value), expires_in_sec=CACHE_TTL
+        )
+        frappe.cache.set(self.version_key, new_version)
+        self._values[frappe.local.site] = (version, value)
+
+    def invalidate_now(self) -> None:
+        self._values.pop(frappe.local.site, None)
+        frappe.cache.set(self.version_key, frappe.generate_hash(length=12))
+
+    @property
+    def version_key(self) -> str:
+        return frappe.cache.make_key(f"etims_cache_version|{self.name}")
+
+    @property
+    def value_key(self) -> str:
+        return f"etims_cache|{self.name}"